@@ -0,0 +1,398 @@
+# mysite/instrumentation.py
+"""Per-request query-count and latency instrumentation.
+
+``RequestMetricsMiddleware`` counts the database queries each request runs
+and the time spent in them, measures the response size, and reports them in a
+``Server-Timing`` header and in per-process Prometheus metrics served at
+``/api/metrics``. Routes decorated with ``instrumented`` (directly under the
+route decorator) also split their time into the view itself and the
+serialization that follows it (schema validation, lazy queries of paginated
+querysets and resolvers, rendering).
+
+A request that runs the same SQL at least N_PLUS_ONE_THRESHOLD times (e.g. a
+schema or ``__str__`` touching ``reading.sensor`` per row) is logged as a
+likely N+1 and counted in ``http_n_plus_one_total``. Configured by
+``settings.REQUEST_METRICS``:
+
+    ENABLED               record metrics at all
+    SERVER_TIMING         add the Server-Timing header to responses
+    N_PLUS_ONE_THRESHOLD  repeats of one statement flagged as N+1 (None: off)
+    METRICS_TOKEN         bearer token required by /api/metrics (None: open)
+
+Queries are seen through a database execute wrapper installed on every
+connection, so queries run in ``sync_to_async`` threads of async views count
+too. Streamed response bodies are produced after the middleware returns and
+are not measured. Metrics are kept per process: with several workers each
+scrape sees the worker that served it.
+
+The scrape also reports the size and usage of the process's psycopg
+connection pools (``OPTIONS["pool"]``, see DATABASES in settings) once open.
+"""
+import hmac
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "ENABLED": True,
+    "SERVER_TIMING": True,
+    "N_PLUS_ONE_THRESHOLD": 10,
+    "METRICS_TOKEN": None,
+}
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+SIZE_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+# Characters of a repeated statement quoted in N+1 warnings
+SQL_PREVIEW = 200
+
+# (metric, psycopg_pool stat, help) of the connection pool gauges
+POOL_GAUGES = (
+    ("db_pool_min_size", "pool_min", "Connections the pool keeps open at least."),
+    ("db_pool_max_size", "pool_max", "Connections the pool may open at most."),
+    ("db_pool_size", "pool_size", "Connections currently managed by the pool."),
+    ("db_pool_available", "pool_available", "Idle connections ready to be handed out."),
+    ("db_pool_requests_waiting", "requests_waiting", "Requests waiting for a connection."),
+)
+# (metric, psycopg_pool stat, help, divisor) of the connection pool counters
+POOL_COUNTERS = (
+    ("db_pool_requests_total", "requests_num", "Connections requested from the pool.", 1),
+    ("db_pool_requests_queued_total", "requests_queued", "Requests that had to wait for a connection.", 1),
+    ("db_pool_requests_wait_seconds_total", "requests_wait_ms", "Time spent waiting for a connection.", 1000),
+    ("db_pool_requests_errors_total", "requests_errors", "Requests that got no connection in time.", 1),
+    ("db_pool_connections_total", "connections_num", "Connections opened by the pool.", 1),
+    ("db_pool_connections_lost_total", "connections_lost", "Connections found broken by health checks.", 1),
+)
+
+
+def metrics_config():
+    return {**DEFAULTS, **getattr(settings, "REQUEST_METRICS", {})}
+
+
+class RequestMetrics:
+    """Measurements of the request being served"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements = Counter()
+        # Set by ``instrumented`` routes
+        self.view_started = None
+        self.view_finished = None
+        self.view_queries = 0
+
+    def add_query(self, sql, duration):
+        self.queries += 1
+        self.db_time += duration
+        self.statements[sql] += 1
+
+    def repeated_statement(self):
+        """``(sql, count)`` of the most repeated statement, or None"""
+        most_common = self.statements.most_common(1)
+        return most_common[0] if most_common else None
+
+
+_current = ContextVar("request_metrics", default=None)
+
+
+def current_metrics():
+    """The RequestMetrics of the request being served, or None"""
+    return _current.get()
+
+
+def _record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query(sql, time.perf_counter() - started)
+
+
+def install_query_recorder(connection):
+    # First in the list: Connection.execute_wrapper() pops the last entry on exit
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _record_query)
+
+
+def _install_on_connect(sender, connection, **kwargs):
+    install_query_recorder(connection)
+
+
+connection_created.connect(_install_on_connect)
+
+
+def instrumented(view):
+    """Split a controller route's time into the view and the serialization of its result.
+
+    Apply it outermost, directly under the route decorator.
+    """
+
+    def start():
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.view_started = time.perf_counter()
+        return metrics
+
+    def finish(metrics):
+        if metrics is not None:
+            metrics.view_finished = time.perf_counter()
+            metrics.view_queries = metrics.queries
+
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(*args, **kwargs):
+            metrics = start()
+            try:
+                return await view(*args, **kwargs)
+            finally:
+                finish(metrics)
+
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        metrics = start()
+        try:
+            return view(*args, **kwargs)
+        finally:
+            finish(metrics)
+
+    return wrapper
+
+
+class Histogram:
+    """Buckets, sum and count per label set"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, labels, value):
+        series = self.series.setdefault(labels, {"buckets": [0] * len(self.buckets), "sum": 0, "count": 0})
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series["buckets"][index] += 1
+        series["sum"] += value
+        series["count"] += 1
+
+    def samples(self, name):
+        for labels, series in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series["buckets"]):
+                cumulative += count
+                yield f"{name}_bucket", labels + (("le", bound),), cumulative
+            yield f"{name}_bucket", labels + (("le", "+Inf"),), series["count"]
+            yield f"{name}_sum", labels, series["sum"]
+            yield f"{name}_count", labels, series["count"]
+
+
+def _counter_samples(name, counter):
+    for labels, value in sorted(counter.items()):
+        yield name, labels, value
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _sample_line(name, labels, value):
+    label_text = ",".join(f'{label}="{_escape(label_value)}"' for label, label_value in labels)
+    return f"{name}{{{label_text}}} {value}" if labels else f"{name} {value}"
+
+
+class MetricsRegistry:
+    """Per-process request metrics in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = Counter()
+            self.db_seconds = Counter()
+            self.serialize_seconds = Counter()
+            self.n_plus_one = Counter()
+            self.duration = Histogram(DURATION_BUCKETS)
+            self.queries = Histogram(QUERY_BUCKETS)
+            self.size = Histogram(SIZE_BUCKETS)
+
+    def observe(self, method, route, status, metrics, duration, size, serialize, flagged):
+        labels = (("method", method), ("route", route))
+        with self._lock:
+            self.requests[labels + (("status", status),)] += 1
+            self.duration.observe(labels, duration)
+            self.queries.observe(labels, metrics.queries)
+            self.db_seconds[labels] += metrics.db_time
+            if serialize is not None:
+                self.serialize_seconds[labels] += serialize
+            if size is not None:
+                self.size.observe(labels, size)
+            if flagged:
+                self.n_plus_one[labels] += 1
+
+    def render(self):
+        with self._lock:
+            families = [
+                ("http_requests_total", "counter", "Requests served.",
+                 _counter_samples("http_requests_total", self.requests)),
+                ("http_request_duration_seconds", "histogram", "Time to produce the response.",
+                 self.duration.samples("http_request_duration_seconds")),
+                ("http_request_db_queries", "histogram", "Database queries per request.",
+                 self.queries.samples("http_request_db_queries")),
+                ("http_request_db_seconds_total", "counter", "Time spent in database queries.",
+                 _counter_samples("http_request_db_seconds_total", self.db_seconds)),
+                ("http_request_serialize_seconds_total", "counter", "Time spent serializing results of instrumented routes.",
+                 _counter_samples("http_request_serialize_seconds_total", self.serialize_seconds)),
+                ("http_response_size_bytes", "histogram", "Size of non-streamed response bodies.",
+                 self.size.samples("http_response_size_bytes")),
+                ("http_n_plus_one_total", "counter", "Requests flagged as likely N+1 query patterns.",
+                 _counter_samples("http_n_plus_one_total", self.n_plus_one)),
+            ]
+            lines = []
+            for name, kind, help_text, samples in families + _pool_families():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.extend(_sample_line(*sample) for sample in samples)
+        return "\n".join(lines) + "\n"
+
+
+def pool_stats():
+    """``{alias: psycopg_pool stats}`` of this process's open connection pools"""
+    stats = {}
+    for alias in connections:
+        pool = getattr(connections[alias], "pool", None)
+        if pool is not None and not pool.closed:
+            stats[alias] = pool.get_stats()
+    return stats
+
+
+def _pool_families():
+    stats = pool_stats()
+    if not stats:
+        return []
+    families = [
+        (name, "gauge", help_text, [(name, (("alias", alias),), values.get(key, 0)) for alias, values in stats.items()])
+        for name, key, help_text in POOL_GAUGES
+    ]
+    families += [
+        (name, "counter", help_text, [(name, (("alias", alias),), values.get(key, 0) / divisor) for alias, values in stats.items()])
+        for name, key, help_text, divisor in POOL_COUNTERS
+    ]
+    return families
+
+
+registry = MetricsRegistry()
+
+
+def _route(request):
+    match = getattr(request, "resolver_match", None)
+    return "/" + match.route if match is not None and match.route else "unmatched"
+
+
+def _server_timing(metrics, total, serialize, flagged):
+    entries = [f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.queries} queries"']
+    if metrics.view_finished is not None:
+        entries.append(f"view;dur={(metrics.view_finished - metrics.view_started) * 1000:.1f}")
+        entries.append(f"serialize;dur={serialize * 1000:.1f}")
+    entries.append(f"app;dur={total * 1000:.1f}")
+    if flagged:
+        entries.append(f'n-plus-one;desc="{flagged} repeats"')
+    return ", ".join(entries)
+
+
+def _finish(request, response, metrics, config):
+    finished = time.perf_counter()
+    total = finished - metrics.started
+    serialize = finished - metrics.view_finished if metrics.view_finished is not None else None
+    size = None if response.streaming else len(response.content)
+    route = _route(request)
+
+    flagged = 0
+    threshold = config["N_PLUS_ONE_THRESHOLD"]
+    repeated = metrics.repeated_statement()
+    if threshold is not None and repeated is not None and repeated[1] >= threshold:
+        sql, flagged = repeated
+        logger.warning(
+            "Possible N+1 on %s %s: %d queries, one statement repeated %d times: %s",
+            request.method, route, metrics.queries, flagged, sql[:SQL_PREVIEW],
+        )
+
+    registry.observe(request.method, route, response.status_code, metrics, total, size, serialize, flagged)
+    if config["SERVER_TIMING"]:
+        response["Server-Timing"] = _server_timing(metrics, total, serialize, flagged)
+    return response
+
+
+class RequestMetricsMiddleware:
+    """Measure each request's queries, timings and response size (see module docstring).
+
+    Place it last in MIDDLEWARE so serialization time ends when the view's
+    response is complete.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        # Connections opened before this module was imported
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        config = metrics_config()
+        if not config["ENABLED"]:
+            return self.get_response(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return _finish(request, response, metrics, config)
+
+    async def __acall__(self, request):
+        config = metrics_config()
+        if not config["ENABLED"]:
+            return await self.get_response(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return _finish(request, response, metrics, config)
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint for this process's request metrics"""
+    token = metrics_config()["METRICS_TOKEN"]
+    if token:
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        if not hmac.compare_digest(supplied.encode(), token.encode()):
+            return HttpResponse("Unauthorized\n", status=401, content_type="text/plain")
+    return HttpResponse(registry.render(), content_type=PROMETHEUS_CONTENT_TYPE)
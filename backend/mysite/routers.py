@@ -0,0 +1,210 @@
+# mysite/routers.py
+"""Read-replica routing for the heavy read routes.
+
+Routes decorated with ``replica_reads`` (directly under the route decorator)
+read from one of the replicas in ``settings.READ_REPLICAS``; everything else,
+including every write, management commands such as ``seed_data`` and reads
+outside those routes, uses the primary (``default``) database:
+
+    ALIASES         database aliases of the replicas (see DB_REPLICA_HOSTS in
+                    settings); empty: all reads go to the primary
+    STICKY_SECONDS  after a user's successful write request, their reads stay
+                    on the primary this long, so they read their own writes
+                    despite replication lag
+    RETRY_SECONDS   a replica that failed to connect is skipped this long
+    CACHE_ALIAS     Django cache remembering recent writers; use a shared
+                    cache when running several processes
+
+``ReplicaRoutingMiddleware`` scopes the choice to one request (including the
+serialization of lazy querysets after the view returns) and records writes.
+A replica is picked at random among those not marked down, after checking it
+accepts a connection; when none does, the primary serves the read.
+"""
+import random
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+DEFAULTS = {
+    "ALIASES": [],
+    "STICKY_SECONDS": 5,
+    "RETRY_SECONDS": 30,
+    "CACHE_ALIAS": "default",
+}
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def replica_config():
+    return {**DEFAULTS, **getattr(settings, "READ_REPLICAS", {})}
+
+
+# Per-request routing state: {"read": alias or None}, set up by the middleware
+_routing = ContextVar("replica_routing", default=None)
+
+# alias -> time.monotonic() until which the replica is skipped
+_down_until = {}
+_down_lock = threading.Lock()
+
+
+def _sticky_key(user_id):
+    return f"replica-sticky:{user_id}"
+
+
+def mark_write(user_id):
+    """Keep ``user_id``'s reads on the primary for STICKY_SECONDS"""
+    config = replica_config()
+    if config["ALIASES"] and config["STICKY_SECONDS"]:
+        caches[config["CACHE_ALIAS"]].set(_sticky_key(user_id), True, config["STICKY_SECONDS"])
+
+
+def is_sticky(user_id):
+    config = replica_config()
+    return bool(caches[config["CACHE_ALIAS"]].get(_sticky_key(user_id)))
+
+
+def _usable(alias, retry_seconds):
+    with _down_lock:
+        if _down_until.get(alias, 0) > time.monotonic():
+            return False
+    try:
+        connections[alias].ensure_connection()
+    except DatabaseError:
+        with _down_lock:
+            _down_until[alias] = time.monotonic() + retry_seconds
+        return False
+    return True
+
+
+def choose_read_alias(user_id=None):
+    """A reachable replica for ``user_id``'s reads, or None for the primary"""
+    config = replica_config()
+    replicas = list(config["ALIASES"])
+    if not replicas or (user_id is not None and is_sticky(user_id)):
+        return None
+    random.shuffle(replicas)
+    return next((alias for alias in replicas if _usable(alias, config["RETRY_SECONDS"])), None)
+
+
+def current_read_alias():
+    """The database reads of the current request go to (None: the primary)"""
+    routing = _routing.get()
+    return routing["read"] if routing is not None else None
+
+
+def replica_reads(view):
+    """Send a controller route's reads to a replica unless its user wrote recently.
+
+    Apply it outermost, directly under the route decorator (or under
+    ``instrumented``), so validators and serialization read from the replica
+    as well.
+    """
+
+    def user_id(controller):
+        auth = getattr(controller.context.request, "auth", None)
+        return getattr(auth, "id", None)
+
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(controller, *args, **kwargs):
+            routing = _routing.get()
+            if routing is not None:
+                routing["read"] = await sync_to_async(choose_read_alias)(user_id(controller))
+            return await view(controller, *args, **kwargs)
+
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(controller, *args, **kwargs):
+        routing = _routing.get()
+        if routing is not None:
+            routing["read"] = choose_read_alias(user_id(controller))
+        return view(controller, *args, **kwargs)
+
+    return wrapper
+
+
+class ReadReplicaRouter:
+    """Reads of ``replica_reads`` routes go to the chosen replica, everything else to the primary"""
+
+    def db_for_read(self, model, **hints):
+        return current_read_alias()
+
+    def db_for_write(self, model, **hints):
+        # Objects read from a replica are saved to the primary; others, e.g.
+        # read from a reading shard, stay where they came from
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db in replica_config()["ALIASES"]:
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replica_config()["ALIASES"]}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema through replication
+        if db in replica_config()["ALIASES"]:
+            return False
+        return None
+
+
+def _writer(request, response):
+    """Id of the user whose request just wrote successfully, or None"""
+    if request.method in SAFE_METHODS or response.status_code >= 400:
+        return None
+    return getattr(getattr(request, "auth", None), "id", None)
+
+
+class ReplicaRoutingMiddleware:
+    """Scope replica routing to each request and remember which users just wrote"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _routing.set({"read": None})
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        user_id = _writer(request, response)
+        if user_id is not None:
+            mark_write(user_id)
+        return response
+
+    async def __acall__(self, request):
+        token = _routing.set({"read": None})
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+        user_id = _writer(request, response)
+        if user_id is not None:
+            await sync_to_async(mark_write)(user_id)
+        return response
+
+
+def _reset_down(*, setting, **kwargs):
+    if setting == "READ_REPLICAS":
+        with _down_lock:
+            _down_until.clear()
+
+
+setting_changed.connect(_reset_down)
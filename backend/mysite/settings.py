@@ -55,6 +55,9 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'mysite.routers.ReplicaRoutingMiddleware',
+    # Last, so its serialization timings end with the view's response
+    'mysite.instrumentation.RequestMetricsMiddleware',
 ]
 
 # Allow all origins during development (less secure)
@@ -95,9 +98,117 @@ DATABASES = {
         "PASSWORD": os.environ['POSTGRES_PASSWORD'],
         "HOST": os.environ['DB_HOST'],
         "PORT": os.environ['DB_PORT'],
+        # Check reused connections (persistent or pooled) before handing them out
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
+# Connection reuse. DB_POOL=1 serves connections from a psycopg connection pool
+# per process (sized by DB_POOL_MIN_SIZE / DB_POOL_MAX_SIZE, waiting up to
+# DB_POOL_TIMEOUT seconds for a free one); it also works under ASGI, where
+# persistent connections are not reused. Otherwise DB_CONN_MAX_AGE keeps each
+# thread's connection open for that many seconds (0: one per request).
+if os.environ.get("DB_POOL", "") == "1":
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": int(os.environ.get("DB_POOL_MIN_SIZE", "2")),
+            "max_size": int(os.environ.get("DB_POOL_MAX_SIZE", "10")),
+            "timeout": float(os.environ.get("DB_POOL_TIMEOUT", "10")),
+        },
+    }
+else:
+    DATABASES["default"]["CONN_MAX_AGE"] = int(os.environ.get("DB_CONN_MAX_AGE", "0"))
+
+# Read replicas: DB_REPLICA_HOSTS="host[:port],..." adds aliases replica1, replica2, ...
+# with the primary's credentials; the read-heavy routes use them (see mysite/routers.py)
+for index, replica in enumerate(filter(None, os.environ.get("DB_REPLICA_HOSTS", "").split(",")), start=1):
+    host, _, port = replica.strip().partition(":")
+    DATABASES[f"replica{index}"] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "PORT": port or DATABASES["default"]["PORT"],
+        "TEST": {"MIRROR": "default"},
+    }
+
+# Reading shards: DB_READING_SHARDS="host[:port]/name,..." adds aliases shard1, shard2, ...
+# with the primary's credentials; sensors' readings are spread over them and the
+# primary (see readings/sharding.py). Run migrate --database=shardN for each.
+for index, shard in enumerate(filter(None, os.environ.get("DB_READING_SHARDS", "").split(",")), start=1):
+    address, _, name = shard.strip().partition("/")
+    host, _, port = address.partition(":")
+    DATABASES[f"shard{index}"] = {
+        **DATABASES["default"],
+        "HOST": host or DATABASES["default"]["HOST"],
+        "PORT": port or DATABASES["default"]["PORT"],
+        "NAME": name or DATABASES["default"]["NAME"],
+    }
+
+DATABASE_ROUTERS = ["mysite.routers.ReadReplicaRouter"]
+
+READ_REPLICAS = {
+    "ALIASES": [alias for alias in DATABASES if alias.startswith("replica")],
+    "STICKY_SECONDS": int(os.environ.get("DB_REPLICA_STICKY_SECONDS", "5")),
+    "RETRY_SECONDS": 30,
+    "CACHE_ALIAS": "default",
+}
+
+READINGS_SHARDS = {
+    "SHARDS": ["default", *(alias for alias in DATABASES if alias.startswith("shard"))],
+    "VNODES": 64,
+    "CACHE_TTL": 60,
+    "MAX_SIZE": 100_000,
+}
+
+# Sensor ownership cache used by the readings routes (see sensors/ownership.py)
+SENSOR_OWNERSHIP_CACHE = {
+    "BACKEND": "local",
+    "TTL": 60,
+    "MAX_SIZE": 100_000,
+}
+
+# Deleting sensors with large reading histories (see sensors/deletion.py)
+SENSOR_DELETION = {
+    "BATCH_SIZE": 10_000,
+    "BACKGROUND": True,
+}
+
+# Write-behind buffer for single-reading ingest (see readings/buffer.py)
+READINGS_INGEST_BUFFER = {
+    "ENABLED": os.environ.get("READINGS_INGEST_BUFFER", "") == "1",
+    "MAX_ROWS": 50_000,
+    "BATCH_SIZE": 1_000,
+    "FLUSH_INTERVAL_MS": 200,
+}
+
+# Live readings stream fan-out (see readings/live.py)
+READINGS_LIVE_STREAM = {
+    "BACKEND": "auto",
+    "CHANNEL": "readings_live",
+    "QUEUE_SIZE": 1_000,
+    "KEEPALIVE": 15,
+}
+
+# Per-request query/latency metrics, Server-Timing and /api/metrics (see mysite/instrumentation.py)
+REQUEST_METRICS = {
+    "ENABLED": True,
+    "SERVER_TIMING": True,
+    "N_PLUS_ONE_THRESHOLD": 10,
+    "METRICS_TOKEN": os.environ.get("METRICS_TOKEN") or None,
+}
+
+# Send warnings of the project's own modules (e.g. N+1 reports) to the console
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        logger: {"handlers": ["console"], "level": os.environ.get("APP_LOG_LEVEL", "WARNING")}
+        for logger in ("mysite", "users", "sensors", "readings")
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -17,15 +17,17 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path
 from ninja_extra import NinjaExtraAPI
+from mysite.instrumentation import metrics_view
 from users.auth_controller import AuthController
 from sensors.api import SensorController
-from readings.api import ReadingController
+from readings.api import IngestController, ReadingBatchController, ReadingController
 
 api = NinjaExtraAPI()
 
-api.register_controllers(AuthController, SensorController, ReadingController)
+api.register_controllers(AuthController, SensorController, ReadingController, ReadingBatchController, IngestController)
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("api/metrics", metrics_view, name="metrics"),
     path("api/", api.urls),
 ]
@@ -1,13 +1,58 @@
-from typing import List, Optional
+from typing import List, Literal, Optional
 from datetime import datetime
-from django.shortcuts import get_object_or_404
-from ninja import Schema
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, transaction
+from django.db.models import Max, Min, QuerySet
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from ninja import Query, Schema
 from ninja_extra import api_controller, route
-from ninja_jwt.authentication import JWTAuth
-from ninja.pagination import paginate, PageNumberPagination
+from ninja_extra.pagination import paginate as paginate_extra
+from ninja.pagination import paginate, CursorPagination, PageNumberPagination
 
-from sensors.models import Sensor
-from readings.models import Reading
+from mysite.instrumentation import instrumented
+from mysite.routers import replica_reads
+from sensors.conditional import conditional_get
+from sensors.ownership import acheck_sensor_owner, check_sensor_owner, check_sensors_owner
+from readings.buffer import get_ingest_buffer
+from readings.cold import chunks_in_range, compacted_timestamps, decode_readings, with_cold_readings
+from readings.columnar import FLOAT, INT, TIME, accepts_columnar, columnar_response
+from users.authentication import StatelessJWTAuth
+from readings.export import EXPORT_FORMATS
+from readings.live import parse_event_id, publish_readings, reading_event, sse_stream
+from readings.loader import insert_new_readings
+from readings.models import LatestReading, Reading
+from readings.rollups import add_reading, bucket_series, bucket_series_many, bucket_width_for, refresh_rollups_for
+from readings.sharding import read_alias, reading_db, sensors_by_shard, shard_for_sensor
+from readings.snapshots import add_to_snapshot
+
+# Default and maximum number of buckets returned by the aggregate endpoint
+DEFAULT_AGGREGATE_POINTS = 1_000
+MAX_AGGREGATE_POINTS = 10_000
+
+# Upper bound on readings accepted by one bulk request, and rows per INSERT
+MAX_BULK_READINGS = 10_000
+BULK_BATCH_SIZE = 1_000
+
+# Limits of one multi-sensor batch query: sensors, and raw readings across all of them
+MAX_BATCH_SENSORS = 100
+MAX_BATCH_READINGS = 50_000
+
+DUPLICATE_READING = "Reading already exists for this timestamp"
+
+# Columns of the columnar (Accept: application/vnd.fsninja.columnar) responses
+READING_COLUMNS = (("id", INT), ("timestamp", TIME), ("temperature", FLOAT), ("humidity", FLOAT))
+BUCKET_COLUMNS = (
+    ("bucket_start", TIME),
+    ("count", INT),
+    ("temperature_min", FLOAT),
+    ("temperature_max", FLOAT),
+    ("temperature_avg", FLOAT),
+    ("humidity_min", FLOAT),
+    ("humidity_max", FLOAT),
+    ("humidity_avg", FLOAT),
+)
 
 # ✅ Schemas
 class ReadingIn(Schema):
@@ -22,11 +67,83 @@ class ReadingOut(Schema):
     timestamp: datetime
     sensor_id: int
 
-@api_controller("/sensors/{sensor_id}/readings", tags=["Readings"], auth=JWTAuth())
+class ReadingCursorPageOut(Schema):
+    next: Optional[str]
+    previous: Optional[str]
+    results: List[ReadingOut]
+
+class ReadingBucketOut(Schema):
+    bucket_start: datetime
+    count: int
+    temperature_min: float
+    temperature_max: float
+    temperature_avg: float
+    humidity_min: float
+    humidity_max: float
+    humidity_avg: float
+
+class ReadingConflict(Schema):
+    index: int
+    timestamp: datetime
+    detail: str
+
+class BulkReadingsOut(Schema):
+    created: int
+    conflicts: List[ReadingConflict]
+
+class SensorSeriesOut(Schema):
+    sensor_id: int
+    readings: Optional[List[ReadingOut]] = None
+    buckets: Optional[List[ReadingBucketOut]] = None
+
+class ReadingQueuedOut(Schema):
+    sensor_id: int
+    timestamp: datetime
+
+class IngestBufferOut(Schema):
+    enabled: bool
+    queue_depth: int = 0
+    max_rows: int = 0
+    accepted: int = 0
+    rejected: int = 0
+    flushed: int = 0
+    dropped: int = 0
+    flushes: int = 0
+    last_flush_ms: float = 0.0
+    avg_flush_ms: float = 0.0
+    max_flush_ms: float = 0.0
+
+class SeriesPageNumberPagination(PageNumberPagination):
+    """PageNumberPagination that pages a ReadingSeries (readings/cold.py) of an
+    async route in a worker thread, since it queries the database synchronously"""
+
+    async def apaginate_queryset(self, queryset, pagination, request, **params):
+        if isinstance(queryset, QuerySet):
+            return await super().apaginate_queryset(queryset, pagination, request, **params)
+        return await sync_to_async(self.paginate_queryset)(queryset, pagination, request, **params)
+
+def _readings_validators(controller, sensor_id, **kwargs):
+    """HTTP validators of a sensor's readings: its snapshot's version (readings/snapshots.py)"""
+    check_sensor_owner(controller.context.request.auth, sensor_id)
+    snapshot = (
+        LatestReading.objects.using(reading_db(sensor_id))
+        .filter(sensor_id=sensor_id)
+        .values_list("version", "count", "updated_at")
+        .first()
+    )
+    if snapshot is None:
+        return (), None
+    return snapshot[:2], snapshot[2]
+
+@api_controller("/sensors/{sensor_id}/readings", tags=["Readings"], auth=StatelessJWTAuth())
 class ReadingController:
     """Endpoints for sensor readings"""
 
     @route.get("/", response=List[ReadingOut])
+    @instrumented
+    @replica_reads
+    @conditional_get(_readings_validators)
+    @columnar_response(READING_COLUMNS)
     @paginate(PageNumberPagination, page_size=50)
     def list_readings(
         self,
@@ -34,18 +151,335 @@ class ReadingController:
         timestamp_from: Optional[datetime] = None,
         timestamp_to: Optional[datetime] = None,
     ):
-        """List readings (paginated), with optional time filters"""
-        sensor = get_object_or_404(Sensor, id=sensor_id, owner=self.context.request.auth)
-        qs = Reading.objects.filter(sensor=sensor)
-        if timestamp_from:
-            qs = qs.filter(timestamp__gte=timestamp_from)
-        if timestamp_to:
-            qs = qs.filter(timestamp__lte=timestamp_to)
-        return qs.order_by("timestamp")
-
-    @route.post("/", response=ReadingOut)
+        """List readings (paginated), with optional time filters.
+
+        Includes readings compacted into cold storage (see readings.cold), and
+        is also served in the compact columnar format on request (see
+        readings.columnar).
+        """
+        qs = with_cold_readings(self._readings(sensor_id, timestamp_from, timestamp_to), sensor_id, timestamp_from, timestamp_to)
+        if accepts_columnar(self.context.request):
+            return qs.values_list(*(name for name, _ in READING_COLUMNS))
+        return qs
+
+    # ninja_extra's paginate hands the paginator the real request, which the
+    # cursor paginator needs to build its next/previous links
+    @route.get("/cursor/", response=ReadingCursorPageOut)
+    @instrumented
+    @replica_reads
+    @conditional_get(_readings_validators)
+    @paginate_extra(CursorPagination, ordering=("timestamp",), page_size=50)
+    def list_readings_cursor(
+        self,
+        sensor_id: int,
+        timestamp_from: Optional[datetime] = None,
+        timestamp_to: Optional[datetime] = None,
+    ):
+        """List readings with keyset pagination: opaque next/previous cursors, no total count.
+
+        Timestamps are unique per sensor, so each page is a range scan on the
+        (sensor, timestamp) index and deep pages cost the same as the first.
+        Includes readings compacted into cold storage (see readings.cold).
+        """
+        return with_cold_readings(self._readings(sensor_id, timestamp_from, timestamp_to), sensor_id, timestamp_from, timestamp_to)
+
+    @route.get("/aggregate/", response=List[ReadingBucketOut])
+    @instrumented
+    @replica_reads
+    @conditional_get(_readings_validators)
+    @columnar_response(BUCKET_COLUMNS)
+    def aggregate_readings(
+        self,
+        sensor_id: int,
+        timestamp_from: Optional[datetime] = None,
+        timestamp_to: Optional[datetime] = None,
+        bucket_seconds: Optional[int] = Query(None, ge=1),
+        points: int = Query(DEFAULT_AGGREGATE_POINTS, ge=1, le=MAX_AGGREGATE_POINTS),
+    ):
+        """Downsample readings into time buckets (min/max/avg/count), computed in the database.
+
+        Use ?bucket_seconds= for a fixed bucket width, otherwise the width is
+        chosen so the requested range yields about ?points= buckets (one more
+        when the range does not start on a bucket boundary). Widths of whole
+        hours or days over aligned ranges are served from the rollup tables.
+        Also served in the compact columnar format on request.
+        """
+        qs = self._readings(sensor_id, timestamp_from, timestamp_to)
+
+        width = bucket_seconds
+        if width is None:
+            if timestamp_from is None or timestamp_to is None:
+                bounds = qs.aggregate(first=Min("timestamp"), last=Max("timestamp"))
+                if bounds["first"] is None:
+                    return []
+                timestamp_from = timestamp_from or bounds["first"]
+                timestamp_to = timestamp_to or bounds["last"]
+            width = bucket_width_for((timestamp_to - timestamp_from).total_seconds(), points)
+
+        return bucket_series(qs, sensor_id, width, timestamp_from, timestamp_to)
+
+    @route.get("/export/")
+    @replica_reads
+    @conditional_get(_readings_validators)
+    def export_readings(
+        self,
+        sensor_id: int,
+        timestamp_from: Optional[datetime] = None,
+        timestamp_to: Optional[datetime] = None,
+        export_format: Literal["csv", "ndjson"] = Query("csv", alias="format"),
+    ):
+        """Stream all matching readings, cold ones included, as CSV or newline-delimited JSON with constant memory"""
+        readings = self._readings(sensor_id, timestamp_from, timestamp_to)
+        # Pin the routed database: the body streams after the request's routing scope ends
+        readings = readings.using(readings.db)
+        qs = with_cold_readings(readings, sensor_id, timestamp_from, timestamp_to)
+        content_type, iter_rows = EXPORT_FORMATS[export_format]
+        response = StreamingHttpResponse(iter_rows(qs), content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="sensor-{sensor_id}-readings.{export_format}"'
+        return response
+
+    @route.post("/", response={200: ReadingOut, 202: ReadingQueuedOut, 400: dict, 429: dict})
     def create_reading(self, sensor_id: int, payload: ReadingIn):
-        """Create a new reading for a sensor"""
-        sensor = get_object_or_404(Sensor, id=sensor_id, owner=self.context.request.auth)
-        reading = Reading.objects.create(sensor=sensor, **payload.dict())
-        return reading
\ No newline at end of file
+        """Create a new reading for a sensor; 400 if one exists for its timestamp.
+
+        With buffered ingest enabled the reading is queued and written in a
+        later batch: answers 202, or 429 while the buffer is full.
+        """
+        check_sensor_owner(self.context.request.auth, sensor_id, for_write=True)
+        buffer = get_ingest_buffer()
+        if buffer is not None:
+            return _queue_reading(buffer, sensor_id, payload)
+        return _store_reading(sensor_id, payload.dict())
+
+    # Async twins of the ingest and list routes, for ASGI deployments. They
+    # live on their own paths because a path is served either sync or async.
+    @route.get("/async/", response=List[ReadingOut])
+    @instrumented
+    @replica_reads
+    @conditional_get(_readings_validators)
+    @paginate(SeriesPageNumberPagination, page_size=50)
+    async def list_readings_async(
+        self,
+        sensor_id: int,
+        timestamp_from: Optional[datetime] = None,
+        timestamp_to: Optional[datetime] = None,
+    ):
+        """List readings (paginated) without holding a worker thread per request, cold ones included"""
+        await acheck_sensor_owner(self.context.request.auth, sensor_id)
+        using = await sync_to_async(reading_db)(sensor_id)
+        qs = _filter_readings(sensor_id, timestamp_from, timestamp_to, using)
+        return await sync_to_async(with_cold_readings)(qs, sensor_id, timestamp_from, timestamp_to)
+
+    @route.post("/async/", response={200: ReadingOut, 202: ReadingQueuedOut, 400: dict, 429: dict})
+    async def create_reading_async(self, sensor_id: int, payload: ReadingIn):
+        """Create a new reading for a sensor without holding a worker thread per request"""
+        await acheck_sensor_owner(self.context.request.auth, sensor_id, for_write=True)
+        buffer = get_ingest_buffer()
+        if buffer is not None:
+            return _queue_reading(buffer, sensor_id, payload)
+        # The async ORM has no transactions; run the insert + rollup update as one sync unit
+        return await sync_to_async(_store_reading)(sensor_id, payload.dict())
+
+    @route.get("/stream/", response={501: dict})
+    async def stream_readings(self, sensor_id: int, since: Optional[datetime] = None):
+        """Push the sensor's new readings as server-sent events (text/event-stream).
+
+        Each event is a ``reading`` whose data is a reading object (id is null
+        for readings written by batch routes) and whose id is its timestamp.
+        Reconnecting clients resume with Last-Event-ID, or ?since=, and get
+        the readings they missed first. Answers 501 unless served under ASGI:
+        a WSGI server collects an async stream whole before sending it, so an
+        endless one would hold a worker forever and never send a byte.
+        """
+        await acheck_sensor_owner(self.context.request.auth, sensor_id)
+        if not isinstance(self.context.request, ASGIRequest):
+            return 501, {"error": "Live streams need an ASGI server, e.g. uvicorn (make up-asgi)"}
+        since = parse_event_id(self.context.request.headers.get("Last-Event-ID")) or since
+        response = StreamingHttpResponse(sse_stream(sensor_id, since), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    @route.post("/bulk/", response={200: BulkReadingsOut, 400: dict})
+    def create_readings_bulk(self, sensor_id: int, payload: List[ReadingIn]):
+        """Create many readings in one transaction, reporting duplicate timestamps per row"""
+        if len(payload) > MAX_BULK_READINGS:
+            return 400, {"error": f"At most {MAX_BULK_READINGS} readings per request"}
+
+        check_sensor_owner(self.context.request.auth, sensor_id, for_write=True)
+        using = shard_for_sensor(sensor_id)
+
+        conflicts = []
+        pending = {}
+        for index, item in enumerate(payload):
+            timestamp = item.timestamp
+            if timezone.is_naive(timestamp):
+                timestamp = timezone.make_aware(timestamp)
+            if timestamp in pending:
+                conflicts.append({"index": index, "timestamp": timestamp, "detail": "Duplicate timestamp in batch"})
+                continue
+            pending[timestamp] = (index, item)
+
+        with transaction.atomic(using=using):
+            # One lookup per batch instead of one per row; the unique index serves it.
+            timestamps = list(pending)
+            existing = set()
+            for start in range(0, len(timestamps), BULK_BATCH_SIZE):
+                existing.update(
+                    Reading.objects.using(using).filter(
+                        sensor_id=sensor_id,
+                        timestamp__in=timestamps[start:start + BULK_BATCH_SIZE],
+                    ).values_list("timestamp", flat=True)
+                )
+            # Compacted readings (readings/cold.py) are outside the unique index
+            existing.update(compacted_timestamps(sensor_id, timestamps, using, lock=True))
+
+            readings = []
+            for timestamp, (index, item) in pending.items():
+                if timestamp in existing:
+                    conflicts.append({"index": index, "timestamp": timestamp, "detail": DUPLICATE_READING})
+                    continue
+                readings.append(
+                    Reading(
+                        sensor_id=sensor_id,
+                        temperature=item.temperature,
+                        humidity=item.humidity,
+                        timestamp=timestamp,
+                    )
+                )
+
+            # Rows a concurrent writer inserted after the lookup above are conflicts too
+            inserted = insert_new_readings(readings, using, batch_size=BULK_BATCH_SIZE)
+            if len(inserted) < len(readings):
+                written = {reading.timestamp for reading in inserted}
+                for reading in readings:
+                    if reading.timestamp not in written:
+                        index = pending[reading.timestamp][0]
+                        conflicts.append({"index": index, "timestamp": reading.timestamp, "detail": DUPLICATE_READING})
+                readings = inserted
+            refresh_rollups_for(((sensor_id, reading.timestamp) for reading in readings), using=using)
+            publish_readings(
+                (
+                    reading_event(sensor_id, reading.timestamp, reading.temperature, reading.humidity)
+                    for reading in readings
+                ),
+                using=using,
+            )
+
+        conflicts.sort(key=lambda conflict: conflict["index"])
+        return {"created": len(readings), "conflicts": conflicts}
+
+    def _readings(self, sensor_id, timestamp_from=None, timestamp_to=None):
+        """Readings of a sensor owned by the current user, within the optional time range"""
+        check_sensor_owner(self.context.request.auth, sensor_id)
+        return _filter_readings(sensor_id, timestamp_from, timestamp_to, reading_db(sensor_id))
+
+
+@api_controller("/readings", tags=["Readings"], auth=StatelessJWTAuth())
+class ReadingBatchController:
+    """Readings of several sensors in one request"""
+
+    @route.get("/batch/", response={200: List[SensorSeriesOut], 400: dict})
+    @instrumented
+    @replica_reads
+    def batch_readings(
+        self,
+        sensor_ids: List[int] = Query(..., alias="sensor_id"),
+        timestamp_from: Optional[datetime] = None,
+        timestamp_to: Optional[datetime] = None,
+        bucket_seconds: Optional[int] = Query(None, ge=1),
+    ):
+        """Series of many sensors (?sensor_id=1&sensor_id=2...) over one time window.
+
+        Returns raw readings per sensor, or ``buckets`` of ?bucket_seconds= when
+        given, in the order the sensors were requested. The sensors of each
+        reading shard (readings/sharding.py) are fetched by one grouped
+        ``sensor_id IN (...)`` query, and the shards' results merged.
+        """
+        sensor_ids = list(dict.fromkeys(sensor_ids))
+        if len(sensor_ids) > MAX_BATCH_SENSORS:
+            return 400, {"error": f"At most {MAX_BATCH_SENSORS} sensors per request"}
+        check_sensors_owner(self.context.request.auth, sensor_ids)
+
+        shards = {}
+        for shard, ids in sensors_by_shard(sensor_ids).items():
+            qs = Reading.objects.using(read_alias(shard)).filter(sensor_id__in=ids)
+            if timestamp_from:
+                qs = qs.filter(timestamp__gte=timestamp_from)
+            if timestamp_to:
+                qs = qs.filter(timestamp__lte=timestamp_to)
+            shards[qs.db] = (ids, qs)
+
+        if bucket_seconds is not None:
+            series = {}
+            for ids, qs in shards.values():
+                series.update(bucket_series_many(qs, ids, bucket_seconds, timestamp_from, timestamp_to))
+            return [{"sensor_id": sensor_id, "buckets": series.get(sensor_id, [])} for sensor_id in sensor_ids]
+
+        series = {}
+        cold = {}
+        for using, (ids, qs) in shards.items():
+            for reading in qs.order_by("sensor_id", "timestamp")[:MAX_BATCH_READINGS + 1]:
+                series.setdefault(reading.sensor_id, []).append(reading)
+            for chunk in chunks_in_range(ids, timestamp_from, timestamp_to, using):
+                cold.setdefault(chunk.sensor_id, []).extend(decode_readings(chunk, timestamp_from, timestamp_to))
+        for sensor_id, readings in cold.items():
+            # Compacted readings (readings/cold.py); raw ones win on equal timestamps
+            merged = {reading.timestamp: reading for reading in readings}
+            merged.update((reading.timestamp, reading) for reading in series.get(sensor_id, []))
+            series[sensor_id] = [merged[timestamp] for timestamp in sorted(merged)]
+        if sum(len(readings) for readings in series.values()) > MAX_BATCH_READINGS:
+            return 400, {"error": f"More than {MAX_BATCH_READINGS} readings; narrow the window or pass bucket_seconds"}
+        return [{"sensor_id": sensor_id, "readings": series.get(sensor_id, [])} for sensor_id in sensor_ids]
+
+
+@api_controller("/ingest", tags=["Readings"], auth=StatelessJWTAuth())
+class IngestController:
+    """Operational view of buffered ingest"""
+
+    @route.get("/buffer/", response=IngestBufferOut)
+    def buffer_metrics(self):
+        """Queue depth, accepted/rejected/flushed counters and flush latency of this process"""
+        buffer = get_ingest_buffer()
+        if buffer is None:
+            return {"enabled": False}
+        return {"enabled": True, **buffer.metrics()}
+
+
+def _filter_readings(sensor_id, timestamp_from=None, timestamp_to=None, using=None):
+    qs = Reading.objects.using(using).filter(sensor_id=sensor_id)
+    if timestamp_from:
+        qs = qs.filter(timestamp__gte=timestamp_from)
+    if timestamp_to:
+        qs = qs.filter(timestamp__lte=timestamp_to)
+    return qs
+
+
+def _queue_reading(buffer, sensor_id, payload):
+    timestamp = payload.timestamp
+    if timezone.is_naive(timestamp):
+        timestamp = timezone.make_aware(timestamp)
+    if not buffer.offer((sensor_id, timestamp, payload.temperature, payload.humidity)):
+        return 429, {"error": "Ingest buffer is full, retry later"}
+    return 202, {"sensor_id": sensor_id, "timestamp": timestamp}
+
+
+def _store_reading(sensor_id, data):
+    """Insert one reading on the sensor's shard and fold it into the rollups and snapshot atomically"""
+    using = shard_for_sensor(sensor_id)
+    try:
+        with transaction.atomic(using=using):
+            # Compacted readings (readings/cold.py) are outside the unique index
+            if compacted_timestamps(sensor_id, [data["timestamp"]], using, lock=True):
+                return 400, {"error": DUPLICATE_READING}
+            reading = Reading.objects.using(using).create(sensor_id=sensor_id, **data)
+            add_reading(reading, using=using)
+            add_to_snapshot(reading, using=using)
+            publish_readings(
+                [reading_event(sensor_id, reading.timestamp, reading.temperature, reading.humidity, id=reading.id)],
+                using=using,
+            )
+    except IntegrityError:
+        return 400, {"error": DUPLICATE_READING}
+    return reading
+
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ReadingsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'readings'
+
+    def ready(self):
+        from readings import signals  # noqa: F401
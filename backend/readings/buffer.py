@@ -0,0 +1,183 @@
+# readings/buffer.py
+"""Write-behind buffer for single-reading ingest.
+
+When ``settings.READINGS_INGEST_BUFFER["ENABLED"]`` is true, the create-reading
+routes validate a reading, queue it here and answer 202; a background thread
+writes queued readings with one ``upsert_readings`` call per batch. Settings:
+
+    ENABLED            turn buffered ingest on
+    MAX_ROWS           readings held in memory before ingest answers 429
+    BATCH_SIZE         readings per upsert; a full batch wakes the flusher early
+    FLUSH_INTERVAL_MS  longest a reading waits before being written
+
+Buffered readings are upserted, so a repeated (sensor, timestamp) overwrites
+the stored values instead of failing. Queued readings live in this process
+only: they are flushed when the interpreter exits normally, and lost if it is
+killed.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import close_old_connections, connection
+
+from readings.loader import upsert_readings
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "ENABLED": False,
+    "MAX_ROWS": 50_000,
+    "BATCH_SIZE": 1_000,
+    "FLUSH_INTERVAL_MS": 200,
+}
+
+
+class IngestBuffer:
+    """Bounded in-process queue of readings with a periodic batch flusher"""
+
+    def __init__(self, max_rows, batch_size, flush_interval, writer=upsert_readings):
+        self.max_rows = max_rows
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.writer = writer
+        self._rows = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {
+            "accepted": 0,
+            "rejected": 0,
+            "flushed": 0,
+            "dropped": 0,
+            "flushes": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+        }
+
+    def offer(self, row):
+        """Queue a ``(sensor_id, timestamp, temperature, humidity)`` row; False when full"""
+        with self._lock:
+            if len(self._rows) >= self.max_rows:
+                self._stats["rejected"] += 1
+                return False
+            self._rows.append(row)
+            self._stats["accepted"] += 1
+            depth = len(self._rows)
+            if self._thread is None and not self._stop.is_set():
+                self._start()
+        if depth >= self.batch_size:
+            self._wake.set()
+        return True
+
+    def flush(self):
+        """Write everything queued so far, one batch at a time; returns rows written"""
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    count = min(len(self._rows), self.batch_size)
+                    batch = [self._rows.popleft() for _ in range(count)]
+                if not batch:
+                    return written
+                written += self._write(batch)
+
+    def close(self, timeout=10):
+        """Stop the flusher and write whatever is still queued"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.flush()
+
+    def metrics(self):
+        with self._lock:
+            stats = dict(self._stats, queue_depth=len(self._rows), max_rows=self.max_rows)
+        flushes = stats.pop("flushes")
+        total_ms = stats.pop("total_flush_ms")
+        stats["flushes"] = flushes
+        stats["avg_flush_ms"] = total_ms / flushes if flushes else 0.0
+        return stats
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name="readings-ingest-flusher", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                self._wake.wait(self.flush_interval)
+                self._wake.clear()
+                close_old_connections()
+                try:
+                    self.flush()
+                except Exception:
+                    logger.exception("Readings ingest flush failed")
+        finally:
+            connection.close()
+
+    def _write(self, batch):
+        started = time.perf_counter()
+        try:
+            written = self.writer(batch)
+            dropped = 0
+        except Exception:
+            # One bad row (e.g. its sensor was deleted meanwhile) must not sink the batch
+            logger.exception("Batch of %d buffered readings failed; retrying row by row", len(batch))
+            written = dropped = 0
+            for row in batch:
+                try:
+                    written += self.writer([row])
+                except Exception:
+                    dropped += 1
+            if dropped:
+                logger.error("Dropped %d buffered readings that could not be written", dropped)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._stats["flushed"] += written
+            self._stats["dropped"] += dropped
+            self._stats["flushes"] += 1
+            self._stats["last_flush_ms"] = elapsed_ms
+            self._stats["max_flush_ms"] = max(self._stats["max_flush_ms"], elapsed_ms)
+            self._stats["total_flush_ms"] += elapsed_ms
+        return written
+
+
+_ingest_buffer = None
+_ingest_buffer_lock = threading.Lock()
+
+
+def get_ingest_buffer():
+    """The process-wide buffer, or None when buffered ingest is disabled"""
+    global _ingest_buffer
+    config = {**DEFAULTS, **getattr(settings, "READINGS_INGEST_BUFFER", {})}
+    if not config["ENABLED"]:
+        return None
+    if _ingest_buffer is None:
+        with _ingest_buffer_lock:
+            if _ingest_buffer is None:
+                _ingest_buffer = IngestBuffer(
+                    config["MAX_ROWS"],
+                    config["BATCH_SIZE"],
+                    config["FLUSH_INTERVAL_MS"] / 1000,
+                )
+                atexit.register(_ingest_buffer.close)
+    return _ingest_buffer
+
+
+def _reset_ingest_buffer(*, setting, **kwargs):
+    global _ingest_buffer
+    if setting == "READINGS_INGEST_BUFFER" and _ingest_buffer is not None:
+        buffer, _ingest_buffer = _ingest_buffer, None
+        atexit.unregister(buffer.close)
+        buffer.close()
+
+
+setting_changed.connect(_reset_ingest_buffer)
@@ -0,0 +1,184 @@
+# readings/codec.py
+"""Gorilla-style compression of one sensor's readings (see ReadingChunk).
+
+A chunk is ``struct("<BI")`` (format version, row count) followed by one
+bitstream holding four columns in turn:
+
+    ids, timestamps   first value in 64 bits, then delta-of-deltas in
+                      variable-width buckets (regular series cost 1 bit/row)
+    temperature,      first value's IEEE 754 bits, then each value XORed with
+    humidity          the previous one, storing only the changed bits
+
+Timestamps are integer microseconds since the Unix epoch, and float values
+round-trip bit for bit.
+"""
+import struct
+
+VERSION = 1
+HEADER = struct.Struct("<BI")
+
+# (prefix, prefix bits, value bits) for delta-of-delta buckets, smallest first
+DOD_BUCKETS = (
+    (0b10, 2, 7),
+    (0b110, 3, 9),
+    (0b1110, 4, 12),
+    (0b11110, 5, 32),
+)
+# Wide enough for any delta-of-delta between 64-bit values
+DOD_FALLBACK = (0b11111, 5, 67)
+
+MASK64 = (1 << 64) - 1
+
+
+class BitWriter:
+    def __init__(self):
+        self._out = bytearray()
+        self._acc = 0
+        self._bits = 0
+
+    def write(self, value, bits):
+        self._acc = (self._acc << bits) | (value & ((1 << bits) - 1))
+        self._bits += bits
+        while self._bits >= 8:
+            self._bits -= 8
+            self._out.append((self._acc >> self._bits) & 0xFF)
+        self._acc &= (1 << self._bits) - 1
+
+    def getvalue(self):
+        if self._bits:
+            return bytes(self._out) + bytes([(self._acc << (8 - self._bits)) & 0xFF])
+        return bytes(self._out)
+
+
+class BitReader:
+    def __init__(self, data, offset=0):
+        self._data = data
+        self._pos = offset * 8
+
+    def read(self, bits):
+        start, end = self._pos, self._pos + bits
+        first, last = start >> 3, (end + 7) >> 3
+        window = int.from_bytes(self._data[first:last], "big")
+        self._pos = end
+        return (window >> (last * 8 - end)) & ((1 << bits) - 1)
+
+
+def _signed(value, bits):
+    return value - (1 << bits) if value >> (bits - 1) else value
+
+
+def _write_integers(writer, values):
+    previous = previous_delta = 0
+    for index, value in enumerate(values):
+        if index == 0:
+            writer.write(value & MASK64, 64)
+            previous = value
+            continue
+        delta = value - previous
+        dod = delta - previous_delta
+        previous, previous_delta = value, delta
+        if dod == 0:
+            writer.write(0, 1)
+            continue
+        for prefix, prefix_bits, bits in DOD_BUCKETS + (DOD_FALLBACK,):
+            if -(1 << (bits - 1)) <= dod < (1 << (bits - 1)):
+                break
+        writer.write(prefix, prefix_bits)
+        writer.write(dod, bits)
+
+
+def _read_integers(reader, count):
+    values = []
+    previous = previous_delta = 0
+    for index in range(count):
+        if index == 0:
+            previous = _signed(reader.read(64), 64)
+            values.append(previous)
+            continue
+        dod = 0
+        if reader.read(1):
+            # Each further 1 bit of the prefix moves on to the next bucket
+            bits = DOD_FALLBACK[2]
+            for _, _, bucket_bits in DOD_BUCKETS:
+                if not reader.read(1):
+                    bits = bucket_bits
+                    break
+            dod = _signed(reader.read(bits), bits)
+        previous_delta += dod
+        previous += previous_delta
+        values.append(previous)
+    return values
+
+
+def _float_bits(value):
+    return struct.unpack("<Q", struct.pack("<d", value))[0]
+
+
+def _write_floats(writer, values):
+    previous = None
+    leading = trailing = None
+    for value in values:
+        bits = _float_bits(value)
+        if previous is None:
+            writer.write(bits, 64)
+            previous = bits
+            continue
+        xor = bits ^ previous
+        previous = bits
+        if xor == 0:
+            writer.write(0, 1)
+            continue
+        lead = min(64 - xor.bit_length(), 31)
+        trail = (xor & -xor).bit_length() - 1
+        if leading is not None and lead >= leading and trail >= trailing:
+            writer.write(0b10, 2)
+            writer.write(xor >> trailing, 64 - leading - trailing)
+            continue
+        leading, trailing = lead, trail
+        meaningful = 64 - lead - trail
+        writer.write(0b11, 2)
+        writer.write(lead, 5)
+        writer.write(meaningful & 0x3F, 6)  # 64 is stored as 0
+        writer.write(xor >> trail, meaningful)
+
+
+def _read_floats(reader, count):
+    values = []
+    previous = 0
+    leading = trailing = 0
+    for index in range(count):
+        if index == 0:
+            previous = reader.read(64)
+        elif reader.read(1):
+            if reader.read(1):
+                leading = reader.read(5)
+                meaningful = reader.read(6) or 64
+                trailing = 64 - leading - meaningful
+            previous ^= reader.read(64 - leading - trailing) << trailing
+        values.append(struct.unpack("<d", struct.pack("<Q", previous))[0])
+    return values
+
+
+def encode_chunk(rows):
+    """Encode ``(id, timestamp_us, temperature, humidity)`` rows (ordered by timestamp)"""
+    ids, timestamps, temperatures, humidities = zip(*rows) if rows else ((), (), (), ())
+    writer = BitWriter()
+    _write_integers(writer, ids)
+    _write_integers(writer, timestamps)
+    _write_floats(writer, temperatures)
+    _write_floats(writer, humidities)
+    return HEADER.pack(VERSION, len(rows)) + writer.getvalue()
+
+
+def decode_chunk(data):
+    """Inverse of encode_chunk: a list of ``(id, timestamp_us, temperature, humidity)``"""
+    data = bytes(data)
+    version, count = HEADER.unpack_from(data)
+    if version != VERSION:
+        raise ValueError(f"Unsupported reading chunk version {version}")
+    reader = BitReader(data, HEADER.size)
+    ids = _read_integers(reader, count)
+    timestamps = _read_integers(reader, count)
+    temperatures = _read_floats(reader, count)
+    humidities = _read_floats(reader, count)
+    return list(zip(ids, timestamps, temperatures, humidities))
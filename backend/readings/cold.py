@@ -0,0 +1,461 @@
+# readings/cold.py
+"""Cold storage tier: raw readings compacted into per-sensor daily chunks.
+
+``compact_day`` moves one sensor's readings of one UTC day into a
+ReadingChunk, merging with any chunk already stored for that day, and deletes
+the raw rows. Reads stay transparent:
+
+- ``with_cold_readings`` wraps a readings queryset so listings (page, cursor
+  and async) and export see raw and compacted readings merged in timestamp
+  order;
+- ``cold_aggregates`` lets rollup refreshes and raw-reading aggregates count
+  compacted readings too;
+- ``compacted_timestamps`` lets ingest reject duplicates of compacted
+  readings, which the raw table's unique constraint no longer sees.
+
+A raw reading written after its day was compacted shadows the compacted one
+with the same timestamp: reads and aggregates count only the raw one.
+
+Rollups are left untouched by compaction, since the readings they summarise
+do not change.
+"""
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from readings.codec import decode_chunk, encode_chunk
+from readings.models import Reading, ReadingChunk
+
+UTC = dt_timezone.utc
+DAY = timedelta(days=1)
+EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def _utc(value):
+    if value is None:
+        return None
+    return (timezone.make_aware(value) if timezone.is_naive(value) else value).astimezone(UTC)
+
+
+def day_start(day):
+    return datetime.combine(day, time.min, tzinfo=UTC)
+
+
+def _to_us(value):
+    return (value - EPOCH) // MICROSECOND
+
+
+def _from_us(value):
+    return EPOCH + timedelta(microseconds=value)
+
+
+def chunks_in_range(sensor_ids=None, start=None, end=None, using=DEFAULT_DB_ALIAS):
+    """Chunks holding readings in [start, end] (inclusive; None is unbounded)"""
+    start, end = _utc(start), _utc(end)
+    chunks = ReadingChunk.objects.using(using)
+    if sensor_ids is not None:
+        chunks = chunks.filter(sensor_id__in=sensor_ids)
+    if start is not None:
+        chunks = chunks.filter(day__gte=start.date(), last_timestamp__gte=start)
+    if end is not None:
+        chunks = chunks.filter(day__lte=end.date(), first_timestamp__lte=end)
+    return chunks.order_by("sensor_id", "day")
+
+
+def decode_readings(chunk, start=None, end=None):
+    """Unsaved Reading instances of a chunk within [start, end], in timestamp order"""
+    start, end = _utc(start), _utc(end)
+    readings = []
+    for id_, timestamp_us, temperature, humidity in decode_chunk(chunk.data):
+        timestamp = _from_us(timestamp_us)
+        if start is not None and timestamp < start:
+            continue
+        if end is not None and timestamp > end:
+            break
+        readings.append(Reading(
+            id=id_,
+            sensor_id=chunk.sensor_id,
+            timestamp=timestamp,
+            temperature=temperature,
+            humidity=humidity,
+        ))
+    return readings
+
+
+def compacted_timestamps(sensor_id, timestamps, using=DEFAULT_DB_ALIAS, lock=False):
+    """Those of ``timestamps`` held in the sensor's chunks; ``lock`` locks the chunks
+    read until the end of the transaction, holding off a concurrent ``compact_day``"""
+    timestamps = {_utc(timestamp) for timestamp in timestamps}
+    if not timestamps:
+        return set()
+    chunks = ReadingChunk.objects.using(using).filter(
+        sensor_id=sensor_id, day__in={timestamp.date() for timestamp in timestamps}
+    )
+    if lock:
+        chunks = chunks.select_for_update()
+    found = set()
+    for chunk in chunks:
+        found.update(reading.timestamp for reading in decode_readings(chunk) if reading.timestamp in timestamps)
+    return found
+
+
+def _raw_timestamps(chunk, using):
+    """Timestamps of the chunk's readings that a raw reading shadows"""
+    return {
+        _utc(timestamp)
+        for timestamp in Reading.objects.using(using)
+        .filter(sensor_id=chunk.sensor_id, timestamp__gte=chunk.first_timestamp, timestamp__lte=chunk.last_timestamp)
+        .values_list("timestamp", flat=True)
+    }
+
+
+def compactable_days(before, sensor_ids=None, using=DEFAULT_DB_ALIAS):
+    """``(sensor_id, day)`` pairs with raw readings on UTC days ending by ``before``"""
+    cutoff = day_start(_utc(before).date())
+    readings = Reading.objects.using(using).filter(timestamp__lt=cutoff)
+    if sensor_ids is not None:
+        readings = readings.filter(sensor_id__in=sensor_ids)
+    return (
+        readings.annotate(day=TruncDate("timestamp", tzinfo=UTC))
+        .values_list("sensor_id", "day")
+        .distinct()
+        .order_by("sensor_id", "day")
+    )
+
+
+def compact_day(sensor_id, day, using=DEFAULT_DB_ALIAS):
+    """Move a sensor's raw readings of one UTC day into its chunk; returns rows moved.
+
+    A raw reading replaces a compacted one with the same timestamp, as it can
+    only have been written later.
+    """
+    lower = day_start(day)
+    with transaction.atomic(using=using):
+        raw = list(
+            Reading.objects.using(using)
+            .filter(sensor_id=sensor_id, timestamp__gte=lower, timestamp__lt=lower + DAY)
+            .order_by("timestamp")
+        )
+        if not raw:
+            return 0
+        chunk = ReadingChunk.objects.using(using).select_for_update().filter(sensor_id=sensor_id, day=day).first()
+
+        merged = {}
+        if chunk is not None:
+            merged.update((reading.timestamp, reading) for reading in decode_readings(chunk))
+        merged.update((_utc(reading.timestamp), reading) for reading in raw)
+        readings = [merged[timestamp] for timestamp in sorted(merged)]
+
+        ReadingChunk.objects.using(using).update_or_create(
+            sensor_id=sensor_id,
+            day=day,
+            defaults={
+                "first_timestamp": readings[0].timestamp,
+                "last_timestamp": readings[-1].timestamp,
+                "count": len(readings),
+                "data": encode_chunk([
+                    (reading.id, _to_us(_utc(reading.timestamp)), reading.temperature, reading.humidity)
+                    for reading in readings
+                ]),
+            },
+        )
+        # By id, so readings inserted since the select above stay in the raw table
+        Reading.objects.using(using).filter(
+            sensor_id=sensor_id,
+            timestamp__gte=lower,
+            timestamp__lt=lower + DAY,
+            id__in=[reading.id for reading in raw],
+        ).delete()
+    return len(raw)
+
+
+def cold_aggregates(sensor_ids, start, end, width, using=DEFAULT_DB_ALIAS):
+    """Rollup-style aggregates of compacted readings in [start, end], keyed by
+    ``(sensor_id, bucket epoch seconds)`` for buckets ``width`` seconds wide.
+    Readings shadowed by raw ones are left out, so merging with raw aggregates
+    counts each timestamp once."""
+    buckets = {}
+    for chunk in chunks_in_range(sensor_ids, start, end, using):
+        shadowed = _raw_timestamps(chunk, using)
+        for reading in decode_readings(chunk, start, end):
+            if reading.timestamp in shadowed:
+                continue
+            key = (reading.sensor_id, _to_us(reading.timestamp) // 1_000_000 // width * width)
+            single = {
+                "count": 1,
+                "temperature_min": reading.temperature,
+                "temperature_max": reading.temperature,
+                "temperature_sum": reading.temperature,
+                "humidity_min": reading.humidity,
+                "humidity_max": reading.humidity,
+                "humidity_sum": reading.humidity,
+            }
+            if key in buckets:
+                _combine(buckets[key], single)
+            else:
+                buckets[key] = single
+    return buckets
+
+
+def _combine(bucket, other):
+    bucket["count"] += other["count"]
+    for column in ("temperature", "humidity"):
+        bucket[f"{column}_min"] = min(bucket[f"{column}_min"], other[f"{column}_min"])
+        bucket[f"{column}_max"] = max(bucket[f"{column}_max"], other[f"{column}_max"])
+        bucket[f"{column}_sum"] += other[f"{column}_sum"]
+
+
+def merge_aggregates(rows, cold, sensor_id=None):
+    """Fold ``cold_aggregates`` into aggregate rows (dicts with "bucket" and, unless
+    ``sensor_id`` is given, "sensor_id"); buckets only present in ``cold`` follow"""
+    cold = dict(cold)
+    for row in rows:
+        extra = cold.pop((row.get("sensor_id", sensor_id), row["bucket"]), None)
+        if extra is not None:
+            _combine(row, extra)
+        yield row
+    for (row_sensor_id, bucket), aggregates in cold.items():
+        yield {"sensor_id": row_sensor_id, "bucket": bucket, **aggregates}
+
+
+def with_cold_readings(queryset, sensor_id, start=None, end=None):
+    """``queryset`` (one sensor's readings in [start, end]) plus its compacted readings.
+
+    Returns the queryset itself, ordered by timestamp, when no chunk overlaps
+    the range.
+    """
+    queryset = queryset.order_by("timestamp")
+    chunks = list(chunks_in_range([sensor_id], start, end, queryset.db).defer("data"))
+    if not chunks:
+        return queryset
+    return ReadingSeries(queryset, chunks, _utc(start), _utc(end))
+
+
+class ReadingSeries:
+    """Raw and compacted readings of one sensor, in timestamp order.
+
+    Implements the queryset subset the paginators and exporters rely on:
+    ``count()``, ``len()``, slicing, ``values_list()`` and ``iterator()``, plus
+    the timestamp ``order_by()`` and ``filter()`` cursor pagination uses. Each
+    chunk's UTC day is a segment of its own; the raw readings between chunk
+    days are sliced in the database, so only the chunks a page or export
+    touches get decoded.
+
+    Slices walk the segments from the series' start and stop once filled, so
+    a cursor page costs one LIMIT query per raw stretch it reaches and no
+    count; raw stretches are only counted when a deep slice offset skips
+    them whole. ``count()`` counts every segment, and slices reuse those counts
+    once taken.
+    """
+
+    def __init__(self, queryset, chunks, start, end, fields=None, descending=False):
+        self._raw = queryset
+        self._chunks = chunks
+        self._start = start
+        self._end = end
+        self._fields = fields
+        self._descending = descending
+        self._segment_cache = None
+        self._day_cache = {}
+
+    def _clone(self, **changes):
+        state = {
+            "queryset": self._raw,
+            "chunks": self._chunks,
+            "start": self._start,
+            "end": self._end,
+            "fields": self._fields,
+            "descending": self._descending,
+        }
+        return ReadingSeries(**{**state, **changes})
+
+    def all(self):
+        return self
+
+    def values_list(self, *fields):
+        return self._clone(fields=fields)
+
+    def order_by(self, *fields):
+        if fields not in (("timestamp",), ("-timestamp",)):
+            raise TypeError("ReadingSeries can only be ordered by timestamp")
+        return self._clone(descending=fields[0].startswith("-"))
+
+    def filter(self, **lookups):
+        start, end = self._start, self._end
+        for lookup, value in lookups.items():
+            value = _utc(parse_datetime(value) if isinstance(value, str) else value)
+            if lookup == "timestamp__gte":
+                start = value if start is None else max(start, value)
+            elif lookup == "timestamp__lte":
+                end = value if end is None else min(end, value)
+            else:
+                raise TypeError(f"ReadingSeries does not support the {lookup} lookup")
+        raw = self._raw
+        if start is not None:
+            raw = raw.filter(timestamp__gte=start)
+        if end is not None:
+            raw = raw.filter(timestamp__lte=end)
+        chunks = [
+            chunk for chunk in self._chunks
+            if (start is None or chunk.last_timestamp >= start) and (end is None or chunk.first_timestamp <= end)
+        ]
+        return self._clone(queryset=raw, chunks=chunks, start=start, end=end)
+
+    def count(self):
+        return sum(count for _, _, count, _ in self._segments())
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        return self.iterator()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice) or key.step is not None:
+            raise TypeError("ReadingSeries only supports slicing without a step")
+        start = key.start or 0
+        if key.stop is not None and self._segment_cache is None:
+            return self._walk(start, key.stop)
+        stop = key.stop if key.stop is not None else self.count()
+        if self._descending:
+            total = self.count()
+            return self._slice(max(total - stop, 0), max(total - start, 0))[::-1]
+        return self._slice(start, stop)
+
+    def _slice(self, start, stop):
+        """Rows ``start`` to ``stop`` in ascending timestamp order"""
+        rows = []
+        position = 0
+        for lower, upper, count, chunk in self._segments():
+            first, position = position, position + count
+            if position <= start:
+                continue
+            if first >= stop:
+                break
+            begin, end = max(start - first, 0), min(stop, position) - first
+            if chunk is None:
+                rows.extend(self._stretch(lower, upper)[begin:end])
+            else:
+                rows.extend(self._output(self._day(chunk)[begin:end]))
+        return rows
+
+    def _walk(self, start, stop):
+        """Rows ``start`` to ``stop`` in the series' order, without counting what follows"""
+        segments = list(self._bounds())
+        if self._descending:
+            segments.reverse()
+        rows = []
+        skip, wanted = start, stop - start
+        for lower, upper, chunk in segments:
+            if wanted <= 0:
+                break
+            if chunk is None:
+                stretch = self._stretch(lower, upper)
+                if self._descending:
+                    stretch = stretch.order_by("-timestamp")
+                if skip <= wanted:
+                    # A cursor's small offset: read past it rather than count
+                    head = list(stretch[:skip + wanted])
+                    page, skip = head[skip:], max(skip - len(head), 0)
+                else:
+                    page = list(stretch[skip:skip + wanted])
+                    if not page:
+                        skip = max(skip - stretch.count(), 0)
+                        continue
+                    skip = 0
+            else:
+                day = self._day(chunk)[::-1] if self._descending else self._day(chunk)
+                page = self._output(day[skip:skip + wanted])
+                skip = max(skip - len(day), 0)
+            rows.extend(page)
+            wanted -= len(page)
+        return rows
+
+    def iterator(self, chunk_size=2000):
+        if self._descending:
+            yield from self[:]
+            return
+        for lower, upper, _, chunk in self._segments():
+            if chunk is None:
+                yield from self._stretch(lower, upper).iterator(chunk_size=chunk_size)
+            else:
+                yield from self._output(self._day(chunk))
+
+    def _segments(self):
+        """``(lower, upper, count, chunk)`` per segment; chunk is None for raw stretches"""
+        if self._segment_cache is not None:
+            return self._segment_cache
+        raw_days = dict(
+            self._raw.order_by()
+            .annotate(day=TruncDate("timestamp", tzinfo=UTC))
+            .values("day")
+            .annotate(rows=Count("id"))
+            .values_list("day", "rows")
+        )
+
+        def raw_count(lower, upper):
+            return sum(
+                rows for day, rows in raw_days.items()
+                if (lower is None or day >= lower.date()) and (upper is None or day < upper.date())
+            )
+
+        segments = []
+        lower = None
+        for chunk in self._chunks:
+            upper = day_start(chunk.day)
+            count = raw_count(lower, upper)
+            if count:
+                segments.append((lower, upper, count, None))
+            if raw_days.get(chunk.day) or not self._covers(chunk):
+                count = len(self._day(chunk))
+            else:
+                count = chunk.count
+            segments.append((upper, upper + DAY, count, chunk))
+            lower = upper + DAY
+        count = raw_count(lower, None)
+        if count:
+            segments.append((lower, None, count, None))
+        self._segment_cache = segments
+        return segments
+
+    def _bounds(self):
+        """``(lower, upper, chunk)`` per segment in ascending order, raw stretches included even if empty"""
+        lower = None
+        for chunk in self._chunks:
+            upper = day_start(chunk.day)
+            yield lower, upper, None
+            yield upper, upper + DAY, chunk
+            lower = upper + DAY
+        yield lower, None, None
+
+    def _covers(self, chunk):
+        lower = day_start(chunk.day)
+        return (self._start is None or self._start <= lower) and (self._end is None or self._end >= lower + DAY - MICROSECOND)
+
+    def _stretch(self, lower, upper):
+        raw = self._raw
+        if lower is not None:
+            raw = raw.filter(timestamp__gte=lower)
+        if upper is not None:
+            raw = raw.filter(timestamp__lt=upper)
+        return raw.values_list(*self._fields) if self._fields else raw
+
+    def _day(self, chunk):
+        """A chunk day's readings within range, raw readings of that day replacing compacted ones"""
+        if chunk.day not in self._day_cache:
+            lower = day_start(chunk.day)
+            merged = {reading.timestamp: reading for reading in decode_readings(chunk, self._start, self._end)}
+            for reading in self._raw.filter(timestamp__gte=lower, timestamp__lt=lower + DAY):
+                merged[_utc(reading.timestamp)] = reading
+            self._day_cache[chunk.day] = [merged[timestamp] for timestamp in sorted(merged)]
+        return self._day_cache[chunk.day]
+
+    def _output(self, readings):
+        if not self._fields:
+            return readings
+        return [tuple(getattr(reading, field) for field in self._fields) for reading in readings]
@@ -0,0 +1,52 @@
+# readings/export.py
+import csv
+import json
+
+# Column order shared by every export format
+EXPORT_FIELDS = ("id", "timestamp", "temperature", "humidity", "sensor_id")
+
+# Rows fetched per server-side cursor round trip, and rows per emitted chunk
+EXPORT_CHUNK_SIZE = 2_000
+
+
+class _Echo:
+    """File-like object whose write() hands the formatted line back to csv.writer's caller"""
+
+    def write(self, value):
+        return value
+
+
+def _rows(queryset):
+    rows = queryset.values_list(*EXPORT_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    for id_, timestamp, temperature, humidity, sensor_id in rows:
+        yield id_, timestamp.isoformat(), temperature, humidity, sensor_id
+
+
+def _chunked(lines):
+    """Join lines into larger chunks so the response is not written one row at a time"""
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= EXPORT_CHUNK_SIZE:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+def iter_csv(queryset):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    yield from _chunked(writer.writerow(row) for row in _rows(queryset))
+
+
+def iter_ndjson(queryset):
+    yield from _chunked(
+        json.dumps(dict(zip(EXPORT_FIELDS, row))) + "\n" for row in _rows(queryset)
+    )
+
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", iter_csv),
+    "ndjson": ("application/x-ndjson", iter_ndjson),
+}
@@ -0,0 +1,30 @@
+# readings/functions.py
+from django.db import NotSupportedError, models
+from django.db.models import Func
+
+
+class EpochBucket(Func):
+    """Start of the fixed-width time bucket containing a datetime, as Unix seconds.
+
+    Buckets are aligned to the Unix epoch, so a width of 3600 yields UTC hours
+    and 86400 yields UTC days.
+    """
+
+    output_field = models.BigIntegerField()
+
+    def __init__(self, expression, width, **extra):
+        self.width = int(width)
+        super().__init__(expression, **extra)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        raise NotSupportedError(f"EpochBucket is not supported on {connection.vendor}")
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        template = f"(FLOOR(EXTRACT(EPOCH FROM %(expressions)s) / {self.width}) * {self.width})::bigint"
+        return super().as_sql(compiler, connection, template=template, **extra_context)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # '%%%%s' survives both template interpolation and the sqlite backend's
+        # placeholder rewriting as a literal strftime('%s', ...)
+        template = f"((CAST(strftime('%%%%s', %(expressions)s) AS INTEGER) / {self.width}) * {self.width})"
+        return super().as_sql(compiler, connection, template=template, **extra_context)
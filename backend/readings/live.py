@@ -0,0 +1,318 @@
+# readings/live.py
+"""Live fan-out of newly ingested readings to stream subscribers.
+
+Ingest paths call ``publish_readings`` inside their write transaction. Each
+process runs one broker; the stream route subscribes to it per sensor and
+receives events through an asyncio queue. How events reach the brokers is set
+by ``settings.READINGS_LIVE_STREAM``:
+
+    BACKEND     "postgres": NOTIFY on CHANNEL, delivered on commit to every
+                process, where a single LISTEN thread feeds the broker;
+                "local": handed to this process's broker on commit (single
+                process deployments, other databases);
+                "auto" (default): "postgres" on PostgreSQL, else "local";
+                None: publishing is off
+    CHANNEL     PostgreSQL notification channel
+    QUEUE_SIZE  events buffered per subscriber; a subscriber that falls this
+                far behind is disconnected and should resume via Last-Event-ID
+    KEEPALIVE   seconds between SSE keep-alive comments
+
+Events carry up to a NOTIFY payload's worth (~7.5 kB) of one sensor's readings.
+"""
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "BACKEND": "auto",
+    "CHANNEL": "readings_live",
+    "QUEUE_SIZE": 1_000,
+    "KEEPALIVE": 15,
+}
+
+# NOTIFY payloads must stay under 8000 bytes
+MAX_PAYLOAD_BYTES = 7_500
+
+# Put on a subscriber's queue when it overflows; the stream then ends
+OVERFLOW = object()
+
+# Readings replayed at most when a stream resumes after Last-Event-ID
+MAX_REPLAY = 1_000
+
+# Milliseconds a disconnected EventSource waits before reconnecting
+RETRY_MS = 3_000
+
+
+def live_config():
+    return {**DEFAULTS, **getattr(settings, "READINGS_LIVE_STREAM", {})}
+
+
+def live_backend(using=DEFAULT_DB_ALIAS):
+    backend = live_config()["BACKEND"]
+    if backend == "auto":
+        return "postgres" if connections[using].vendor == "postgresql" else "local"
+    return backend
+
+
+class ReadingBroker:
+    """Per-process fan-out of reading events to asyncio subscribers, keyed by sensor id"""
+
+    def __init__(self, queue_size):
+        self.queue_size = queue_size
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, sensor_id):
+        """A queue receiving lists of the sensor's new readings; call from the event loop"""
+        queue = asyncio.Queue(self.queue_size)
+        with self._lock:
+            self._subscribers[sensor_id].add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, sensor_id, queue):
+        with self._lock:
+            subscribers = self._subscribers.get(sensor_id, set())
+            subscribers.difference_update({entry for entry in subscribers if entry[1] is queue})
+            if not subscribers:
+                self._subscribers.pop(sensor_id, None)
+
+    def subscriber_count(self, sensor_id=None):
+        with self._lock:
+            if sensor_id is not None:
+                return len(self._subscribers.get(sensor_id, ()))
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def publish(self, sensor_id, readings):
+        """Hand ``readings`` (JSON-ready dicts) to the sensor's subscribers; safe from any thread"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(sensor_id, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, readings)
+            except RuntimeError:
+                # The subscriber's event loop is gone
+                self.unsubscribe(sensor_id, queue)
+
+
+def _offer(queue, readings):
+    if queue.full():
+        # Too far behind: end this stream rather than silently skip readings
+        queue.get_nowait()
+        queue.put_nowait(OVERFLOW)
+        return
+    queue.put_nowait(readings)
+
+
+class PostgresListener:
+    """One LISTEN connection per process, feeding NOTIFY payloads to the broker"""
+
+    RECONNECT_DELAY = 2
+
+    def __init__(self, broker, channel, using=DEFAULT_DB_ALIAS):
+        self.broker = broker
+        self.channel = channel
+        self.using = using
+        self._stop = threading.Event()
+        self.ready = threading.Event()  # set while LISTENing
+        self._thread = threading.Thread(target=self._run, name="readings-live-listener", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def _run(self):
+        import psycopg
+        from psycopg import sql
+
+        params = connections[self.using].get_connection_params()
+        while not self._stop.is_set():
+            try:
+                with psycopg.connect(**params, autocommit=True) as conn:
+                    conn.execute(sql.SQL("LISTEN {}").format(sql.Identifier(self.channel)))
+                    self.ready.set()
+                    while not self._stop.is_set():
+                        for notify in conn.notifies(timeout=1):
+                            self._dispatch(notify.payload)
+            except Exception:
+                self.ready.clear()
+                logger.exception("Live readings listener failed; reconnecting")
+                self._stop.wait(self.RECONNECT_DELAY)
+
+    def _dispatch(self, payload):
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning("Ignoring malformed live readings payload")
+            return
+        self.broker.publish(event["sensor_id"], event["readings"])
+
+
+_broker = None
+_listener = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """The process-wide broker, starting the LISTEN thread on first use when needed"""
+    global _broker, _listener
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                config = live_config()
+                broker = ReadingBroker(config["QUEUE_SIZE"])
+                if live_backend() == "postgres":
+                    _listener = PostgresListener(broker, config["CHANNEL"])
+                    _listener.start()
+                _broker = broker
+    return _broker
+
+
+def reading_event(sensor_id, timestamp, temperature, humidity, id=None):
+    """A reading as sent to stream subscribers, its timestamp in UTC"""
+    if timezone.is_naive(timestamp):
+        timestamp = timezone.make_aware(timestamp)
+    timestamp = timestamp.astimezone(dt_timezone.utc)
+    return {
+        "id": id,
+        "sensor_id": sensor_id,
+        "timestamp": timestamp.isoformat(),
+        "temperature": temperature,
+        "humidity": humidity,
+    }
+
+
+def _batches(events):
+    """Group reading events into ``(sensor_id, [event, ...])`` batches small enough to NOTIFY"""
+    by_sensor = defaultdict(list)
+    for event in events:
+        by_sensor[event["sensor_id"]].append(event)
+    for sensor_id, rows in by_sensor.items():
+        batch, size = [], 0
+        for row in rows:
+            encoded = len(json.dumps(row)) + 1
+            if batch and size + encoded > MAX_PAYLOAD_BYTES:
+                yield sensor_id, batch
+                batch, size = [], 0
+            batch.append(row)
+            size += encoded
+        if batch:
+            yield sensor_id, batch
+
+
+def _notify(batches, using=DEFAULT_DB_ALIAS):
+    channel = live_config()["CHANNEL"]
+    with connections[using].cursor() as cursor:
+        for sensor_id, batch in batches:
+            payload = json.dumps({"sensor_id": sensor_id, "readings": batch})
+            cursor.execute("SELECT pg_notify(%s, %s)", [channel, payload])
+
+
+def publish_readings(events, using=DEFAULT_DB_ALIAS):
+    """Publish reading events (see ``reading_event``) once the current transaction commits"""
+    backend = live_backend(using)
+    if backend is None:
+        return
+    batches = list(_batches(events))
+    if not batches:
+        return
+    if backend == "postgres":
+        if using == DEFAULT_DB_ALIAS:
+            # NOTIFY is transactional: listeners only see it after commit
+            _notify(batches)
+        else:
+            # Listeners are on the primary; a reading shard's writes are announced there once they commit
+            transaction.on_commit(lambda: _notify(batches), using=using)
+        return
+
+    def deliver():
+        broker = _broker
+        if broker is None:
+            return  # nobody has subscribed in this process
+        for sensor_id, batch in batches:
+            broker.publish(sensor_id, batch)
+
+    transaction.on_commit(deliver, using=using)
+
+
+def _sse(event):
+    return f"id: {event['timestamp']}\nevent: reading\ndata: {json.dumps(event)}\n\n"
+
+
+def _replay(sensor_id, since):
+    from readings.models import Reading
+    from readings.sharding import reading_db
+
+    return [
+        reading_event(sensor_id, timestamp, temperature, humidity, id=id_)
+        for id_, timestamp, temperature, humidity in Reading.objects.using(reading_db(sensor_id))
+        .filter(sensor_id=sensor_id, timestamp__gt=since)
+        .order_by("timestamp")
+        .values_list("id", "timestamp", "temperature", "humidity")[:MAX_REPLAY]
+    ]
+
+
+def parse_event_id(value):
+    """The timestamp a Last-Event-ID refers to, or None"""
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+async def sse_stream(sensor_id, since=None):
+    """Server-sent events of a sensor's new readings, one ``reading`` event each.
+
+    Event ids are reading timestamps; with ``since`` the stream first replays
+    up to MAX_REPLAY raw readings newer than it. Keep-alive comments are sent
+    while idle. The stream ends if the subscriber falls QUEUE_SIZE events
+    behind, so the client reconnects and resumes from its last event id.
+    """
+    broker = get_broker()
+    # Subscribe before replaying so nothing written meanwhile is missed
+    queue = broker.subscribe(sensor_id)
+    keepalive = live_config()["KEEPALIVE"]
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        replayed = set()
+        if since is not None:
+            for event in await sync_to_async(_replay)(sensor_id, since):
+                replayed.add(event["timestamp"])
+                yield _sse(event)
+        while True:
+            try:
+                events = await asyncio.wait_for(queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if events is OVERFLOW:
+                return
+            for event in events:
+                if event["timestamp"] not in replayed:
+                    yield _sse(event)
+    finally:
+        broker.unsubscribe(sensor_id, queue)
+
+
+def _reset_broker(*, setting, **kwargs):
+    global _broker, _listener
+    if setting == "READINGS_LIVE_STREAM":
+        if _listener is not None:
+            _listener.stop()
+        _broker = _listener = None
+
+
+setting_changed.connect(_reset_broker)
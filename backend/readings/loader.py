@@ -0,0 +1,154 @@
+# readings/loader.py
+from datetime import datetime
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from readings.live import publish_readings, reading_event
+from readings.models import Reading
+from readings.rollups import refresh_rollups_for
+from readings.sharding import sensors_by_shard
+
+# Rows per bulk_create statement on backends without COPY
+UPSERT_BATCH_SIZE = 1_000
+
+
+def parse_iso_timestamp(ts_raw: str):
+    """Robust minimal ISO timestamp parsing (handles 'Z' -> +00:00)."""
+    if ts_raw is None:
+        raise ValueError("No timestamp provided")
+    s = ts_raw.strip()
+    if s.endswith("Z"):
+        s = s.replace("Z", "+00:00")
+    # Python's fromisoformat accepts 'YYYY-MM-DD HH:MM:SS+00:00' and 'T' variants.
+    return datetime.fromisoformat(s)
+
+
+def upsert_readings(rows, using=None, publish=True, refresh=True):
+    """Insert or update readings in one transaction, keyed on (sensor_id, timestamp).
+
+    ``rows`` is an iterable of ``(sensor_id, timestamp, temperature, humidity)``
+    tuples. When a key repeats, the last row wins. PostgreSQL loads through
+    COPY into a temporary staging table followed by a single
+    INSERT ... ON CONFLICT; other backends use bulk_create(update_conflicts=True).
+    Rollups covering the written range are refreshed in the same transaction
+    unless ``refresh`` is False, for loaders that rebuild them once at the
+    end (import_readings), and the readings are published to live stream subscribers unless
+    ``publish`` is False, as bulk loads pass to skip encoding every row.
+    Returns the number of distinct readings written.
+
+    With ``using`` None each sensor's rows go to its reading shard
+    (readings/sharding.py), one transaction per shard.
+    """
+    latest = {}
+    for sensor_id, timestamp, temperature, humidity in rows:
+        latest[(sensor_id, timestamp)] = (temperature, humidity)
+    if not latest:
+        return 0
+    if using is not None:
+        return _upsert(latest, using, publish, refresh)
+    shards = sensors_by_shard(sensor_id for sensor_id, _ in latest)
+    if len(shards) == 1:
+        return _upsert(latest, next(iter(shards)), publish, refresh)
+    written = 0
+    for shard, sensor_ids in shards.items():
+        sensor_ids = set(sensor_ids)
+        written += _upsert({key: values for key, values in latest.items() if key[0] in sensor_ids}, shard, publish, refresh)
+    return written
+
+
+def _upsert(latest, using=DEFAULT_DB_ALIAS, publish=True, refresh=True):
+    connection = connections[using]
+    with transaction.atomic(using=using):
+        if connection.vendor == "postgresql" and _supports_copy():
+            _copy_upsert(connection, latest)
+        else:
+            _bulk_upsert(latest, using)
+        if refresh:
+            refresh_rollups_for(latest, using=using)
+        if publish:
+            publish_readings(
+                (
+                    reading_event(sensor_id, timestamp, temperature, humidity)
+                    for (sensor_id, timestamp), (temperature, humidity) in latest.items()
+                ),
+                using=using,
+            )
+    return len(latest)
+
+
+def _supports_copy():
+    from django.db.backends.postgresql.psycopg_any import is_psycopg3
+
+    return is_psycopg3
+
+
+def _copy_upsert(connection, latest):
+    table = connection.ops.quote_name(Reading._meta.db_table)
+    with connection.cursor() as cursor:
+        # Session-scoped and emptied per call, so repeated calls inside one
+        # outer transaction reuse it instead of colliding on the name
+        cursor.execute(
+            "CREATE TEMPORARY TABLE IF NOT EXISTS readings_staging ("
+            " sensor_id bigint NOT NULL,"
+            " timestamp timestamptz NOT NULL,"
+            " temperature double precision NOT NULL,"
+            " humidity double precision NOT NULL"
+            ")"
+        )
+        cursor.execute("TRUNCATE readings_staging")
+        with cursor.copy(
+            "COPY readings_staging (sensor_id, timestamp, temperature, humidity) FROM STDIN"
+        ) as copy:
+            for (sensor_id, timestamp), (temperature, humidity) in latest.items():
+                copy.write_row((sensor_id, timestamp, temperature, humidity))
+        cursor.execute(
+            f"INSERT INTO {table} (sensor_id, timestamp, temperature, humidity) "
+            "SELECT sensor_id, timestamp, temperature, humidity FROM readings_staging "
+            "ON CONFLICT (sensor_id, timestamp) DO UPDATE "
+            "SET temperature = EXCLUDED.temperature, humidity = EXCLUDED.humidity"
+        )
+
+
+def _bulk_upsert(latest, using):
+    Reading.objects.using(using).bulk_create(
+        [
+            Reading(sensor_id=sensor_id, timestamp=timestamp, temperature=temperature, humidity=humidity)
+            for (sensor_id, timestamp), (temperature, humidity) in latest.items()
+        ],
+        batch_size=UPSERT_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=["sensor", "timestamp"],
+        update_fields=["temperature", "humidity"],
+    )
+
+
+def insert_new_readings(readings, using=DEFAULT_DB_ALIAS, batch_size=UPSERT_BATCH_SIZE):
+    """Insert ``readings`` whose (sensor, timestamp) is not taken yet; returns those inserted.
+
+    PostgreSQL inserts with ON CONFLICT DO NOTHING RETURNING, so rows a
+    concurrent writer got in first are reported rather than silently dropped.
+    Other backends admit one writer at a time, so callers that looked the keys
+    up in the same transaction insert everything.
+    """
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        Reading.objects.using(using).bulk_create(readings, batch_size=batch_size)
+        return list(readings)
+    quote = connection.ops.quote_name
+    table = quote(Reading._meta.db_table)
+    by_key = {(reading.sensor_id, reading.timestamp): reading for reading in readings}
+    inserted = []
+    with connection.cursor() as cursor:
+        for start in range(0, len(readings), batch_size):
+            batch = readings[start:start + batch_size]
+            cursor.execute(
+                f"INSERT INTO {table} (sensor_id, {quote('timestamp')}, temperature, humidity) VALUES "
+                + ", ".join(["(%s, %s, %s, %s)"] * len(batch))
+                + f" ON CONFLICT (sensor_id, {quote('timestamp')}) DO NOTHING RETURNING id, sensor_id, {quote('timestamp')}",
+                [value for reading in batch for value in (reading.sensor_id, reading.timestamp, reading.temperature, reading.humidity)],
+            )
+            for reading_id, sensor_id, timestamp in cursor.fetchall():
+                reading = by_key[(sensor_id, timestamp)]
+                reading.id = reading_id
+                inserted.append(reading)
+    return inserted
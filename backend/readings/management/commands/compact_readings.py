@@ -0,0 +1,62 @@
+# backend/readings/management/commands/compact_readings.py
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+from readings.cold import compact_day, compactable_days
+
+DEFAULT_OLDER_THAN_DAYS = 90
+
+
+class Command(BaseCommand):
+    help = (
+        "Compact raw readings older than a cutoff into per-sensor daily chunks "
+        "(delta-of-delta timestamps, XOR-encoded values) and delete the raw rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than-days",
+            type=int,
+            default=DEFAULT_OLDER_THAN_DAYS,
+            help=f"Compact whole UTC days older than this many days (default: {DEFAULT_OLDER_THAN_DAYS})",
+        )
+        parser.add_argument(
+            "--sensor",
+            type=int,
+            action="append",
+            dest="sensors",
+            help="Sensor id to compact (repeatable; default: all sensors)",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="List the days that would be compacted")
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS, help="Database alias to use")
+
+    def handle(self, *args, **options):
+        if options["older_than_days"] < 1:
+            raise CommandError("--older-than-days must be at least 1.")
+        cutoff = timezone.now() - timedelta(days=options["older_than_days"])
+        using = options["database"]
+
+        days = list(compactable_days(cutoff, options["sensors"], using=using))
+        if not days:
+            self.stdout.write(self.style.SUCCESS(f"✅ Nothing to compact before {cutoff:%Y-%m-%d}."))
+            return
+        if options["dry_run"]:
+            for sensor_id, day in days:
+                self.stdout.write(f"🧊 Would compact sensor {sensor_id} on {day}.")
+            self.stdout.write(self.style.NOTICE(f"ℹ️ {len(days):,} sensor-day(s) to compact."))
+            return
+
+        start = time.time()
+        moved = 0
+        for index, (sensor_id, day) in enumerate(days, start=1):
+            moved += compact_day(sensor_id, day, using=using)
+            if index % 100 == 0:
+                self.stdout.write(f"🧊 {index:,}/{len(days):,} sensor-days compacted.")
+
+        elapsed = time.time() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Compacted {moved:,} readings into {len(days):,} daily chunk(s) in {elapsed:.2f}s."
+        ))
@@ -0,0 +1,251 @@
+# backend/readings/management/commands/import_readings.py
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from sensors.models import Sensor
+from readings.loader import parse_iso_timestamp, upsert_readings
+from readings.rollups import refresh_rollups
+from readings.sharding import sensors_by_shard
+
+DEFAULT_CHUNK_BYTES = 64 * 1024 * 1024
+DEFAULT_BATCH_SIZE = 10_000
+REQUIRED_COLUMNS = ("timestamp", "device_id", "temperature", "humidity")
+
+
+def split_ranges(csv_path, chunk_bytes):
+    """Split the file body (after the header) into byte ranges that end on line boundaries."""
+    size = os.path.getsize(csv_path)
+    ranges = []
+    with open(csv_path, "rb") as f:
+        f.readline()
+        start = f.tell()
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            if f.tell() < size:
+                f.readline()
+            end = f.tell()
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def read_header(csv_path):
+    with open(csv_path, newline="") as f:
+        header = next(csv.reader(f), [])
+    columns = {name.strip(): index for index, name in enumerate(header)}
+    missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+    if missing:
+        raise CommandError(f"CSV is missing columns: {', '.join(missing)}")
+    return tuple(columns[name] for name in REQUIRED_COLUMNS)
+
+
+def import_range(csv_path, start, end, positions, sensor_ids, batch_size):
+    """Parse one byte range and upsert its readings; returns (written, skipped, bounds).
+
+    ``bounds`` maps each sensor written to its first and last timestamp. Rollups
+    are left to the caller, which refreshes them once after every range is in:
+    per-batch rebuilds of the same buckets from parallel workers would collide.
+    """
+    ts_pos, device_pos, temp_pos, hum_pos = positions
+    with open(csv_path, "rb") as f:
+        f.seek(start)
+        lines = f.read(end - start).decode("utf-8").splitlines()
+
+    written = skipped = 0
+    bounds = {}
+    batch = []
+    for row in csv.reader(lines):
+        try:
+            sensor_id = sensor_ids[row[device_pos].strip()]
+            batch.append((
+                sensor_id,
+                parse_iso_timestamp(row[ts_pos]),
+                float(row[temp_pos]),
+                float(row[hum_pos]),
+            ))
+        except (IndexError, KeyError, ValueError):
+            skipped += 1
+            continue
+        timestamp = batch[-1][1]
+        first, last = bounds.get(sensor_id, (timestamp, timestamp))
+        bounds[sensor_id] = (min(first, timestamp), max(last, timestamp))
+        if len(batch) >= batch_size:
+            written += upsert_readings(batch, publish=False, refresh=False)
+            batch = []
+    if batch:
+        written += upsert_readings(batch, publish=False, refresh=False)
+    return written, skipped, bounds
+
+
+def _init_worker():
+    # Needed under the spawn start method; a no-op when the worker was forked
+    django.setup()
+
+
+class Checkpoint:
+    """Byte ranges already imported, persisted as JSON so a killed import can resume."""
+
+    def __init__(self, path, csv_path, chunk_bytes):
+        self.path = path
+        self.key = {
+            "csv": os.path.abspath(csv_path),
+            "size": os.path.getsize(csv_path),
+            "chunk_bytes": chunk_bytes,
+        }
+        self.done = set()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path) as f:
+            data = json.load(f)
+        if data.get("key") != self.key:
+            raise CommandError(
+                f"Checkpoint {self.path} belongs to a different file or chunk size; use --restart to discard it"
+            )
+        self.done = set(data["done"])
+
+    def mark_done(self, index):
+        self.done.add(index)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"key": self.key, "done": sorted(self.done)}, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class Command(BaseCommand):
+    help = "Import a large timestamp,device_id,temperature,humidity CSV in parallel, resumably."
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv", type=str, help="Path to the CSV file")
+        parser.add_argument(
+            "--username",
+            type=str,
+            default="testuser",
+            help="Owner of the sensors; device_id is matched against their sensor names",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Parser/loader processes, each with its own database connection (1 = in-process)",
+        )
+        parser.add_argument(
+            "--chunk-bytes",
+            type=int,
+            default=DEFAULT_CHUNK_BYTES,
+            help=f"Size of the byte range handed to each worker task (default: {DEFAULT_CHUNK_BYTES})",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f"Rows per upsert transaction (default: {DEFAULT_BATCH_SIZE})",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            type=str,
+            default=None,
+            help="Checkpoint file (default: <csv>.checkpoint.json)",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore an existing checkpoint and import the whole file again",
+        )
+
+    def handle(self, *args, **options):
+        csv_path = options["csv"]
+        if not os.path.exists(csv_path):
+            raise CommandError(f"CSV file not found: {csv_path}")
+
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['username']}' does not exist")
+        sensor_ids = dict(Sensor.objects.filter(owner=user).values_list("name", "id"))
+
+        positions = read_header(csv_path)
+        ranges = split_ranges(csv_path, options["chunk_bytes"])
+
+        checkpoint = Checkpoint(
+            options["checkpoint"] or f"{csv_path}.checkpoint.json",
+            csv_path,
+            options["chunk_bytes"],
+        )
+        if options["restart"]:
+            checkpoint.clear()
+        checkpoint.load()
+        pending = [index for index in range(len(ranges)) if index not in checkpoint.done]
+        resumed = bool(checkpoint.done)
+        if resumed:
+            self.stdout.write(self.style.NOTICE(
+                f"ℹ️ Resuming: {len(checkpoint.done)}/{len(ranges)} chunks already imported."
+            ))
+
+        written = skipped = 0
+        bounds = {}
+        started = time.perf_counter()
+
+        def record(index, result):
+            nonlocal written, skipped
+            written += result[0]
+            skipped += result[1]
+            for sensor_id, (first, last) in result[2].items():
+                known_first, known_last = bounds.get(sensor_id, (first, last))
+                bounds[sensor_id] = (min(known_first, first), max(known_last, last))
+            checkpoint.mark_done(index)
+            self.stdout.write(f"📦 Chunk {index + 1}/{len(ranges)} done ({result[0]:,} rows).")
+
+        if options["workers"] <= 1:
+            for index in pending:
+                start, end = ranges[index]
+                record(index, import_range(csv_path, start, end, positions, sensor_ids, options["batch_size"]))
+        else:
+            # Forked workers must not share the parent's database connection
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options["workers"], initializer=_init_worker) as pool:
+                futures = {
+                    pool.submit(
+                        import_range, csv_path, *ranges[index], positions, sensor_ids, options["batch_size"]
+                    ): index
+                    for index in pending
+                }
+                for future in as_completed(futures):
+                    record(futures[future], future.result())
+
+        self.refresh_rollups(bounds, resumed, sensor_ids)
+
+        elapsed = time.perf_counter() - started
+        checkpoint.clear()
+
+        rate = written / elapsed if elapsed > 0 else 0.0
+        self.stdout.write(self.style.SUCCESS(f"✅ Imported {written:,} readings in {elapsed:.2f}s ({rate:,.0f} rows/sec)."))
+        if skipped:
+            self.stdout.write(self.style.WARNING(f"⚠️ Skipped {skipped:,} invalid or unknown-sensor rows."))
+
+    def refresh_rollups(self, bounds, resumed, sensor_ids):
+        """Rebuild rollups once per shard for everything imported.
+
+        Chunks imported by an interrupted earlier run left no record of what
+        they touched, so a resumed import rebuilds its sensors in full.
+        """
+        if resumed:
+            for shard, shard_sensor_ids in sensors_by_shard(sensor_ids.values()).items():
+                refresh_rollups(shard_sensor_ids, using=shard)
+            return
+        for shard, shard_sensor_ids in sensors_by_shard(bounds).items():
+            start = min(bounds[sensor_id][0] for sensor_id in shard_sensor_ids)
+            end = max(bounds[sensor_id][1] for sensor_id in shard_sensor_ids)
+            refresh_rollups(shard_sensor_ids, start, end, using=shard)
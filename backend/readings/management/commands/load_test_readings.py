@@ -0,0 +1,145 @@
+# backend/readings/management/commands/load_test_readings.py
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from itertools import count
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+
+# (label, route suffix under /api/sensors/{id}/readings/)
+ROUTES = {
+    "sync": "",
+    "async": "async/",
+}
+
+
+def http_json(url, token=None, body=None, timeout=30):
+    """Send one JSON request; returns (status, parsed body or None)"""
+    headers = {"Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    data = json.dumps(body).encode() if body is not None else None
+    request = Request(url, data=data, headers=headers, method="POST" if data is not None else "GET")
+    try:
+        with urlopen(request, timeout=timeout) as response:
+            return response.status, json.loads(response.read() or b"null")
+    except HTTPError as exc:
+        return exc.code, None
+    except (URLError, OSError):
+        return None, None
+
+
+def run_phase(send, total, concurrency):
+    """Fire ``total`` calls of ``send(i)`` from ``concurrency`` threads; returns stats.
+
+    With a concurrency of 1 the calls run in the calling thread, one after
+    another (and on its database connection, for in-process clients).
+    """
+    def timed(i):
+        start = time.perf_counter()
+        status = send(i)
+        return status, time.perf_counter() - start
+
+    started = time.perf_counter()
+    if concurrency == 1:
+        results = [timed(i) for i in range(total)]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(timed, range(total)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for _, latency in results)
+    errors = sum(1 for status, _ in results if status is None or status >= 400)
+    return {
+        "requests": total,
+        "errors": errors,
+        "elapsed": elapsed,
+        "rps": total / elapsed if elapsed else 0.0,
+        "mean": statistics.fmean(latencies) * 1000,
+        "p50": statistics.median(latencies) * 1000,
+        "p95": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "p99": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "max": latencies[-1] * 1000,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test the sync and async readings routes of a running server with concurrent "
+        "requests, reporting throughput and latency. Writes one reading per ingest request."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://localhost:8000", help="Base URL of the server under test")
+        parser.add_argument("--email", default="testuser@example.com", help="Login email")
+        parser.add_argument("--password", default="password123", help="Login password")
+        parser.add_argument("--sensor", type=int, help="Sensor id to target (default: the user's first sensor)")
+        parser.add_argument("--requests", type=int, default=2000, help="Requests per route (default: 2000)")
+        parser.add_argument("--concurrency", type=int, default=100, help="Concurrent clients (default: 100)")
+        parser.add_argument(
+            "--routes",
+            choices=["sync", "async", "both"],
+            default="both",
+            help="Which routes to exercise (default: both)",
+        )
+
+    def handle(self, *args, **options):
+        base = options["url"].rstrip("/")
+        total = options["requests"]
+        concurrency = options["concurrency"]
+        if total < 1 or concurrency < 1:
+            raise CommandError("--requests and --concurrency must be at least 1.")
+
+        status, body = http_json(f"{base}/api/auth/token/", body={"email": options["email"], "password": options["password"]})
+        if status != 200:
+            raise CommandError(f"Login failed against {base} (status {status}).")
+        token = body["access"]
+
+        sensor_id = options["sensor"]
+        if sensor_id is None:
+            status, body = http_json(f"{base}/api/sensors/", token=token)
+            if status != 200 or not body["items"]:
+                raise CommandError("No sensor to target; create one or pass --sensor.")
+            sensor_id = body["items"][0]["id"]
+
+        # Unique timestamps across every phase, clear of existing data
+        origin = datetime.now(timezone.utc).replace(microsecond=0) + timedelta(days=1)
+        sequence = count()
+
+        def ingest(url):
+            def send(_):
+                timestamp = origin + timedelta(milliseconds=next(sequence))
+                payload = {"temperature": 21.0, "humidity": 45.0, "timestamp": timestamp.isoformat()}
+                return http_json(url, token=token, body=payload)[0]
+            return send
+
+        def listing(url):
+            return lambda _: http_json(url, token=token)[0]
+
+        labels = ["sync", "async"] if options["routes"] == "both" else [options["routes"]]
+        self.stdout.write(self.style.NOTICE(
+            f"🚀 {total:,} requests per route, {concurrency} concurrent clients, sensor {sensor_id} at {base}"
+        ))
+
+        results = {}
+        for label in labels:
+            url = f"{base}/api/sensors/{sensor_id}/readings/{ROUTES[label]}"
+            for action, send in (("ingest", ingest(url)), ("list", listing(url))):
+                stats = run_phase(send, total, concurrency)
+                results[(label, action)] = stats
+                self.stdout.write(
+                    f"📊 {label:<5} {action:<6} {stats['rps']:8,.0f} req/s  "
+                    f"p50 {stats['p50']:7.1f}ms  p95 {stats['p95']:7.1f}ms  max {stats['max']:7.1f}ms  "
+                    f"errors {stats['errors']}"
+                )
+
+        if len(labels) == 2:
+            for action in ("ingest", "list"):
+                speedup = results[("async", action)]["rps"] / (results[("sync", action)]["rps"] or 1)
+                self.stdout.write(self.style.SUCCESS(f"✅ async/{action} throughput is {speedup:.2f}x sync."))
+        if any(stats["errors"] for stats in results.values()):
+            self.stdout.write(self.style.WARNING("⚠️ Some requests failed; see the error counts above."))
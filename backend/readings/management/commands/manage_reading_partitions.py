@@ -0,0 +1,85 @@
+# backend/readings/management/commands/manage_reading_partitions.py
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+from readings.partitions import add_months, create_partition, drop_partition, is_partitioned, list_partitions, month_start
+from readings.rollups import refresh_rollups
+
+DEFAULT_MONTHS_AHEAD = 3
+
+
+class Command(BaseCommand):
+    help = "Pre-create upcoming monthly reading partitions and detach/drop expired ones (PostgreSQL)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--ahead",
+            type=int,
+            default=DEFAULT_MONTHS_AHEAD,
+            help=f"Months after the current one that must have a partition (default: {DEFAULT_MONTHS_AHEAD})",
+        )
+        parser.add_argument(
+            "--retain",
+            type=int,
+            default=None,
+            help="Keep this many months before the current one; older partitions are removed (default: keep all)",
+        )
+        parser.add_argument(
+            "--keep-detached",
+            action="store_true",
+            help="Detach expired partitions but keep them as standalone tables instead of dropping them",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report what would change",
+        )
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="Database alias to manage (default: 'default')",
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        if connection.vendor != "postgresql":
+            self.stdout.write(self.style.NOTICE(f"ℹ️ Reading partitions need PostgreSQL; '{connection.vendor}' is not partitioned."))
+            return
+        if not is_partitioned(connection):
+            raise CommandError("The readings table is not partitioned; run migrations first.")
+
+        current = month_start(timezone.now())
+        wanted = [add_months(current, offset) for offset in range(options["ahead"] + 1)]
+        dry_run = options["dry_run"]
+
+        with transaction.atomic(using=options["database"]):
+            existing = list_partitions(connection)
+
+            for month in wanted:
+                if month in existing:
+                    continue
+                if dry_run:
+                    self.stdout.write(f"Would create partition for {month:%Y-%m}")
+                else:
+                    name = create_partition(connection, month)
+                    self.stdout.write(self.style.SUCCESS(f"✅ Created {name}"))
+
+            if options["retain"] is not None:
+                cutoff = add_months(current, -options["retain"])
+                for month, name in sorted(existing.items()):
+                    if month >= cutoff:
+                        continue
+                    action, done = ("detach", "Detached") if options["keep_detached"] else ("drop", "Dropped")
+                    if dry_run:
+                        self.stdout.write(f"Would {action} {name}")
+                    else:
+                        drop_partition(connection, name, keep_table=options["keep_detached"])
+                        # The month's rollups and the snapshots (counts, ETag versions) must follow
+                        start = datetime.combine(month, time.min, tzinfo=dt_timezone.utc)
+                        end = datetime.combine(add_months(month, 1), time.min, tzinfo=dt_timezone.utc)
+                        refresh_rollups(start=start, end=end - timedelta(microseconds=1), using=options["database"])
+                        self.stdout.write(self.style.WARNING(f"🗑️ {done} {name}"))
+
+        self.stdout.write(self.style.SUCCESS("🎉 Partitions up to date."))
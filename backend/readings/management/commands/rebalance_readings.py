@@ -0,0 +1,103 @@
+# backend/readings/management/commands/rebalance_readings.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from readings.rollups import refresh_rollups
+from readings.sharding import (
+    COPY_BATCH_SIZE,
+    copy_sensor_data,
+    delete_sensor_data,
+    place_sensor,
+    ring_shard,
+    shard_aliases,
+    shard_config,
+)
+from sensors.models import Sensor
+
+
+class Command(BaseCommand):
+    help = (
+        "Move sensors' readings between reading shards while the API keeps serving them: "
+        "copy each sensor to its target shard, switch its placement, wait for cached "
+        "placements to expire, copy what was written to the source meanwhile, then delete "
+        "the source copy. With --all, every sensor goes where the hash ring assigns it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sensor",
+            type=int,
+            action="append",
+            dest="sensors",
+            help="Sensor id to move (repeatable)",
+        )
+        parser.add_argument("--all", action="store_true", help="Move every sensor not on its ring shard")
+        parser.add_argument("--to", help="Target shard (default: the shard the ring assigns each sensor)")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=COPY_BATCH_SIZE,
+            help=f"Readings copied per INSERT (default: {COPY_BATCH_SIZE})",
+        )
+        parser.add_argument(
+            "--settle",
+            type=float,
+            help="Seconds between switching placements and removing the source copies "
+                 "(default: READINGS_SHARDS CACHE_TTL)",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="List the moves without making them")
+
+    def handle(self, *args, **options):
+        if bool(options["sensors"]) == options["all"]:
+            raise CommandError("Pass either --sensor or --all.")
+        target = options["to"]
+        if target is not None and target not in shard_aliases():
+            raise CommandError(f"Unknown shard {target!r}; READINGS_SHARDS has {', '.join(shard_aliases())}.")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        settle = options["settle"] if options["settle"] is not None else shard_config()["CACHE_TTL"]
+
+        sensors = Sensor.objects.visible().order_by("id")
+        if options["sensors"]:
+            sensors = sensors.filter(id__in=options["sensors"])
+        moves = [
+            (sensor_id, source, target or ring_shard(sensor_id))
+            for sensor_id, source in sensors.values_list("id", "readings_shard")
+        ]
+        moves = [(sensor_id, source, destination) for sensor_id, source, destination in moves if source != destination]
+        if not moves:
+            self.stdout.write(self.style.SUCCESS("✅ Every sensor is already on its shard."))
+            return
+        if options["dry_run"]:
+            for sensor_id, source, destination in moves:
+                self.stdout.write(f"🚚 Would move sensor {sensor_id}: {source} -> {destination}.")
+            self.stdout.write(self.style.NOTICE(f"ℹ️ {len(moves):,} sensor(s) to move."))
+            return
+
+        start = time.time()
+        # 1) Copy while the source keeps serving, then switch reads and writes over
+        copied = 0
+        for sensor_id, source, destination in moves:
+            rows = copy_sensor_data(sensor_id, source, destination, batch_size=options["batch_size"])
+            refresh_rollups([sensor_id], using=destination)
+            place_sensor(sensor_id, destination)
+            copied += rows
+            self.stdout.write(f"🚚 Sensor {sensor_id}: copied {rows:,} readings {source} -> {destination}.")
+
+        # 2) Processes that cached the old placement keep writing to the source until it expires
+        if settle > 0:
+            self.stdout.write(f"⏳ Waiting {settle:g}s for cached placements to expire...")
+            time.sleep(settle)
+
+        # 3) Carry over readings written or overwritten meanwhile and drop the source copy
+        for sensor_id, source, destination in moves:
+            rows = copy_sensor_data(sensor_id, source, destination, changed_only=True, batch_size=options["batch_size"])
+            if rows:
+                refresh_rollups([sensor_id], using=destination)
+            delete_sensor_data([sensor_id], source)
+            copied += rows
+
+        elapsed = time.time() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Moved {len(moves):,} sensor(s), {copied:,} readings, in {elapsed:.2f}s."
+        ))
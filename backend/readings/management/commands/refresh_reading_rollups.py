@@ -0,0 +1,80 @@
+# backend/readings/management/commands/refresh_reading_rollups.py
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from sensors.models import Sensor
+from readings.loader import parse_iso_timestamp
+from readings.models import HourlyReadingRollup, Reading, ReadingChunk
+from readings.rollups import bucket_floor, refresh_rollups
+from readings.sharding import sensors_by_shard
+
+DEFAULT_WINDOW_DAYS = 31
+
+
+class Command(BaseCommand):
+    help = "Rebuild hourly and daily reading rollups for a time range from the raw readings."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sensor",
+            type=int,
+            action="append",
+            dest="sensors",
+            help="Sensor id to rebuild (repeatable; default: all sensors)",
+        )
+        parser.add_argument("--from", dest="timestamp_from", type=str, help="ISO timestamp to start from")
+        parser.add_argument("--to", dest="timestamp_to", type=str, help="ISO timestamp to stop at (inclusive)")
+        parser.add_argument(
+            "--window-days",
+            type=int,
+            default=DEFAULT_WINDOW_DAYS,
+            help=f"Days rebuilt per transaction (default: {DEFAULT_WINDOW_DAYS})",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            timestamp_from = parse_iso_timestamp(options["timestamp_from"]) if options["timestamp_from"] else None
+            timestamp_to = parse_iso_timestamp(options["timestamp_to"]) if options["timestamp_to"] else None
+        except ValueError as exc:
+            raise CommandError(f"Invalid timestamp: {exc}")
+
+        sensor_ids = options["sensors"] or list(Sensor.objects.order_by("id").values_list("id", flat=True))
+        window = timedelta(days=options["window_days"])
+
+        # Each sensor's readings and rollups live on its reading shard
+        for using, shard_sensor_ids in sensors_by_shard(sensor_ids).items():
+            for sensor_id in shard_sensor_ids:
+                self.refresh_sensor(sensor_id, using, timestamp_from, timestamp_to, window)
+
+        self.stdout.write(self.style.SUCCESS("✅ Rollups refreshed."))
+
+    def refresh_sensor(self, sensor_id, using, timestamp_from, timestamp_to, window):
+        # Cover stale rollups too, e.g. for readings that have since been deleted,
+        # and readings compacted into cold storage
+        raw = Reading.objects.using(using).filter(sensor_id=sensor_id).aggregate(
+            first=Min("timestamp"), last=Max("timestamp")
+        )
+        cold = ReadingChunk.objects.using(using).filter(sensor_id=sensor_id).aggregate(
+            first=Min("first_timestamp"), last=Max("last_timestamp")
+        )
+        rolled = HourlyReadingRollup.objects.using(using).filter(sensor_id=sensor_id).aggregate(
+            first=Min("bucket_start"), last=Max("bucket_start")
+        )
+        firsts = [bounds["first"] for bounds in (raw, cold, rolled) if bounds["first"] is not None]
+        lasts = [bounds["last"] for bounds in (raw, cold, rolled) if bounds["last"] is not None]
+        if not firsts:
+            return
+
+        start = max(timestamp_from, min(firsts)) if timestamp_from else min(firsts)
+        end = min(timestamp_to, max(lasts)) if timestamp_to else max(lasts)
+
+        # Day-aligned windows, so each window rebuilds whole daily buckets
+        cursor = bucket_floor(start, 86400)
+        windows = 0
+        while cursor <= end:
+            next_cursor = cursor + window
+            refresh_rollups([sensor_id], max(cursor, start), min(next_cursor - timedelta(microseconds=1), end), using=using)
+            cursor = next_cursor
+            windows += 1
+        self.stdout.write(f"📈 Sensor {sensor_id}: rebuilt {windows} window(s).")
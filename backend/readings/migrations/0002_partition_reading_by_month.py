@@ -0,0 +1,109 @@
+# Converts readings_reading into a table range-partitioned by month on PostgreSQL.
+# The ORM model is unchanged; on other databases this migration is a no-op.
+
+from django.db import migrations
+
+TABLE = "readings_reading"
+OLD_TABLE = "readings_reading_unpartitioned"
+COLUMNS = "id, temperature, humidity, timestamp, sensor_id"
+
+# Months pre-created past the current one; manage_reading_partitions keeps this up
+MONTHS_AHEAD = 3
+
+
+def _drop_constraints_and_indexes(schema_editor, table):
+    """Free constraint/index names (they are schema-global) so the new table can reuse them."""
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    for name, info in constraints.items():
+        if info["primary_key"] or info["unique"] or info["foreign_key"] or info["check"]:
+            schema_editor.execute(f'ALTER TABLE "{table}" DROP CONSTRAINT IF EXISTS "{name}"')
+    for name, info in constraints.items():
+        if info["index"]:
+            schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+def _create_constraints_and_indexes(schema_editor, model):
+    """Recreate the unique, foreign key and index definitions Django expects for the model."""
+    sensor = model._meta.get_field("sensor")
+    schema_editor.execute(schema_editor._create_unique_sql(model, [sensor, model._meta.get_field("timestamp")]))
+    schema_editor.execute(schema_editor._create_fk_sql(model, sensor, "_fk_%(to_table)s_%(to_column)s"))
+    schema_editor.execute(schema_editor._create_index_sql(model, fields=[sensor]))
+    for index in model._meta.indexes:
+        schema_editor.add_index(model, index)
+
+
+def _copy_rows(schema_editor, source, target):
+    schema_editor.execute(f'INSERT INTO "{target}" ({COLUMNS}) SELECT {COLUMNS} FROM "{source}"')
+    schema_editor.execute(
+        f"SELECT setval(pg_get_serial_sequence('\"{target}\"', 'id'), "
+        f'COALESCE((SELECT MAX(id) FROM "{target}"), 0) + 1, false)'
+    )
+
+
+def partition_readings(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    Reading = apps.get_model("readings", "Reading")
+
+    schema_editor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{OLD_TABLE}"')
+    _drop_constraints_and_indexes(schema_editor, OLD_TABLE)
+
+    # The partition key must be part of every unique constraint, so the
+    # primary key becomes (id, timestamp); id stays unique via its sequence.
+    schema_editor.execute(
+        f'CREATE TABLE "{TABLE}" ('
+        " id bigint GENERATED BY DEFAULT AS IDENTITY,"
+        " temperature double precision NOT NULL,"
+        " humidity double precision NOT NULL,"
+        ' "timestamp" timestamp with time zone NOT NULL,'
+        " sensor_id bigint NOT NULL,"
+        f' CONSTRAINT "{TABLE}_pkey" PRIMARY KEY (id, "timestamp")'
+        ') PARTITION BY RANGE ("timestamp")'
+    )
+    schema_editor.execute(f'CREATE TABLE "{TABLE}_default" PARTITION OF "{TABLE}" DEFAULT')
+
+    # One partition per month from the oldest reading through MONTHS_AHEAD months from now
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT to_char(month, 'YYYY_MM'), month, month + interval '1 month' FROM generate_series("
+            f"  date_trunc('month', COALESCE((SELECT MIN(\"timestamp\") FROM \"{OLD_TABLE}\"), now()) AT TIME ZONE 'UTC'),"
+            f"  date_trunc('month', now() AT TIME ZONE 'UTC') + interval '{MONTHS_AHEAD} months',"
+            "  interval '1 month'"
+            ") AS month"
+        )
+        months = cursor.fetchall()
+    for suffix, lower, upper in months:
+        schema_editor.execute(
+            f'CREATE TABLE "{TABLE}_p{suffix}" PARTITION OF "{TABLE}" '
+            f"FOR VALUES FROM ('{lower:%Y-%m-%d} 00:00+00') TO ('{upper:%Y-%m-%d} 00:00+00')"
+        )
+
+    _copy_rows(schema_editor, OLD_TABLE, TABLE)
+    schema_editor.execute(f'DROP TABLE "{OLD_TABLE}"')
+    _create_constraints_and_indexes(schema_editor, Reading)
+
+
+def unpartition_readings(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    Reading = apps.get_model("readings", "Reading")
+
+    schema_editor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{OLD_TABLE}"')
+    _drop_constraints_and_indexes(schema_editor, OLD_TABLE)
+    schema_editor.create_model(Reading)
+    _copy_rows(schema_editor, OLD_TABLE, TABLE)
+    # Dropping the partitioned parent drops all of its partitions
+    schema_editor.execute(f'DROP TABLE "{OLD_TABLE}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("readings", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_readings, unpartition_readings),
+    ]
@@ -0,0 +1,122 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:43
+
+from datetime import datetime, timezone
+
+import django.db.models.deletion
+from django.db import NotSupportedError, migrations, models
+from django.db.models import Count, Func, Max, Min, Sum
+
+
+class EpochBucket(Func):
+    """Frozen copy of readings.functions.EpochBucket as of this migration"""
+
+    output_field = models.BigIntegerField()
+
+    def __init__(self, expression, width, **extra):
+        self.width = int(width)
+        super().__init__(expression, **extra)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        raise NotSupportedError(f"EpochBucket is not supported on {connection.vendor}")
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        template = f"(FLOOR(EXTRACT(EPOCH FROM %(expressions)s) / {self.width}) * {self.width})::bigint"
+        return super().as_sql(compiler, connection, template=template, **extra_context)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        template = f"((CAST(strftime('%%%%s', %(expressions)s) AS INTEGER) / {self.width}) * {self.width})"
+        return super().as_sql(compiler, connection, template=template, **extra_context)
+
+
+def backfill_rollups(apps, schema_editor):
+    """Build hourly rollups from existing readings, then daily ones from the hourly rows."""
+    alias = schema_editor.connection.alias
+    Reading = apps.get_model("readings", "Reading")
+    HourlyReadingRollup = apps.get_model("readings", "HourlyReadingRollup")
+    DailyReadingRollup = apps.get_model("readings", "DailyReadingRollup")
+
+    levels = [
+        (Reading, "timestamp", HourlyReadingRollup, 3600, {
+            "count": Count("id"),
+            "temperature_min": Min("temperature"),
+            "temperature_max": Max("temperature"),
+            "temperature_sum": Sum("temperature"),
+            "humidity_min": Min("humidity"),
+            "humidity_max": Max("humidity"),
+            "humidity_sum": Sum("humidity"),
+        }),
+        (HourlyReadingRollup, "bucket_start", DailyReadingRollup, 86400, {
+            "count": Sum("count"),
+            "temperature_min": Min("temperature_min"),
+            "temperature_max": Max("temperature_max"),
+            "temperature_sum": Sum("temperature_sum"),
+            "humidity_min": Min("humidity_min"),
+            "humidity_max": Max("humidity_max"),
+            "humidity_sum": Sum("humidity_sum"),
+        }),
+    ]
+    for source, time_field, target, width, aggregates in levels:
+        rows = (
+            source.objects.using(alias)
+            .annotate(bucket=EpochBucket(time_field, width))
+            .values("sensor_id", "bucket")
+            .annotate(**aggregates)
+            .order_by()
+        )
+        target.objects.using(alias).bulk_create(
+            (
+                target(bucket_start=datetime.fromtimestamp(row.pop("bucket"), tz=timezone.utc), **row)
+                for row in rows.iterator()
+            ),
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('readings', '0002_partition_reading_by_month'),
+        ('sensors', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyReadingRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField()),
+                ('count', models.PositiveIntegerField()),
+                ('temperature_min', models.FloatField()),
+                ('temperature_max', models.FloatField()),
+                ('temperature_sum', models.FloatField()),
+                ('humidity_min', models.FloatField()),
+                ('humidity_max', models.FloatField()),
+                ('humidity_sum', models.FloatField()),
+                ('sensor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='sensors.sensor')),
+            ],
+            options={
+                'abstract': False,
+                'unique_together': {('sensor', 'bucket_start')},
+            },
+        ),
+        migrations.CreateModel(
+            name='HourlyReadingRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField()),
+                ('count', models.PositiveIntegerField()),
+                ('temperature_min', models.FloatField()),
+                ('temperature_max', models.FloatField()),
+                ('temperature_sum', models.FloatField()),
+                ('humidity_min', models.FloatField()),
+                ('humidity_max', models.FloatField()),
+                ('humidity_sum', models.FloatField()),
+                ('sensor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='sensors.sensor')),
+            ],
+            options={
+                'abstract': False,
+                'unique_together': {('sensor', 'bucket_start')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
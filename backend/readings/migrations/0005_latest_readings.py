@@ -0,0 +1,145 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:15
+
+from datetime import datetime, timedelta, timezone
+
+import struct
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+
+# Frozen copy of the version 1 chunk decoder of readings/codec.py as of this
+# migration, so later codec changes cannot alter the backfill.
+HEADER = struct.Struct("<BI")
+DOD_BUCKET_BITS = (7, 9, 12, 32)
+DOD_FALLBACK_BITS = 67
+
+
+class BitReader:
+    def __init__(self, data, offset=0):
+        self._data = data
+        self._pos = offset * 8
+
+    def read(self, bits):
+        start, end = self._pos, self._pos + bits
+        first, last = start >> 3, (end + 7) >> 3
+        window = int.from_bytes(self._data[first:last], "big")
+        self._pos = end
+        return (window >> (last * 8 - end)) & ((1 << bits) - 1)
+
+
+def _signed(value, bits):
+    return value - (1 << bits) if value >> (bits - 1) else value
+
+
+def _read_integers(reader, count):
+    values = []
+    previous = previous_delta = 0
+    for index in range(count):
+        if index == 0:
+            previous = _signed(reader.read(64), 64)
+            values.append(previous)
+            continue
+        dod = 0
+        if reader.read(1):
+            bits = DOD_FALLBACK_BITS
+            for bucket_bits in DOD_BUCKET_BITS:
+                if not reader.read(1):
+                    bits = bucket_bits
+                    break
+            dod = _signed(reader.read(bits), bits)
+        previous_delta += dod
+        previous += previous_delta
+        values.append(previous)
+    return values
+
+
+def _read_floats(reader, count):
+    values = []
+    previous = 0
+    leading = trailing = 0
+    for index in range(count):
+        if index == 0:
+            previous = reader.read(64)
+        elif reader.read(1):
+            if reader.read(1):
+                leading = reader.read(5)
+                meaningful = reader.read(6) or 64
+                trailing = 64 - leading - meaningful
+            previous ^= reader.read(64 - leading - trailing) << trailing
+        values.append(struct.unpack("<d", struct.pack("<Q", previous))[0])
+    return values
+
+
+def decode_chunk(data):
+    data = bytes(data)
+    version, count = HEADER.unpack_from(data)
+    if version != 1:
+        raise ValueError(f"Unsupported reading chunk version {version}")
+    reader = BitReader(data, HEADER.size)
+    ids = _read_integers(reader, count)
+    timestamps = _read_integers(reader, count)
+    temperatures = _read_floats(reader, count)
+    humidities = _read_floats(reader, count)
+    return list(zip(ids, timestamps, temperatures, humidities))
+
+
+def backfill_latest_readings(apps, schema_editor):
+    """Snapshot each sensor's reading count (from the daily rollups) and newest reading."""
+    alias = schema_editor.connection.alias
+    Reading = apps.get_model("readings", "Reading")
+    ReadingChunk = apps.get_model("readings", "ReadingChunk")
+    DailyReadingRollup = apps.get_model("readings", "DailyReadingRollup")
+    LatestReading = apps.get_model("readings", "LatestReading")
+
+    counts = (
+        DailyReadingRollup.objects.using(alias)
+        .values("sensor_id")
+        .annotate(total=Sum("count"))
+        .filter(total__gt=0)
+        .values_list("sensor_id", "total")
+        .order_by()
+    )
+    snapshots = []
+    for sensor_id, count in counts:
+        latest = Reading.objects.using(alias).filter(sensor_id=sensor_id).order_by("-timestamp").first()
+        values = latest and (latest.id, latest.timestamp, latest.temperature, latest.humidity)
+        chunk = ReadingChunk.objects.using(alias).filter(sensor_id=sensor_id).order_by("-day").first()
+        if chunk is not None and (latest is None or chunk.last_timestamp > latest.timestamp):
+            id_, timestamp_us, temperature, humidity = decode_chunk(chunk.data)[-1]
+            timestamp = datetime(1970, 1, 1, tzinfo=timezone.utc) + timedelta(microseconds=timestamp_us)
+            values = (id_, timestamp, temperature, humidity)
+        if values:
+            reading_id, timestamp, temperature, humidity = values
+            snapshots.append(LatestReading(
+                sensor_id=sensor_id,
+                reading_id=reading_id,
+                timestamp=timestamp,
+                temperature=temperature,
+                humidity=humidity,
+                count=count,
+            ))
+    LatestReading.objects.using(alias).bulk_create(snapshots, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('readings', '0004_reading_chunks'),
+        ('sensors', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LatestReading',
+            fields=[
+                ('sensor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='latest_reading', serialize=False, to='sensors.sensor')),
+                ('reading_id', models.BigIntegerField()),
+                ('timestamp', models.DateTimeField()),
+                ('temperature', models.FloatField()),
+                ('humidity', models.FloatField()),
+                ('count', models.PositiveBigIntegerField()),
+            ],
+        ),
+        migrations.RunPython(backfill_latest_readings, migrations.RunPython.noop),
+    ]
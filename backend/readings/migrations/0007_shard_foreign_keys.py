@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:22
+#
+# No database foreign keys from the readings tables to sensors_sensor: on
+# reading shards (readings/sharding.py) the sensors, which live on the
+# primary, are not there to reference.
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('readings', '0006_latest_reading_version'),
+        ('sensors', '0004_sensor_readings_shard'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dailyreadingrollup',
+            name='sensor',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='sensors.sensor'),
+        ),
+        migrations.AlterField(
+            model_name='hourlyreadingrollup',
+            name='sensor',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='sensors.sensor'),
+        ),
+        migrations.AlterField(
+            model_name='latestreading',
+            name='sensor',
+            field=models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='latest_reading', serialize=False, to='sensors.sensor'),
+        ),
+        migrations.AlterField(
+            model_name='reading',
+            name='sensor',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='readings', to='sensors.sensor'),
+        ),
+        migrations.AlterField(
+            model_name='readingchunk',
+            name='sensor',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='sensors.sensor'),
+        ),
+    ]
@@ -3,10 +3,15 @@ from django.db import models
 from sensors.models import Sensor
 
 class Reading(models.Model):
+    # On PostgreSQL the table is range-partitioned by month on timestamp
+    # (migration 0002, readings/partitions.py); its database primary key is
+    # (id, timestamp), while id alone remains unique through its sequence.
     sensor = models.ForeignKey(
         Sensor,
         on_delete=models.CASCADE,
-        related_name="readings"
+        related_name="readings",
+        # Sensors live on the primary, readings maybe on a shard (readings/sharding.py)
+        db_constraint=False,
     )
     temperature = models.FloatField()
     humidity = models.FloatField()
@@ -20,3 +25,95 @@ class Reading(models.Model):
 
     def __str__(self):
         return f"{self.sensor.name} @ {self.timestamp}"
+
+
+class ReadingRollup(models.Model):
+    """Per-sensor aggregate of the readings in one time bucket, kept up to date on ingest"""
+
+    sensor = models.ForeignKey(
+        Sensor,
+        on_delete=models.CASCADE,
+        related_name="+",
+        db_constraint=False,
+    )
+    bucket_start = models.DateTimeField()
+    count = models.PositiveIntegerField()
+    temperature_min = models.FloatField()
+    temperature_max = models.FloatField()
+    temperature_sum = models.FloatField()
+    humidity_min = models.FloatField()
+    humidity_max = models.FloatField()
+    humidity_sum = models.FloatField()
+
+    # Bucket width in seconds, aligned to the Unix epoch (i.e. UTC)
+    bucket_seconds = None
+
+    class Meta:
+        abstract = True
+        unique_together = ("sensor", "bucket_start")
+
+
+class HourlyReadingRollup(ReadingRollup):
+    bucket_seconds = 3600
+
+    def __str__(self):
+        return f"{self.sensor_id} hour @ {self.bucket_start}"
+
+
+class DailyReadingRollup(ReadingRollup):
+    bucket_seconds = 86400
+
+    def __str__(self):
+        return f"{self.sensor_id} day @ {self.bucket_start}"
+
+
+class ReadingChunk(models.Model):
+    """One sensor's readings for one UTC day, compacted out of the raw table.
+
+    ``data`` holds the Gorilla-encoded ids, timestamps and values (see
+    readings/codec.py); the other columns let queries skip chunks without
+    decoding them.
+    """
+
+    sensor = models.ForeignKey(
+        Sensor,
+        on_delete=models.CASCADE,
+        related_name="+",
+        db_constraint=False,
+    )
+    day = models.DateField()
+    first_timestamp = models.DateTimeField()
+    last_timestamp = models.DateTimeField()
+    count = models.PositiveIntegerField()
+    data = models.BinaryField()
+
+    class Meta:
+        unique_together = ("sensor", "day")
+
+    def __str__(self):
+        return f"{self.sensor_id} chunk @ {self.day} ({self.count} readings)"
+
+
+class LatestReading(models.Model):
+    """A sensor's newest reading and reading count, kept up to date on ingest
+    so sensor listings need no reading queries (see readings/snapshots.py)"""
+
+    sensor = models.OneToOneField(
+        Sensor,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="latest_reading",
+        db_constraint=False,
+    )
+    # Not a foreign key: the reading may since have been compacted (ReadingChunk)
+    reading_id = models.BigIntegerField()
+    timestamp = models.DateTimeField()
+    temperature = models.FloatField()
+    humidity = models.FloatField()
+    count = models.PositiveBigIntegerField()
+    # Bumped on every write to the sensor's readings; HTTP validators derive from these
+    version = models.PositiveBigIntegerField(default=1)
+    updated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.sensor_id} latest @ {self.timestamp} ({self.count} readings)"
@@ -0,0 +1,94 @@
+# readings/partitions.py
+"""Monthly range partitions of the readings table (PostgreSQL only).
+
+Migration 0002 turns ``readings_reading`` into a table partitioned by
+``timestamp``. Partitions are named ``readings_reading_pYYYY_MM`` and cover one
+UTC month each; ``readings_reading_default`` catches rows outside them.
+"""
+import re
+from datetime import date
+
+from readings.models import Reading
+
+PARENT_TABLE = Reading._meta.db_table
+DEFAULT_PARTITION = f"{PARENT_TABLE}_default"
+PARTITION_NAME_RE = re.compile(rf"^{PARENT_TABLE}_p(\d{{4}})_(\d{{2}})$")
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"{PARENT_TABLE}_p{month.year:04d}_{month.month:02d}"
+
+
+def partition_month(name):
+    """Month covered by a partition name, or None for names this module does not manage"""
+    match = PARTITION_NAME_RE.match(name)
+    if not match:
+        return None
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+
+def is_partitioned(connection):
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)",
+            [PARENT_TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions(connection):
+    """Monthly partitions attached to the readings table, as {month: name}"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(%s)",
+            [PARENT_TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    return {partition_month(name): name for name in names if partition_month(name)}
+
+
+def create_partition(connection, month):
+    """Create and attach the partition for ``month``.
+
+    Rows that already landed in the default partition for that month are
+    moved into the new partition first, since ATTACH would otherwise fail.
+    """
+    quote = connection.ops.quote_name
+    name = partition_name(month)
+    lower, upper = month.isoformat(), add_months(month, 1).isoformat()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE {quote(name)} (LIKE {quote(PARENT_TABLE)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        )
+        cursor.execute(
+            f"WITH moved AS (DELETE FROM {quote(DEFAULT_PARTITION)} "
+            f"WHERE {quote('timestamp')} >= %s::timestamptz AND {quote('timestamp')} < %s::timestamptz RETURNING *) "
+            f"INSERT INTO {quote(name)} SELECT * FROM moved",
+            [f"{lower} 00:00+00", f"{upper} 00:00+00"],
+        )
+        cursor.execute(
+            f"ALTER TABLE {quote(PARENT_TABLE)} ATTACH PARTITION {quote(name)} "
+            f"FOR VALUES FROM ('{lower} 00:00+00') TO ('{upper} 00:00+00')"
+        )
+    return name
+
+
+def drop_partition(connection, name, keep_table=False):
+    """Detach a partition and drop it, or keep it as a standalone table for archiving"""
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {quote(PARENT_TABLE)} DETACH PARTITION {quote(name)}")
+        if not keep_table:
+            cursor.execute(f"DROP TABLE {quote(name)}")
@@ -0,0 +1,268 @@
+# readings/rollups.py
+"""Hourly and daily reading rollups.
+
+Rollups are maintained as readings arrive: ``add_reading`` folds a single new
+reading into its buckets, ``refresh_rollups`` recomputes the buckets of a time
+range from scratch (used after batch writes, which may overwrite readings).
+``bucket_series`` answers aggregate queries from the coarsest rollup the
+requested bucket width and range allow, falling back to raw readings.
+``refresh_rollups`` also refreshes the sensors' latest-reading snapshots.
+"""
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connections, transaction
+from django.db.models import Count, F, Max, Min, Sum, Value
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+
+from readings.cold import cold_aggregates, merge_aggregates
+from readings.functions import EpochBucket
+from readings.models import DailyReadingRollup, HourlyReadingRollup, Reading
+from readings.snapshots import refresh_snapshots
+
+# Finest first: each level is rebuilt from the one before it
+ROLLUP_MODELS = (HourlyReadingRollup, DailyReadingRollup)
+
+ROLLUP_BATCH_SIZE = 1_000
+
+# First key of the pg_advisory_xact_lock(int, int) pairs serializing rebuilds per sensor
+ROLLUP_LOCK_NAMESPACE = 0x526F6C6C  # "Roll"
+
+RAW_AGGREGATES = {
+    "count": Count("id"),
+    "temperature_min": Min("temperature"),
+    "temperature_max": Max("temperature"),
+    "temperature_sum": Sum("temperature"),
+    "humidity_min": Min("humidity"),
+    "humidity_max": Max("humidity"),
+    "humidity_sum": Sum("humidity"),
+}
+
+ROLLUP_AGGREGATES = {
+    "count": Sum("count"),
+    "temperature_min": Min("temperature_min"),
+    "temperature_max": Max("temperature_max"),
+    "temperature_sum": Sum("temperature_sum"),
+    "humidity_min": Min("humidity_min"),
+    "humidity_max": Max("humidity_max"),
+    "humidity_sum": Sum("humidity_sum"),
+}
+
+
+def _aware(value):
+    return timezone.make_aware(value) if timezone.is_naive(value) else value
+
+
+def _epoch(value):
+    return math.floor(_aware(value).timestamp())
+
+
+def _from_epoch(seconds):
+    return datetime.fromtimestamp(seconds, tz=dt_timezone.utc)
+
+
+def bucket_floor(value, seconds):
+    return _from_epoch(_epoch(value) // seconds * seconds)
+
+
+def is_aligned(value, seconds):
+    aware = _aware(value)
+    return aware.microsecond == 0 and _epoch(aware) % seconds == 0
+
+
+def add_reading(reading, using=DEFAULT_DB_ALIAS):
+    """Fold one newly inserted reading into its hourly and daily buckets."""
+    for model in ROLLUP_MODELS:
+        bucket = model.objects.using(using).filter(
+            sensor_id=reading.sensor_id,
+            bucket_start=bucket_floor(reading.timestamp, model.bucket_seconds),
+        )
+        changes = {
+            "count": F("count") + 1,
+            "temperature_min": Least("temperature_min", Value(reading.temperature)),
+            "temperature_max": Greatest("temperature_max", Value(reading.temperature)),
+            "temperature_sum": F("temperature_sum") + reading.temperature,
+            "humidity_min": Least("humidity_min", Value(reading.humidity)),
+            "humidity_max": Greatest("humidity_max", Value(reading.humidity)),
+            "humidity_sum": F("humidity_sum") + reading.humidity,
+        }
+        if bucket.update(**changes):
+            continue
+        try:
+            with transaction.atomic(using=using):
+                model.objects.using(using).create(
+                    sensor_id=reading.sensor_id,
+                    bucket_start=bucket_floor(reading.timestamp, model.bucket_seconds),
+                    count=1,
+                    temperature_min=reading.temperature,
+                    temperature_max=reading.temperature,
+                    temperature_sum=reading.temperature,
+                    humidity_min=reading.humidity,
+                    humidity_max=reading.humidity,
+                    humidity_sum=reading.humidity,
+                )
+        except IntegrityError:
+            # A concurrent writer created the bucket first
+            bucket.update(**changes)
+
+
+def _in_range(qs, field, sensor_ids, lower, upper):
+    if sensor_ids is not None:
+        qs = qs.filter(sensor_id__in=sensor_ids)
+    if lower is not None:
+        qs = qs.filter(**{f"{field}__gte": lower})
+    if upper is not None:
+        qs = qs.filter(**{f"{field}__lt": upper})
+    return qs
+
+
+def _lock_sensors(sensor_ids, using):
+    """Serialize concurrent rebuilds of the same sensors until the transaction ends.
+
+    Taken in sensor order so two rebuilds of overlapping sets cannot deadlock.
+    Other backends serialize writers on their own.
+    """
+    connection = connections[using]
+    if connection.vendor != "postgresql" or sensor_ids is None:
+        return
+    with connection.cursor() as cursor:
+        for sensor_id in sorted(set(sensor_ids)):
+            cursor.execute("SELECT pg_advisory_xact_lock(%s, %s)", [ROLLUP_LOCK_NAMESPACE, sensor_id])
+
+
+def refresh_rollups(sensor_ids=None, start=None, end=None, using=DEFAULT_DB_ALIAS):
+    """Recompute the rollup buckets overlapping [start, end] from raw readings.
+
+    ``None`` for ``sensor_ids``, ``start`` or ``end`` leaves that dimension
+    unbounded. Hourly buckets are rebuilt from readings, raw and compacted,
+    daily ones from the hourly rollups, and the sensors' latest-reading
+    snapshots from the daily ones (readings/snapshots.py).
+
+    Rebuilds of the same sensors are serialized on PostgreSQL, and buckets a
+    concurrent ``add_reading`` creates mid-rebuild are overwritten rather
+    than failing the insert.
+    """
+    with transaction.atomic(using=using):
+        _lock_sensors(sensor_ids, using)
+        source, time_field, aggregates = Reading.objects.using(using), "timestamp", RAW_AGGREGATES
+        for model in ROLLUP_MODELS:
+            width = model.bucket_seconds
+            lower = bucket_floor(start, width) if start is not None else None
+            upper = bucket_floor(end, width) + timedelta(seconds=width) if end is not None else None
+
+            buckets = (
+                _in_range(source, time_field, sensor_ids, lower, upper)
+                .annotate(bucket=EpochBucket(time_field, width))
+                .values("sensor_id", "bucket")
+                .annotate(**aggregates)
+                .order_by()
+            )
+            rows = buckets.iterator()
+            if model is ROLLUP_MODELS[0]:
+                # Compacted readings count too (readings/cold.py)
+                cold_end = upper - timedelta(microseconds=1) if upper is not None else None
+                cold = cold_aggregates(sensor_ids, lower, cold_end, width, using=using)
+                if cold:
+                    rows = merge_aggregates(rows, cold)
+            _in_range(model.objects.using(using), "bucket_start", sensor_ids, lower, upper).delete()
+            model.objects.using(using).bulk_create(
+                (
+                    model(bucket_start=_from_epoch(row.pop("bucket")), **row)
+                    for row in rows
+                ),
+                batch_size=ROLLUP_BATCH_SIZE,
+                update_conflicts=True,
+                unique_fields=["sensor", "bucket_start"],
+                update_fields=list(ROLLUP_AGGREGATES),
+            )
+            source, time_field, aggregates = model.objects.using(using), "bucket_start", ROLLUP_AGGREGATES
+        refresh_snapshots(sensor_ids, using=using)
+
+
+def refresh_rollups_for(keys, using=DEFAULT_DB_ALIAS):
+    """Refresh rollups covering ``(sensor_id, timestamp)`` pairs, one time range per sensor."""
+    ranges = {}
+    for sensor_id, timestamp in keys:
+        timestamp = _aware(timestamp)
+        first, last = ranges.get(sensor_id, (timestamp, timestamp))
+        ranges[sensor_id] = (min(first, timestamp), max(last, timestamp))
+    for sensor_id, (first, last) in ranges.items():
+        refresh_rollups([sensor_id], first, last, using=using)
+
+
+def bucket_width_for(span_seconds, points):
+    """Bucket width yielding about ``points`` buckets, rounded up to whole hours or days
+    once it is that coarse so the rollups can serve it."""
+    width = max(1, math.ceil(span_seconds / points))
+    for model in reversed(ROLLUP_MODELS):
+        if width >= model.bucket_seconds:
+            return math.ceil(width / model.bucket_seconds) * model.bucket_seconds
+    return width
+
+
+def _rollup_for(width, timestamp_from, timestamp_to):
+    """Coarsest rollup whose buckets nest exactly in ``width`` and the requested range"""
+    for model in reversed(ROLLUP_MODELS):
+        seconds = model.bucket_seconds
+        if width % seconds:
+            continue
+        if timestamp_from is not None and not is_aligned(timestamp_from, seconds):
+            continue
+        if timestamp_to is not None and not is_aligned(timestamp_to, seconds):
+            continue
+        return model
+    return None
+
+
+def bucket_series(readings, sensor_id, width, timestamp_from=None, timestamp_to=None):
+    """Per-bucket count/min/max/avg of ``readings`` (already filtered to the sensor and range)."""
+    return bucket_series_many(readings, [sensor_id], width, timestamp_from, timestamp_to).get(sensor_id, [])
+
+
+def bucket_series_many(readings, sensor_ids, width, timestamp_from=None, timestamp_to=None):
+    """``bucket_series`` for several sensors in one grouped query: {sensor_id: series}.
+
+    ``readings`` must already be filtered to ``sensor_ids`` and the range.
+    """
+    model = _rollup_for(width, timestamp_from, timestamp_to)
+    # timestamp_to is inclusive: a reading exactly on it belongs to a bucket
+    # past the range, so only the raw table can answer that case
+    if model is not None and timestamp_to is not None and (
+        readings.filter(timestamp=timestamp_to).exists()
+        or cold_aggregates(sensor_ids, timestamp_to, timestamp_to, width, using=readings.db)
+    ):
+        model = None
+
+    if model is None:
+        rows = readings.annotate(bucket=EpochBucket("timestamp", width)).values("sensor_id", "bucket").annotate(**RAW_AGGREGATES)
+        cold = cold_aggregates(sensor_ids, timestamp_from, timestamp_to, width, using=readings.db)
+        if cold:
+            rows = sorted(
+                merge_aggregates(rows.order_by("sensor_id", "bucket"), cold),
+                key=lambda row: (row["sensor_id"], row["bucket"]),
+            )
+    else:
+        rollups = model.objects.using(readings.db).filter(sensor_id__in=sensor_ids)
+        if timestamp_from is not None:
+            rollups = rollups.filter(bucket_start__gte=timestamp_from)
+        if timestamp_to is not None:
+            rollups = rollups.filter(bucket_start__lt=timestamp_to)
+        rows = rollups.annotate(bucket=EpochBucket("bucket_start", width)).values("sensor_id", "bucket").annotate(**ROLLUP_AGGREGATES)
+
+    if not isinstance(rows, list):
+        rows = rows.order_by("sensor_id", "bucket")
+    series = {}
+    for row in rows:
+        count = row["count"]
+        series.setdefault(row["sensor_id"], []).append({
+            "bucket_start": _from_epoch(row["bucket"]),
+            "count": count,
+            "temperature_min": row["temperature_min"],
+            "temperature_max": row["temperature_max"],
+            "temperature_avg": row["temperature_sum"] / count,
+            "humidity_min": row["humidity_min"],
+            "humidity_max": row["humidity_max"],
+            "humidity_avg": row["humidity_sum"] / count,
+        })
+    return series
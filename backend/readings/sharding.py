@@ -0,0 +1,244 @@
+# readings/sharding.py
+"""Reading storage sharded by sensor.
+
+A sensor's readings, together with its chunks, rollups and latest-reading
+snapshot, live on one database alias, its shard, recorded in
+``Sensor.readings_shard``. Sensors, users and everything else stay on the
+primary (``default``). Configured by ``settings.READINGS_SHARDS``:
+
+    SHARDS      database aliases holding readings (see DB_READING_SHARDS in
+                settings); just ["default"] turns sharding off
+    VNODES      points per shard on the consistent-hash ring
+    CACHE_TTL   seconds a process trusts a cached placement; moves wait this
+                long before removing the source copy (rebalance_readings)
+    MAX_SIZE    placements cached per process
+
+New sensors are placed by the ring when created, so adding a shard only
+remaps about 1/N of the sensors; ``rebalance_readings`` moves existing
+sensors to where the ring puts them, online. Sensors created with
+``bulk_create`` bypass signals and stay on ``default`` until rebalanced.
+
+Reads of the ``default`` shard keep going through the read-replica router
+(mysite/routers.py); other shards are read from their own alias.
+"""
+import bisect
+import threading
+from collections import defaultdict
+from hashlib import blake2b
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from readings.models import DailyReadingRollup, HourlyReadingRollup, LatestReading, Reading, ReadingChunk
+from sensors.models import Sensor
+from sensors.ownership import LocalOwnerCache
+
+DEFAULTS = {
+    "SHARDS": [DEFAULT_DB_ALIAS],
+    "VNODES": 64,
+    "CACHE_TTL": 60,
+    "MAX_SIZE": 100_000,
+}
+
+# Everything stored per sensor on its shard
+SENSOR_DATA_MODELS = (Reading, ReadingChunk, HourlyReadingRollup, DailyReadingRollup, LatestReading)
+
+# Readings per INSERT when copying a sensor to another shard
+COPY_BATCH_SIZE = 5_000
+
+
+def shard_config():
+    return {**DEFAULTS, **getattr(settings, "READINGS_SHARDS", {})}
+
+
+def shard_aliases():
+    return list(shard_config()["SHARDS"])
+
+
+def sharding_enabled():
+    return shard_aliases() != [DEFAULT_DB_ALIAS]
+
+
+def _hash(value):
+    return int.from_bytes(blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent-hash ring of ``nodes``, each at ``vnodes`` points"""
+
+    def __init__(self, nodes, vnodes):
+        if not nodes:
+            raise ValueError("A hash ring needs at least one node")
+        points = sorted((_hash(f"{node}#{index}"), node) for node in nodes for index in range(vnodes))
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node_for(self, key):
+        """The node owning ``key``: the first point clockwise of its hash"""
+        index = bisect.bisect(self._hashes, _hash(str(key))) % len(self._hashes)
+        return self._nodes[index]
+
+
+_ring = None
+_placements = None
+_state_lock = threading.Lock()
+
+
+def get_ring():
+    global _ring
+    if _ring is None:
+        with _state_lock:
+            if _ring is None:
+                config = shard_config()
+                _ring = HashRing(config["SHARDS"], config["VNODES"])
+    return _ring
+
+
+def _placement_cache():
+    global _placements
+    if _placements is None:
+        with _state_lock:
+            if _placements is None:
+                config = shard_config()
+                _placements = LocalOwnerCache(config["CACHE_TTL"], config["MAX_SIZE"])
+    return _placements
+
+
+def ring_shard(sensor_id):
+    """The shard the ring assigns ``sensor_id`` to"""
+    return get_ring().node_for(sensor_id)
+
+
+def shard_for_sensor(sensor_id):
+    """Alias holding the sensor's readings; writes go here"""
+    if not sharding_enabled():
+        return DEFAULT_DB_ALIAS
+    cache = _placement_cache()
+    shard = cache.get(sensor_id)
+    if shard is None:
+        shard = Sensor.objects.using(DEFAULT_DB_ALIAS).filter(id=sensor_id).values_list("readings_shard", flat=True).first()
+        shard = shard or DEFAULT_DB_ALIAS
+        cache.set(sensor_id, shard)
+    return shard
+
+
+def sensors_by_shard(sensor_ids):
+    """``{alias: [sensor_id, ...]}`` for ``sensor_ids``, with one query for placements not cached"""
+    sensor_ids = list(dict.fromkeys(sensor_ids))
+    if not sharding_enabled():
+        return {DEFAULT_DB_ALIAS: sensor_ids} if sensor_ids else {}
+    cache = _placement_cache()
+    placements = {sensor_id: cache.get(sensor_id) for sensor_id in sensor_ids}
+    missing = [sensor_id for sensor_id, shard in placements.items() if shard is None]
+    if missing:
+        placements.update(
+            Sensor.objects.using(DEFAULT_DB_ALIAS).filter(id__in=missing).values_list("id", "readings_shard")
+        )
+        for sensor_id in missing:
+            placements[sensor_id] = placements[sensor_id] or DEFAULT_DB_ALIAS
+            cache.set(sensor_id, placements[sensor_id])
+    groups = defaultdict(list)
+    for sensor_id in sensor_ids:
+        groups[placements[sensor_id]].append(sensor_id)
+    return dict(groups)
+
+
+def read_alias(shard):
+    """``using`` for reads of ``shard``: None leaves the default shard to the database routers"""
+    return None if shard == DEFAULT_DB_ALIAS else shard
+
+
+def reading_db(sensor_id):
+    """``using`` for reads of the sensor's readings"""
+    return read_alias(shard_for_sensor(sensor_id))
+
+
+def delete_sensor_data(sensor_ids, using):
+    """Delete the sensors' readings, chunks, rollups and snapshots on ``using``, one DELETE per table"""
+    with transaction.atomic(using=using):
+        return sum(
+            model.objects.using(using).filter(sensor_id__in=sensor_ids).delete()[0]
+            for model in SENSOR_DATA_MODELS
+        )
+
+
+def delete_readings_batch(sensor_id, using, batch_size):
+    """Delete the sensor's ``batch_size`` oldest raw readings on ``using`` with one
+    range DELETE on the (sensor, timestamp) index; returns rows deleted"""
+    readings = Reading.objects.using(using).filter(sensor_id=sensor_id)
+    bound = next(iter(readings.order_by("timestamp").values_list("timestamp", flat=True)[batch_size - 1:batch_size]), None)
+    if bound is not None:
+        readings = readings.filter(timestamp__lte=bound)
+    with transaction.atomic(using=using):
+        return readings.delete()[0]
+
+
+def copy_sensor_data(sensor_id, source, target, changed_only=False, batch_size=COPY_BATCH_SIZE):
+    """Upsert the sensor's readings and chunks from ``source`` into ``target``;
+    returns the number of readings written.
+
+    ``changed_only`` compares each batch with the readings already on
+    ``target`` and writes only those missing there or holding other values:
+    a final pass after a first copy picks up readings inserted and updated
+    on ``source`` since. Readings get new ids on ``target``. Rollups and the
+    snapshot are not copied; ``refresh_rollups`` rebuilds them there.
+    """
+    copied, high_water = 0, 0
+    readings = (
+        Reading.objects.using(source)
+        .filter(sensor_id=sensor_id)
+        .order_by("id")
+        .values_list("id", "timestamp", "temperature", "humidity")
+    )
+    while batch := list(readings.filter(id__gt=high_water)[:batch_size]):
+        high_water = batch[-1][0]
+        rows = [(timestamp, temperature, humidity) for _, timestamp, temperature, humidity in batch]
+        if changed_only:
+            copies = set(
+                Reading.objects.using(target)
+                .filter(sensor_id=sensor_id, timestamp__in=[timestamp for timestamp, _, _ in rows])
+                .values_list("timestamp", "temperature", "humidity")
+            )
+            rows = [row for row in rows if row not in copies]
+        Reading.objects.using(target).bulk_create(
+            [
+                Reading(sensor_id=sensor_id, timestamp=timestamp, temperature=temperature, humidity=humidity)
+                for timestamp, temperature, humidity in rows
+            ],
+            update_conflicts=True,
+            unique_fields=["sensor", "timestamp"],
+            update_fields=["temperature", "humidity"],
+        )
+        copied += len(rows)
+
+    chunks = list(ReadingChunk.objects.using(source).filter(sensor_id=sensor_id))
+    for chunk in chunks:
+        chunk.id = None
+    ReadingChunk.objects.using(target).bulk_create(
+        chunks,
+        update_conflicts=True,
+        unique_fields=["sensor", "day"],
+        update_fields=["first_timestamp", "last_timestamp", "count", "data"],
+    )
+    return copied
+
+
+def place_sensor(sensor_id, shard):
+    """Point the sensor's reads and writes at ``shard``; other processes follow within CACHE_TTL"""
+    Sensor.objects.using(DEFAULT_DB_ALIAS).filter(id=sensor_id).update(readings_shard=shard)
+    forget_placement(sensor_id)
+
+
+def forget_placement(sensor_id):
+    if _placements is not None:
+        _placements.delete(sensor_id)
+
+
+def _reset_sharding(*, setting, **kwargs):
+    global _ring, _placements
+    if setting == "READINGS_SHARDS":
+        _ring = _placements = None
+
+
+setting_changed.connect(_reset_sharding)
@@ -0,0 +1,29 @@
+# readings/signals.py
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from readings.sharding import delete_sensor_data, forget_placement, place_sensor, ring_shard, sharding_enabled
+from sensors.models import Sensor
+
+
+@receiver(post_save, sender=Sensor)
+def place_new_sensor(sender, instance, created, **kwargs):
+    """Put a new sensor's readings on the shard the ring assigns it"""
+    forget_placement(instance.id)
+    if not created or not sharding_enabled():
+        return
+    shard = ring_shard(instance.id)
+    if shard != instance.readings_shard:
+        place_sensor(instance.id, shard)
+        instance.readings_shard = shard
+
+
+@receiver(post_delete, sender=Sensor)
+def delete_sharded_readings(sender, instance, **kwargs):
+    """Readings on the primary cascade with the sensor; elsewhere they go once the delete commits"""
+    sensor_id, shard = instance.id, instance.readings_shard
+    forget_placement(sensor_id)
+    if shard != DEFAULT_DB_ALIAS:
+        # Bound now: Django clears instance.id once the delete completes
+        transaction.on_commit(lambda: delete_sensor_data([sensor_id], shard))
@@ -0,0 +1,122 @@
+# readings/snapshots.py
+"""Per-sensor "latest reading" snapshots (LatestReading).
+
+``add_to_snapshot`` folds one newly inserted reading in with a single UPDATE;
+``refresh_snapshots`` recomputes snapshots after batch writes, taking the count
+from the daily rollups and the newest reading from the raw table or, once
+compacted, the newest chunk. ``refresh_rollups`` calls it, so every batch write
+path that keeps rollups fresh keeps snapshots fresh too.
+
+Both bump the snapshot's ``version`` and ``updated_at``, which therefore change
+whenever a sensor's readings do; the readings routes derive their ETag and
+Last-Modified validators from them.
+
+Snapshots live on the sensor's reading shard (readings/sharding.py);
+``attach_snapshots`` loads those a join on the primary cannot reach.
+"""
+from collections import defaultdict
+
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import Case, F, Sum, Value, When
+from django.utils import timezone
+
+from readings.cold import decode_readings
+from readings.models import DailyReadingRollup, LatestReading, Reading, ReadingChunk
+from sensors.models import Sensor
+
+
+def add_to_snapshot(reading, using=DEFAULT_DB_ALIAS):
+    """Count one newly inserted reading and make it the latest if nothing newer is known."""
+    values = {
+        "reading_id": reading.id,
+        "timestamp": reading.timestamp,
+        "temperature": reading.temperature,
+        "humidity": reading.humidity,
+    }
+    snapshot = LatestReading.objects.using(using).filter(sensor_id=reading.sensor_id)
+    changes = {"count": F("count") + 1, "version": F("version") + 1, "updated_at": timezone.now()}
+    for field, value in values.items():
+        changes[field] = Case(
+            When(timestamp__lte=reading.timestamp, then=Value(value)),
+            default=F(field),
+            output_field=LatestReading._meta.get_field(field),
+        )
+    if snapshot.update(**changes):
+        return
+    try:
+        with transaction.atomic(using=using):
+            LatestReading.objects.using(using).create(
+                sensor_id=reading.sensor_id, count=1, updated_at=changes["updated_at"], **values
+            )
+    except IntegrityError:
+        # A concurrent writer created the snapshot first
+        snapshot.update(**changes)
+
+
+def _latest(sensor_id, using):
+    latest = (
+        Reading.objects.using(using)
+        .filter(sensor_id=sensor_id)
+        .order_by("-timestamp")
+        .first()
+    )
+    chunk = ReadingChunk.objects.using(using).filter(sensor_id=sensor_id).order_by("-day").first()
+    if chunk is not None and (latest is None or chunk.last_timestamp > latest.timestamp):
+        latest = decode_readings(chunk)[-1]
+    return latest
+
+
+def refresh_snapshots(sensor_ids=None, using=DEFAULT_DB_ALIAS):
+    """Recompute snapshots from the daily rollups and newest readings (``None``: all sensors)"""
+    rollups = DailyReadingRollup.objects.using(using)
+    snapshots = LatestReading.objects.using(using)
+    if sensor_ids is not None:
+        rollups = rollups.filter(sensor_id__in=sensor_ids)
+        snapshots = snapshots.filter(sensor_id__in=sensor_ids)
+    counts = dict(
+        rollups.values("sensor_id")
+        .annotate(total=Sum("count"))
+        .filter(total__gt=0)
+        .values_list("sensor_id", "total")
+        .order_by()
+    )
+    # Sensors left without readings lose their snapshot
+    snapshots.exclude(sensor_id__in=list(counts)).delete()
+    for sensor_id, count in counts.items():
+        latest = _latest(sensor_id, using)
+        if latest is None:
+            continue
+        values = {
+            "reading_id": latest.id,
+            "timestamp": latest.timestamp,
+            "temperature": latest.temperature,
+            "humidity": latest.humidity,
+            "count": count,
+            "updated_at": timezone.now(),
+        }
+        snapshot = LatestReading.objects.using(using).filter(sensor_id=sensor_id)
+        if snapshot.update(version=F("version") + 1, **values):
+            continue
+        try:
+            with transaction.atomic(using=using):
+                LatestReading.objects.using(using).create(sensor_id=sensor_id, **values)
+        except IntegrityError:
+            # A concurrent writer created the snapshot first
+            snapshot.update(version=F("version") + 1, **values)
+
+
+def attach_snapshots(sensors):
+    """Cache each sensor's snapshot from its reading shard as ``sensor.latest_reading``.
+
+    Sensors on the primary are left alone: ``select_related("latest_reading")``
+    already joined theirs. One query per other shard.
+    """
+    by_shard = defaultdict(list)
+    for sensor in sensors:
+        if sensor.readings_shard != DEFAULT_DB_ALIAS:
+            by_shard[sensor.readings_shard].append(sensor)
+    for shard, group in by_shard.items():
+        snapshots = LatestReading.objects.using(shard).in_bulk([sensor.id for sensor in group])
+        for sensor in group:
+            Sensor.latest_reading.related.set_cached_value(sensor, snapshots.get(sensor.id))
+    return sensors
@@ -1,12 +1,22 @@
 from typing import List, Optional
-from django.db.models import Q
+from datetime import datetime
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Count, Max, Sum
 from django.shortcuts import get_object_or_404
 from ninja import Schema
 from ninja_extra import api_controller, route
-from ninja_jwt.authentication import JWTAuth
 from ninja.pagination import paginate, PageNumberPagination
 
-from sensors.models import Sensor
+from mysite.instrumentation import instrumented
+from mysite.routers import replica_reads
+from readings.models import LatestReading
+from readings.sharding import sharding_enabled
+from readings.snapshots import attach_snapshots
+from sensors.conditional import conditional_get
+from sensors.deletion import delete_sensor, schedule_deletion
+from sensors.models import Sensor, SensorDeletion
+from sensors.search import search_sensors
+from users.authentication import StatelessJWTAuth
 
 # ✅ Pydantic schemas
 class SensorIn(Schema):
@@ -14,52 +24,195 @@ class SensorIn(Schema):
     model: str
     description: Optional[str] = None
 
+class LatestReadingOut(Schema):
+    id: int
+    temperature: float
+    humidity: float
+    timestamp: datetime
+
 class SensorOut(Schema):
     id: int
     name: str
     model: str
     description: Optional[str]
     owner_id: int
+    # Filled in only when the sensor was loaded with its snapshot (?include_latest=true)
+    latest_reading: Optional[LatestReadingOut] = None
+    reading_count: Optional[int] = None
+
+    @staticmethod
+    def resolve_latest_reading(obj):
+        snapshot = _snapshot(obj)
+        if not snapshot:
+            return None
+        return {
+            "id": snapshot.reading_id,
+            "temperature": snapshot.temperature,
+            "humidity": snapshot.humidity,
+            "timestamp": snapshot.timestamp,
+        }
+
+    @staticmethod
+    def resolve_reading_count(obj):
+        snapshot = _snapshot(obj)
+        if snapshot is False:
+            return None
+        return snapshot.count if snapshot else 0
+
+class SensorDeletionOut(Schema):
+    id: int
+    sensor_id: int
+    status: str
+    readings_total: int
+    readings_deleted: int
+    progress: float
+    error: str
+    created_at: datetime
+    updated_at: datetime
+    finished_at: Optional[datetime]
+
+    @staticmethod
+    def resolve_progress(obj):
+        if obj.status == SensorDeletion.DONE:
+            return 1.0
+        if not obj.readings_total:
+            return 0.0
+        return min(obj.readings_deleted / obj.readings_total, 1.0)
+
+def _snapshot(sensor):
+    """The sensor's LatestReading if loaded (None when it has no readings), else False"""
+    if not isinstance(sensor, Sensor) or not Sensor.latest_reading.is_cached(sensor):
+        return False
+    try:
+        return sensor.latest_reading
+    except Sensor.latest_reading.RelatedObjectDoesNotExist:
+        return None
+
+
+class SensorsWithSnapshots:
+    """A sensor queryset whose slices come with the snapshots of sensors on other
+    reading shards attached (readings/sharding.py); enough of a queryset for the paginator"""
+
+    def __init__(self, queryset):
+        self._queryset = queryset
+
+    def all(self):
+        return self
 
-@api_controller("/sensors", tags=["Sensors"], auth=JWTAuth())
+    def count(self):
+        return self._queryset.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        return attach_snapshots(list(self._queryset[key]))
+
+    def __iter__(self):
+        return iter(attach_snapshots(list(self._queryset)))
+
+
+def _list_validators(controller, include_latest=False, **kwargs):
+    """HTTP validators of a user's sensor list, from one aggregate over their sensors
+    (plus one per other reading shard holding snapshots of theirs)"""
+    aggregates = {"count": Count("id"), "ids": Sum("id"), "updated_at": Max("updated_at")}
+    if include_latest:
+        aggregates.update(
+            versions=Sum("latest_reading__version"),
+            readings_updated_at=Max("latest_reading__updated_at"),
+        )
+    sensors = Sensor.objects.visible().filter(owner_id=controller.context.request.auth.id)
+    state = sensors.aggregate(**aggregates)
+    if include_latest and sharding_enabled():
+        by_shard = {}
+        for sensor_id, shard in sensors.exclude(readings_shard=DEFAULT_DB_ALIAS).values_list("id", "readings_shard"):
+            by_shard.setdefault(shard, []).append(sensor_id)
+        for shard, sensor_ids in sorted(by_shard.items()):
+            extra = LatestReading.objects.using(shard).filter(sensor_id__in=sensor_ids).aggregate(
+                versions=Sum("version"), readings_updated_at=Max("updated_at")
+            )
+            state["versions"] = (state["versions"] or 0) + (extra["versions"] or 0)
+            state["readings_updated_at"] = max(
+                filter(None, (state["readings_updated_at"], extra["readings_updated_at"])), default=None
+            )
+    last_modified = max((value for key, value in state.items() if key.endswith("updated_at") and value), default=None)
+    return tuple(state.values()), last_modified
+
+def _sensor_validators(controller, sensor_id, **kwargs):
+    """HTTP validators of one sensor (404 unless owned by the current user)"""
+    updated_at = get_object_or_404(
+        Sensor.objects.visible().values_list("updated_at", flat=True),
+        id=sensor_id,
+        owner_id=controller.context.request.auth.id,
+    )
+    return (updated_at,), updated_at
+
+@api_controller("/sensors", tags=["Sensors"], auth=StatelessJWTAuth())
 class SensorController:
     """Endpoints for managing sensors"""
 
     @route.get("/", response=List[SensorOut])
+    @instrumented
+    @replica_reads
+    @conditional_get(_list_validators)
     @paginate(PageNumberPagination, page_size=10)
-    def list_sensors(self, q: Optional[str] = None):
-        """List sensors (paginated). Supports ?q=search by name/model."""
-        sensors = Sensor.objects.filter(owner=self.context.request.auth)
-        if q:
-            sensors = sensors.filter(Q(name__icontains=q) | Q(model__icontains=q))
-        return sensors.order_by("id")
+    def list_sensors(self, q: Optional[str] = None, include_latest: bool = False):
+        """List sensors (paginated). Supports ?q=search by name/model/description,
+        best matches first (see sensors/search.py).
+
+        ?include_latest=true adds each sensor's latest reading and reading
+        count, joined in from the LatestReading snapshots.
+        """
+        sensors = Sensor.objects.visible().filter(owner_id=self.context.request.auth.id)
+        if include_latest:
+            sensors = sensors.select_related("latest_reading")
+        sensors = search_sensors(sensors, q) if q else sensors.order_by("id")
+        if include_latest and sharding_enabled():
+            return SensorsWithSnapshots(sensors)
+        return sensors
 
     @route.post("/", response=SensorOut)
     def create_sensor(self, payload: SensorIn):
         """Create a new sensor"""
         sensor = Sensor.objects.create(
-            owner=self.context.request.auth,
+            owner_id=self.context.request.auth.id,
             **payload.dict()
         )
         return sensor
 
     @route.get("/{sensor_id}/", response=SensorOut)
+    @instrumented
+    @conditional_get(_sensor_validators)
     def get_sensor(self, sensor_id: int):
         """Get details of a sensor"""
-        return get_object_or_404(Sensor, id=sensor_id, owner=self.context.request.auth)
+        return get_object_or_404(Sensor.objects.visible(), id=sensor_id, owner_id=self.context.request.auth.id)
 
     @route.put("/{sensor_id}/", response=SensorOut)
     def update_sensor(self, sensor_id: int, payload: SensorIn):
         """Update a sensor"""
-        sensor = get_object_or_404(Sensor, id=sensor_id, owner=self.context.request.auth)
-        for field, value in payload.dict().items():
+        sensor = get_object_or_404(Sensor.objects.visible(), id=sensor_id, owner_id=self.context.request.auth.id)
+        changes = payload.dict()
+        for field, value in changes.items():
             setattr(sensor, field, value)
-        sensor.save()
+        # Only the edited fields: a full save would undo a concurrent background deletion's deleted_at
+        sensor.save(update_fields=[*changes, "updated_at"])
         return sensor
 
-    @route.delete("/{sensor_id}/", response={204: None})
-    def delete_sensor(self, sensor_id: int):
-        """Delete a sensor (cascade deletes readings)"""
-        sensor = get_object_or_404(Sensor, id=sensor_id, owner=self.context.request.auth)
-        sensor.delete()
-        return 204, None
\ No newline at end of file
+    @route.delete("/{sensor_id}/", response={202: SensorDeletionOut, 204: None})
+    def delete_sensor(self, sensor_id: int, background: bool = False):
+        """Delete a sensor and its readings, with set-based deletes (see sensors/deletion.py).
+
+        ?background=true answers 202 at once: the sensor disappears from the
+        API immediately and its readings are purged in batches by a background
+        job, whose progress is served at /sensors/deletions/{id}/.
+        """
+        sensor = get_object_or_404(Sensor.objects.visible(), id=sensor_id, owner_id=self.context.request.auth.id)
+        if background:
+            return 202, schedule_deletion(sensor)
+        delete_sensor(sensor)
+        return 204, None
+
+    @route.get("/deletions/{deletion_id}/", response=SensorDeletionOut)
+    def get_sensor_deletion(self, deletion_id: int):
+        """Progress of a background sensor deletion"""
+        return get_object_or_404(SensorDeletion, id=deletion_id, owner_id=self.context.request.auth.id)
\ No newline at end of file
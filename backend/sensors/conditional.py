@@ -0,0 +1,83 @@
+# sensors/conditional.py
+"""Conditional GETs (ETag / Last-Modified) for the sensor and readings read routes.
+
+``conditional_get(validators)`` decorates a controller route with a cheap
+function returning ``(version, last_modified)`` for the data the route would
+read: ``version`` is any tuple that changes whenever that data does (e.g. a
+per-sensor version counter), ``last_modified`` a datetime or None. The strong
+ETag hashes the version with the request's full path and Accept header, so
+every page, filter and format (JSON or columnar) gets its own validator.
+
+A request whose If-None-Match (or, lacking one, If-Modified-Since) matches is
+answered 304 before the route runs, so nothing is queried or serialized
+beyond the validators themselves. ``validators`` runs after authentication and
+must perform the route's ownership checks, so unauthorised clients still get
+their 404 instead of a 304. Last-Modified only has one-second resolution;
+clients should revalidate with If-None-Match.
+"""
+import hashlib
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponseBase
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+# Responses vary by user: let browsers keep them but make them revalidate
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(request, version):
+    """Strong ETag for ``version`` of the resource at the request's URL and representation"""
+    key = repr((version, request.get_full_path(), request.headers.get("Accept", "")))
+    return '"%s"' % hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+
+def _validate(controller, validators, args, kwargs):
+    """``(headers, 304 response or None)`` for the current request"""
+    request = controller.context.request
+    version, last_modified = validators(controller, *args, **kwargs)
+    etag = make_etag(request, version)
+    timestamp = int(last_modified.timestamp()) if last_modified is not None else None
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if timestamp is not None:
+        headers["Last-Modified"] = http_date(timestamp)
+    return headers, get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+
+def _finish(controller, headers, result):
+    target = result if isinstance(result, HttpResponseBase) else controller.context.response
+    for name, value in headers.items():
+        target[name] = value
+    return result
+
+
+def conditional_get(validators):
+    """Answer matching conditional GETs with 304 and tag other responses with ETag/Last-Modified.
+
+    Apply it above pagination and other decorators, directly under the route
+    decorator (or under ``instrumented`` and ``replica_reads``, see mysite/).
+    """
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(controller, *args, **kwargs):
+                headers, response = await sync_to_async(_validate)(controller, validators, args, kwargs)
+                if response is not None:
+                    return _finish(controller, headers, response)
+                return _finish(controller, headers, await view(controller, *args, **kwargs))
+
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(controller, *args, **kwargs):
+            headers, response = _validate(controller, validators, args, kwargs)
+            if response is not None:
+                return _finish(controller, headers, response)
+            return _finish(controller, headers, view(controller, *args, **kwargs))
+
+        return wrapper
+
+    return decorator
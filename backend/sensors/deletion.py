@@ -0,0 +1,151 @@
+# sensors/deletion.py
+"""Deleting sensors with large reading histories.
+
+``delete_sensor`` removes a sensor and its readings in one transaction. The
+readings tables are emptied by one set-based DELETE each, so no reading is
+ever loaded into Python, whatever delete signals the readings models gain.
+
+``schedule_deletion`` is for sensors too big to delete within a request. It
+hides the sensor at once (``Sensor.deleted_at``; hidden sensors are invisible
+to the API) and records a SensorDeletion job. ``purge_sensor`` then deletes
+the raw readings in batches, each a short range DELETE in its own
+transaction, updating the job's progress, and finally the sensor itself.
+Configured by ``settings.SENSOR_DELETION``:
+
+    BATCH_SIZE  raw readings per DELETE of a background purge
+    BACKGROUND  run jobs on a worker thread of the process that scheduled
+                them; False leaves them to the purge_deleted_sensors command
+
+Purges are resumable, so ``purge_deleted_sensors`` also finishes jobs whose
+process exited mid-way and retries failed ones.
+"""
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connection, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from readings.models import LatestReading, ReadingChunk
+from readings.sharding import delete_readings_batch, delete_sensor_data
+from sensors.models import Sensor, SensorDeletion
+from sensors.ownership import forget_sensor
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "BATCH_SIZE": 10_000,
+    "BACKGROUND": True,
+}
+
+# Seconds an idle worker thread waits for another job before exiting
+WORKER_IDLE_SECONDS = 30
+
+
+def deletion_config():
+    return {**DEFAULTS, **getattr(settings, "SENSOR_DELETION", {})}
+
+
+def delete_sensor(sensor):
+    """Delete ``sensor`` and all its readings now"""
+    with transaction.atomic():
+        # Readings on other shards follow once this commits (readings/signals.py)
+        if sensor.readings_shard == DEFAULT_DB_ALIAS:
+            delete_sensor_data([sensor.id], DEFAULT_DB_ALIAS)
+        sensor.delete()
+
+
+def schedule_deletion(sensor):
+    """Hide ``sensor`` and queue the purge of its readings; returns the SensorDeletion"""
+    total = (
+        LatestReading.objects.using(sensor.readings_shard)
+        .filter(sensor_id=sensor.id)
+        .values_list("count", flat=True)
+        .first()
+    )
+    with transaction.atomic():
+        Sensor.objects.filter(id=sensor.id).update(deleted_at=timezone.now())
+        deletion = SensorDeletion.objects.create(sensor_id=sensor.id, owner_id=sensor.owner_id, readings_total=total or 0)
+        if deletion_config()["BACKGROUND"]:
+            transaction.on_commit(lambda: get_deletion_worker().submit(deletion.id))
+    forget_sensor(sensor.id)
+    return deletion
+
+
+def _progress(deletion, **changes):
+    SensorDeletion.objects.filter(id=deletion.id).update(updated_at=timezone.now(), **changes)
+
+
+def purge_sensor(deletion, batch_size=None):
+    """Delete a hidden sensor's readings batch by batch, then the sensor; safe to rerun"""
+    batch_size = batch_size or deletion_config()["BATCH_SIZE"]
+    _progress(deletion, status=SensorDeletion.RUNNING, error="")
+    try:
+        sensor = Sensor.objects.filter(id=deletion.sensor_id).first()
+        if sensor is not None:
+            using = sensor.readings_shard
+            while deleted := delete_readings_batch(sensor.id, using, batch_size):
+                _progress(deletion, readings_deleted=F("readings_deleted") + deleted)
+            compacted = ReadingChunk.objects.using(using).filter(sensor_id=sensor.id).aggregate(total=Sum("count"))["total"]
+            delete_sensor_data([sensor.id], using)
+            _progress(deletion, readings_deleted=F("readings_deleted") + (compacted or 0))
+            delete_sensor(sensor)
+    except Exception as error:
+        _progress(deletion, status=SensorDeletion.FAILED, error=str(error))
+        raise
+    _progress(deletion, status=SensorDeletion.DONE, finished_at=timezone.now())
+
+
+class DeletionWorker:
+    """Background thread purging scheduled deletions one at a time"""
+
+    def __init__(self):
+        self._jobs = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, deletion_id):
+        with self._lock:
+            self._jobs.put(deletion_id)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="sensor-deletion-worker", daemon=True)
+                self._thread.start()
+
+    def _next(self):
+        try:
+            return self._jobs.get(timeout=WORKER_IDLE_SECONDS)
+        except queue.Empty:
+            with self._lock:
+                if self._jobs.empty():
+                    self._thread = None
+                    return None
+            return self._jobs.get()
+
+    def _run(self):
+        try:
+            while (deletion_id := self._next()) is not None:
+                close_old_connections()
+                deletion = SensorDeletion.objects.filter(id=deletion_id).first()
+                if deletion is None:
+                    continue
+                try:
+                    purge_sensor(deletion)
+                except Exception:
+                    logger.exception("Background deletion of sensor %s failed", deletion.sensor_id)
+        finally:
+            connection.close()
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_deletion_worker():
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                _worker = DeletionWorker()
+    return _worker
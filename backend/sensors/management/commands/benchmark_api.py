@@ -0,0 +1,282 @@
+# backend/sensors/management/commands/benchmark_api.py
+import csv
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+from itertools import count
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+
+from readings.management.commands.load_test_readings import http_json, run_phase
+from sensors.management.commands.seed_data import SENSOR_SPECS
+from sensors.models import Sensor
+
+REPORT_VERSION = 1
+
+# Prefix of the benchmark user's name; each run adds a random suffix so it
+# never touches an existing account
+BENCH_USERNAME = "benchmark"
+BENCH_PASSWORD = "benchmark-password"
+
+# Readings per list_readings page (the route's default page size)
+READINGS_PAGE_SIZE = 50
+
+SCENARIOS = ("login", "get_sensor", "list_sensors", "list_sensors_latest", "list_readings", "create_reading")
+
+# Latency statistics compared against a baseline; higher is worse
+COMPARED_STATS = ("p50", "p95", "p99")
+
+
+class InProcessClient:
+    """Calls the API through Django's test client: app and database cost, no network"""
+
+    def __init__(self):
+        # Any host the settings accept; "localhost" covers DEBUG and wildcard setups
+        host = next((host.lstrip(".") for host in settings.ALLOWED_HOSTS if host != "*"), "localhost")
+        self._client = Client(HTTP_HOST=host)
+        self.token = None
+
+    def request(self, method, path, body=None):
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {self.token}"} if self.token else {}
+        if method == "POST":
+            response = self._client.post(f"/api{path}", data=json.dumps(body), content_type="application/json", **headers)
+        else:
+            response = self._client.get(f"/api{path}", **headers)
+        return response.status_code, response.json() if response.get("Content-Type", "").startswith("application/json") else None
+
+
+class HttpClient:
+    """Calls a running server over HTTP"""
+
+    def __init__(self, base):
+        self.base = base.rstrip("/")
+        self.token = None
+
+    def request(self, method, path, body=None):
+        return http_json(f"{self.base}/api{path}", token=self.token, body=body if method == "POST" else None)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True, timeout=5
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def connection_mode():
+    """How the default database hands out connections: pool, persistent or per-request"""
+    if connection.settings_dict["OPTIONS"].get("pool"):
+        return "pool"
+    return "persistent" if connection.settings_dict["CONN_MAX_AGE"] != 0 else "per-request"
+
+
+def credentials(username):
+    return {"email": f"{username}@example.com", "password": BENCH_PASSWORD}
+
+
+def page_numbers(pages, total_readings):
+    """Page numbers for the ``--pages`` spec; "last" is the deepest page"""
+    last = max(1, -(-total_readings // READINGS_PAGE_SIZE))
+    numbers = {}
+    for page in pages:
+        number = last if page == "last" else int(page)
+        if 1 <= number <= last:
+            numbers[page] = number
+    return numbers
+
+
+def compare_reports(report, baseline, threshold):
+    """``(scenario, stat, baseline ms, current ms, change %)`` for every latency regression over ``threshold`` %"""
+    regressions = []
+    for scenario, stats in report["results"].items():
+        previous = baseline.get("results", {}).get(scenario)
+        if not previous:
+            continue
+        for stat in COMPARED_STATS:
+            if stat not in stats or not previous.get(stat):
+                continue
+            change = (stats[stat] - previous[stat]) / previous[stat] * 100
+            if change > threshold:
+                regressions.append((scenario, stat, previous[stat], stats[stat], change))
+    return regressions
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the API: seed a benchmark user with configurable sensor/reading volumes "
+        "(timing the seed_data import), measure latency percentiles and throughput of login, "
+        "list_sensors, list_readings at several page depths and create_reading, and write a JSON "
+        "report that can be compared against a baseline from another commit."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sensors", type=int, default=100, help="Sensors owned by the benchmark user (default: 100)")
+        parser.add_argument("--readings", type=int, default=50_000, help="Readings imported per seeded device (default: 50000)")
+        parser.add_argument("--requests", type=int, default=200, help="Measured requests per scenario (default: 200)")
+        parser.add_argument("--warmup", type=int, default=10, help="Unmeasured requests per scenario first (default: 10)")
+        parser.add_argument("--concurrency", type=int, default=1, help="Concurrent clients; needs --url above 1 (default: 1)")
+        parser.add_argument("--pages", default="1,10,100,last", help="list_readings page depths (default: 1,10,100,last)")
+        parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated scenarios to run (default: all)")
+        parser.add_argument("--url", help=(
+            "Benchmark a running server at this base URL instead of in-process "
+            "(needed to measure connection handling: the in-process client keeps its connection)"
+        ))
+        parser.add_argument("--output", default="benchmark-report.json", help="Where to write the JSON report")
+        parser.add_argument("--compare", help="Baseline report to compare against; regressions fail the command")
+        parser.add_argument("--threshold", type=float, default=20.0, help="Allowed latency increase in %% (default: 20)")
+        parser.add_argument("--keep-data", action="store_true", help="Keep the run's benchmark user and its data afterwards")
+
+    def handle(self, *args, **options):
+        scenarios = [name.strip() for name in options["scenarios"].split(",") if name.strip()]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+        if options["requests"] < 1 or options["concurrency"] < 1:
+            raise CommandError("--requests and --concurrency must be at least 1.")
+        if options["concurrency"] > 1 and not options["url"]:
+            raise CommandError("--concurrency above 1 needs --url (a running server).")
+        baseline = None
+        if options["compare"]:
+            with open(options["compare"]) as f:
+                baseline = json.load(f)
+
+        client = HttpClient(options["url"]) if options["url"] else InProcessClient()
+        username = f"{BENCH_USERNAME}-{uuid.uuid4().hex[:12]}"
+        results = {}
+        try:
+            sensor_id, total_readings, results["seed_data"] = self.seed(username, options)
+            status, body = client.request("POST", "/auth/token/", credentials(username))
+            if status != 200:
+                raise CommandError(f"Benchmark login failed (status {status}).")
+            client.token = body["access"]
+
+            for name, send in self.plan(client, username, scenarios, sensor_id, total_readings, options):
+                run_phase(send, options["warmup"], options["concurrency"])
+                stats = run_phase(send, options["requests"], options["concurrency"])
+                results[name] = stats
+                self.stdout.write(
+                    f"📊 {name:<24} {stats['rps']:8,.0f} req/s  p50 {stats['p50']:7.1f}ms  "
+                    f"p95 {stats['p95']:7.1f}ms  p99 {stats['p99']:7.1f}ms  errors {stats['errors']}"
+                )
+        finally:
+            if options["keep_data"]:
+                self.stdout.write(f"💾 Kept benchmark user {username}")
+            else:
+                User.objects.filter(username=username).delete()
+
+        report = {
+            "version": REPORT_VERSION,
+            "created": datetime.now(timezone.utc).isoformat(),
+            "git_commit": git_commit(),
+            "mode": "http" if options["url"] else "in-process",
+            "database": connection.vendor,
+            "connections": connection_mode(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "parameters": {
+                key: options[key] for key in ("sensors", "readings", "requests", "warmup", "concurrency", "pages")
+            },
+            "results": results,
+        }
+        with open(options["output"], "w") as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"✅ Report written to {options['output']}"))
+
+        if any(stats.get("errors") for stats in results.values()):
+            self.stdout.write(self.style.WARNING("⚠️ Some requests failed; see the error counts above."))
+        if baseline is not None:
+            self.report_comparison(report, baseline, options["threshold"])
+
+    def seed(self, username, options):
+        """Create the benchmark user and sensors and import readings through seed_data --fast.
+
+        Returns (id of the first seeded device, its reading count, import stats).
+        """
+        user = User.objects.create_user(username, credentials(username)["email"], BENCH_PASSWORD)
+        extra = max(options["sensors"] - len(SENSOR_SPECS), 0)
+        Sensor.objects.bulk_create(
+            Sensor(owner=user, name=f"bench-{i:05d}", model="BenchModel", description="Benchmark sensor")
+            for i in range(extra)
+        )
+
+        origin = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        rows = options["readings"] * len(SENSOR_SPECS)
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", newline="", delete=False) as f:
+            writer = csv.writer(f)
+            writer.writerow(["device_id", "timestamp", "temperature", "humidity"])
+            for i in range(options["readings"]):
+                timestamp = (origin + timedelta(minutes=i)).isoformat()
+                for name, _ in SENSOR_SPECS:
+                    writer.writerow([name, timestamp, 20 + i % 10, 40 + i % 20])
+        try:
+            started = time.perf_counter()
+            call_command("seed_data", csv=f.name, username=username, fast=True, stdout=StringIO())
+            seconds = time.perf_counter() - started
+        finally:
+            os.unlink(f.name)
+        self.stdout.write(f"🌱 seed_data imported {rows:,} readings in {seconds:.2f}s ({rows / seconds:,.0f} rows/sec)")
+
+        sensor = Sensor.objects.get(owner=user, name=SENSOR_SPECS[0][0])
+        return sensor.id, options["readings"], {"rows": rows, "elapsed": seconds, "rows_per_sec": rows / seconds}
+
+    def plan(self, client, username, scenarios, sensor_id, total_readings, options):
+        """``(result name, send(i))`` per measured scenario"""
+        readings_url = f"/sensors/{sensor_id}/readings/"
+        # Unique timestamps across warmup and measured requests, clear of the seeded ones
+        sequence = count()
+        origin = datetime(2030, 1, 1, tzinfo=timezone.utc)
+
+        for scenario in scenarios:
+            if scenario == "login":
+                yield scenario, lambda _: client.request("POST", "/auth/token/", credentials(username))[0]
+            elif scenario == "get_sensor":
+                yield scenario, lambda _: client.request("GET", f"/sensors/{sensor_id}/")[0]
+            elif scenario == "list_sensors":
+                yield scenario, lambda _: client.request("GET", "/sensors/")[0]
+            elif scenario == "list_sensors_latest":
+                yield scenario, lambda _: client.request("GET", "/sensors/?include_latest=true")[0]
+            elif scenario == "list_readings":
+                pages = [page.strip() for page in options["pages"].split(",") if page.strip()]
+                for label, number in page_numbers(pages, total_readings).items():
+                    yield f"list_readings_page_{label}", lambda _, number=number: client.request("GET", f"{readings_url}?page={number}")[0]
+            elif scenario == "create_reading":
+                def create(_):
+                    timestamp = origin + timedelta(seconds=next(sequence))
+                    body = {"temperature": 21.0, "humidity": 45.0, "timestamp": timestamp.isoformat()}
+                    return client.request("POST", readings_url, body)[0]
+                yield scenario, create
+
+    def report_comparison(self, report, baseline, threshold):
+        self.stdout.write(self.style.NOTICE(
+            f"🔍 Comparing with {baseline.get('git_commit') or 'baseline'} "
+            f"({baseline.get('connections', 'unknown')} connections, threshold {threshold:g}%)"
+        ))
+        for scenario, stats in report["results"].items():
+            previous = baseline.get("results", {}).get(scenario)
+            if previous and previous.get("p50") and "p50" in stats:
+                self.stdout.write(
+                    f"   {scenario:<24} p50 {previous['p50']:7.1f}ms -> {stats['p50']:7.1f}ms  "
+                    f"p95 {previous.get('p95', 0):7.1f}ms -> {stats['p95']:7.1f}ms"
+                )
+        regressions = compare_reports(report, baseline, threshold)
+        for scenario, stat, before, after, change in regressions:
+            self.stdout.write(self.style.ERROR(
+                f"❌ {scenario} {stat}: {before:.1f}ms -> {after:.1f}ms (+{change:.0f}%)"
+            ))
+        if regressions:
+            raise CommandError(f"{len(regressions)} latency regressions over {threshold:g}%.")
+        self.stdout.write(self.style.SUCCESS("✅ No latency regressions."))
@@ -0,0 +1,50 @@
+# backend/sensors/management/commands/purge_deleted_sensors.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from sensors.deletion import deletion_config, purge_sensor
+from sensors.models import SensorDeletion
+
+
+class Command(BaseCommand):
+    help = (
+        "Run background sensor deletions that have not finished: pending ones, ones whose "
+        "process exited mid-purge, and failed ones. Each hidden sensor's readings are "
+        "deleted in batches, then the sensor itself."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="Raw readings per DELETE (default: SENSOR_DELETION BATCH_SIZE)",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"] or deletion_config()["BATCH_SIZE"]
+        if batch_size < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        deletions = list(SensorDeletion.objects.exclude(status=SensorDeletion.DONE).order_by("id"))
+        if not deletions:
+            self.stdout.write(self.style.SUCCESS("✅ No sensor deletions to run."))
+            return
+
+        start = time.time()
+        failed = 0
+        for deletion in deletions:
+            try:
+                purge_sensor(deletion, batch_size)
+            except Exception as error:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f"❌ Sensor {deletion.sensor_id}: {error}"))
+                continue
+            deletion.refresh_from_db()
+            self.stdout.write(f"🗑️ Sensor {deletion.sensor_id}: deleted {deletion.readings_deleted:,} readings.")
+
+        elapsed = time.time() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Ran {len(deletions) - failed:,} sensor deletion(s) in {elapsed:.2f}s."
+        ))
+        if failed:
+            raise CommandError(f"{failed} sensor deletion(s) failed.")
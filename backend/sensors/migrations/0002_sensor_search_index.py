@@ -0,0 +1,39 @@
+# GIN index over the weighted search vector of sensors/search.py on PostgreSQL.
+# On other databases this migration is a no-op.
+
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+# Frozen copy of sensors.search.SEARCH_VECTOR as of this migration; a changed
+# expression needs a new migration rebuilding the index.
+SEARCH_VECTOR = (
+    SearchVector("name", weight="A", config="simple")
+    + SearchVector("model", weight="B", config="simple")
+    + SearchVector("description", weight="C", config="simple")
+)
+
+INDEX = GinIndex(SEARCH_VECTOR, name="sensors_sensor_search")
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.add_index(apps.get_model("sensors", "Sensor"), INDEX)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.remove_index(apps.get_model("sensors", "Sensor"), INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sensors', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sensors', '0002_sensor_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sensor',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
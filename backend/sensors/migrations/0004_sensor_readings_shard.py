@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sensors', '0003_sensor_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sensor',
+            name='readings_shard',
+            field=models.CharField(default='default', max_length=64),
+        ),
+    ]
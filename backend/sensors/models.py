@@ -2,6 +2,13 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+
+class SensorQuerySet(models.QuerySet):
+    def visible(self):
+        """Sensors not hidden by a pending background deletion (sensors/deletion.py)"""
+        return self.filter(deleted_at__isnull=True)
+
+
 class Sensor(models.Model):
     owner = models.ForeignKey(
         User,
@@ -11,6 +18,41 @@ class Sensor(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True, null=True)
     model = models.CharField(max_length=100)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Database alias holding the sensor's readings (readings/sharding.py)
+    readings_shard = models.CharField(max_length=64, default="default")
+    # Set when a background deletion hides the sensor until its readings are purged
+    deleted_at = models.DateTimeField(blank=True, null=True)
+
+    objects = SensorQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.name} ({self.model})"
+
+
+class SensorDeletion(models.Model):
+    """Progress of a sensor's background deletion (sensors/deletion.py)"""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUSES = [(PENDING, "Pending"), (RUNNING, "Running"), (DONE, "Done"), (FAILED, "Failed")]
+
+    # Not a foreign key: the job outlives the sensor
+    sensor_id = models.BigIntegerField()
+    owner = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="+"
+    )
+    status = models.CharField(max_length=16, choices=STATUSES, default=PENDING)
+    readings_total = models.PositiveBigIntegerField(default=0)
+    readings_deleted = models.PositiveBigIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"deletion of sensor {self.sensor_id} ({self.status})"
@@ -0,0 +1,195 @@
+# sensors/ownership.py
+"""Cached sensor ownership checks for the readings hot path.
+
+Maps sensor id -> owner id so readings routes can verify ownership without a
+Sensor query per request. Configured by ``settings.SENSOR_OWNERSHIP_CACHE``:
+
+    BACKEND      "local" (in-process LRU with TTL), "django" (the Django cache
+                 named by CACHE_ALIAS, shared between processes) or None
+    TTL          seconds an entry stays valid
+    MAX_SIZE     entries kept by the local LRU
+    CACHE_ALIAS  Django cache used by the "django" backend
+
+Entries are dropped when a sensor is saved or deleted (see sensors.signals).
+Sensors hidden by a background deletion (sensors/deletion.py) count as missing.
+Changes that bypass model signals, or that happen in another process while the
+"local" backend is in use, are only picked up once the TTL expires. Write
+routes therefore pass ``for_write=True``, which checks the database every time:
+a sensor another process just hid must not take readings its purge would miss.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.http import Http404
+
+from sensors.models import Sensor
+
+DEFAULTS = {
+    "BACKEND": "local",
+    "TTL": 60,
+    "MAX_SIZE": 100_000,
+    "CACHE_ALIAS": "default",
+}
+
+
+class LocalOwnerCache:
+    """Thread-safe in-process LRU whose entries expire after ``ttl`` seconds"""
+
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, sensor_id):
+        with self._lock:
+            entry = self._entries.get(sensor_id)
+            if entry is None:
+                return None
+            owner_id, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[sensor_id]
+                return None
+            self._entries.move_to_end(sensor_id)
+            return owner_id
+
+    def set(self, sensor_id, owner_id):
+        with self._lock:
+            self._entries[sensor_id] = (owner_id, time.monotonic() + self.ttl)
+            self._entries.move_to_end(sensor_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, sensor_id):
+        with self._lock:
+            self._entries.pop(sensor_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class DjangoOwnerCache:
+    """Entries stored in a Django cache, so every process sees invalidations"""
+
+    key_prefix = "sensor-owner"
+
+    def __init__(self, ttl, alias):
+        self.ttl = ttl
+        self.cache = caches[alias]
+
+    def _key(self, sensor_id):
+        return f"{self.key_prefix}:{sensor_id}"
+
+    def get(self, sensor_id):
+        return self.cache.get(self._key(sensor_id))
+
+    def set(self, sensor_id, owner_id):
+        self.cache.set(self._key(sensor_id), owner_id, timeout=self.ttl)
+
+    def delete(self, sensor_id):
+        self.cache.delete(self._key(sensor_id))
+
+    def clear(self):
+        # Keys cannot be enumerated portably in a shared cache; they expire via TTL
+        pass
+
+
+class NullOwnerCache:
+    """Disables caching: every check queries the database"""
+
+    def get(self, sensor_id):
+        return None
+
+    def set(self, sensor_id, owner_id):
+        pass
+
+    def delete(self, sensor_id):
+        pass
+
+    def clear(self):
+        pass
+
+
+_owner_cache = None
+_owner_cache_lock = threading.Lock()
+
+
+def get_owner_cache():
+    global _owner_cache
+    if _owner_cache is None:
+        with _owner_cache_lock:
+            if _owner_cache is None:
+                config = {**DEFAULTS, **getattr(settings, "SENSOR_OWNERSHIP_CACHE", {})}
+                backend = config["BACKEND"]
+                if backend == "local":
+                    _owner_cache = LocalOwnerCache(config["TTL"], config["MAX_SIZE"])
+                elif backend == "django":
+                    _owner_cache = DjangoOwnerCache(config["TTL"], config["CACHE_ALIAS"])
+                elif backend is None:
+                    _owner_cache = NullOwnerCache()
+                else:
+                    raise ValueError(f"Unknown SENSOR_OWNERSHIP_CACHE backend: {backend!r}")
+    return _owner_cache
+
+
+def _reset_owner_cache(*, setting, **kwargs):
+    global _owner_cache
+    if setting == "SENSOR_OWNERSHIP_CACHE":
+        _owner_cache = None
+
+
+setting_changed.connect(_reset_owner_cache)
+
+
+def check_sensor_owner(user, sensor_id, for_write=False):
+    """Raise Http404 unless ``user`` owns the sensor, consulting the cache first
+    unless ``for_write``"""
+    cache = get_owner_cache()
+    owner_id = None if for_write else cache.get(sensor_id)
+    if owner_id is None:
+        owner_id = Sensor.objects.visible().filter(id=sensor_id).values_list("owner_id", flat=True).first()
+        _cache_owner(cache, sensor_id, owner_id)
+    _require_owner(user, owner_id)
+
+
+async def acheck_sensor_owner(user, sensor_id, for_write=False):
+    """Async variant of check_sensor_owner for ASGI routes"""
+    cache = get_owner_cache()
+    owner_id = None if for_write else cache.get(sensor_id)
+    if owner_id is None:
+        owner_id = await Sensor.objects.visible().filter(id=sensor_id).values_list("owner_id", flat=True).afirst()
+        _cache_owner(cache, sensor_id, owner_id)
+    _require_owner(user, owner_id)
+
+
+def check_sensors_owner(user, sensor_ids):
+    """check_sensor_owner for many sensors, with one query for those not cached"""
+    cache = get_owner_cache()
+    owners = {sensor_id: cache.get(sensor_id) for sensor_id in set(sensor_ids)}
+    missing = [sensor_id for sensor_id, owner_id in owners.items() if owner_id is None]
+    if missing:
+        owners.update(Sensor.objects.visible().filter(id__in=missing).values_list("id", "owner_id"))
+    for sensor_id, owner_id in owners.items():
+        if sensor_id in missing:
+            _cache_owner(cache, sensor_id, owner_id)
+        _require_owner(user, owner_id)
+
+
+def _cache_owner(cache, sensor_id, owner_id):
+    if owner_id is None:
+        raise Http404("No Sensor matches the given query.")
+    cache.set(sensor_id, owner_id)
+
+
+def _require_owner(user, owner_id):
+    if owner_id != user.id:
+        raise Http404("No Sensor matches the given query.")
+
+
+def forget_sensor(sensor_id):
+    get_owner_cache().delete(sensor_id)
@@ -0,0 +1,64 @@
+# sensors/search.py
+"""Ranked sensor search for ``list_sensors?q=``.
+
+On PostgreSQL the query is matched against a weighted tsvector over name (A),
+model (B) and description (C), served by the GIN expression index
+``sensors_sensor_search`` (migration 0002). Every word of the query must
+prefix-match a word of the sensor ("dht" finds "DHT22"), and results are
+ordered by ts_rank. The ``simple`` configuration is used because sensor names
+and model codes are not natural language: no stemming, no stop words.
+
+Other databases fall back to case-insensitive substring matching of each word,
+ranked by the best field a word matched.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections
+from django.db.models import Case, IntegerField, Q, Value, When
+
+SEARCH_CONFIG = "simple"
+
+# Must stay identical to the indexed expression, frozen in migration 0002_sensor_search_index
+SEARCH_VECTOR = (
+    SearchVector("name", weight="A", config=SEARCH_CONFIG)
+    + SearchVector("model", weight="B", config=SEARCH_CONFIG)
+    + SearchVector("description", weight="C", config=SEARCH_CONFIG)
+)
+
+# Fallback rank of a word matching each field, best field first
+FIELD_RANKS = (("name", 4), ("model", 2), ("description", 1))
+
+
+def search_terms(q):
+    """The words of a search string, lowercased"""
+    return re.findall(r"\w+", q.lower())
+
+
+def search_sensors(queryset, q):
+    """Sensors of ``queryset`` matching every word of ``q``, best matches first"""
+    terms = search_terms(q)
+    if not terms:
+        return queryset.none()
+    if connections[queryset.db].vendor == "postgresql":
+        query = SearchQuery(" & ".join(f"{term}:*" for term in terms), search_type="raw", config=SEARCH_CONFIG)
+        return (
+            queryset.alias(search=SEARCH_VECTOR)
+            .filter(search=query)
+            .annotate(rank=SearchRank(SEARCH_VECTOR, query))
+            .order_by("-rank", "id")
+        )
+
+    rank = Value(0)
+    for term in terms:
+        matches = Q()
+        for field, _ in FIELD_RANKS:
+            matches |= Q(**{f"{field}__icontains": term})
+        queryset = queryset.filter(matches)
+        rank += Case(
+            *(When(**{f"{field}__icontains": term}, then=Value(weight)) for field, weight in FIELD_RANKS),
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    return queryset.annotate(rank=rank).order_by("-rank", "id")
+
@@ -0,0 +1,12 @@
+# sensors/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from sensors.models import Sensor
+from sensors.ownership import forget_sensor
+
+
+@receiver(post_save, sender=Sensor)
+@receiver(post_delete, sender=Sensor)
+def invalidate_sensor_ownership(sender, instance, **kwargs):
+    forget_sensor(instance.id)
@@ -6,6 +6,28 @@ from sensors.models import Sensor
 from readings.models import Reading
 from datetime import datetime, timedelta
 import random
+from sensors.ownership import get_owner_cache
+
+@pytest.fixture(scope='session')
+def django_db_modify_db_settings(django_db_modify_db_settings_parallel_suffix):
+    """Add a "replica" alias mirroring the test database, for the read-replica routing tests,
+    and a "shard1" alias with a test database of its own, for the reading sharding tests"""
+    from django.conf import settings
+    default = settings.DATABASES['default']
+    settings.DATABASES.setdefault('replica', {**default, 'TEST': {**default.get('TEST', {}), 'MIRROR': 'default'}})
+    # SQLite gets an in-memory database per alias when the test NAME is unset
+    sqlite = default['ENGINE'] == 'django.db.backends.sqlite3'
+    settings.DATABASES.setdefault('shard1', {
+        **default,
+        'TEST': {**default.get('TEST', {}), 'NAME': None if sqlite else f"test_{default['NAME']}_shard1"},
+    })
+
+@pytest.fixture(autouse=True)
+def clear_ownership_cache():
+    """Sensor ids are reused across rolled-back tests, so cached owners must not leak"""
+    get_owner_cache().clear()
+    yield
+    get_owner_cache().clear()
 
 @pytest.fixture
 def test_user(db):
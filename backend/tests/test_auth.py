@@ -2,6 +2,10 @@
 import pytest
 import json
 from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from ninja_jwt.tokens import RefreshToken
+from users.authentication import ClaimsUser, tokens_for_user
 
 @pytest.mark.django_db
 class TestAuthFlows:
@@ -129,4 +133,45 @@ class TestAuthFlows:
         )
         
         assert refresh_response.status_code == 200
-        assert 'access' in refresh_response.json()
\ No newline at end of file
+        assert 'access' in refresh_response.json()
+
+@pytest.mark.django_db
+class TestStatelessAuth:
+    """Test that API calls trust token claims instead of loading the user"""
+
+    def test_me_reads_profile_from_token(self, authenticated_client, test_user):
+        """Test /me answers from token claims without touching auth_user"""
+        with CaptureQueriesContext(connection) as ctx:
+            response = authenticated_client.get('/api/auth/me/')
+
+        assert response.status_code == 200
+        assert response.json() == {
+            'id': test_user.id,
+            'username': 'testuser',
+            'email': 'test@example.com',
+        }
+        assert len(ctx.captured_queries) == 0
+
+    def test_sensor_list_skips_user_query(self, authenticated_client, test_sensor):
+        """Test authenticated sensor listing does not query auth_user"""
+        with CaptureQueriesContext(connection) as ctx:
+            response = authenticated_client.get('/api/sensors/')
+
+        assert response.status_code == 200
+        assert not any('auth_user' in q['sql'] for q in ctx.captured_queries)
+
+    def test_token_without_profile_claims_falls_back(self, client, test_user):
+        """Test tokens lacking username/email claims lazily load the user"""
+        token = RefreshToken.for_user(test_user).access_token
+        response = client.get('/api/auth/me/', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        assert response.status_code == 200
+        assert response.json()['email'] == 'test@example.com'
+
+    def test_claims_user_delegates_to_real_user(self, test_user):
+        """Test attributes missing from the token are read from the User row"""
+        user = ClaimsUser(tokens_for_user(test_user).access_token)
+
+        assert user.id == test_user.id
+        assert user.username == 'testuser'
+        assert user.date_joined == test_user.date_joined
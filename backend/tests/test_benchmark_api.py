@@ -0,0 +1,84 @@
+# test_benchmark_api.py
+import json
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from io import StringIO
+from readings.management.commands.load_test_readings import run_phase
+from sensors.management.commands.benchmark_api import BENCH_USERNAME, compare_reports, page_numbers
+
+
+def run_benchmark(tmp_path, **options):
+    output = tmp_path / 'report.json'
+    call_command(
+        'benchmark_api', sensors=8, readings=120, requests=3, warmup=1, pages='1,2,last',
+        output=str(output), stdout=StringIO(), **options
+    )
+    return json.loads(output.read_text())
+
+
+@pytest.mark.django_db
+class TestBenchmarkApi:
+    """Test the API benchmark command"""
+
+    def test_report(self, tmp_path):
+        """Test every scenario is measured without errors and the data is cleaned up"""
+        report = run_benchmark(tmp_path)
+
+        assert report['mode'] == 'in-process'
+        assert report['results']['seed_data']['rows'] == 600
+        for name in ('login', 'list_sensors', 'list_sensors_latest', 'list_readings_page_1',
+                     'list_readings_page_2', 'list_readings_page_last', 'create_reading'):
+            stats = report['results'][name]
+            assert stats['requests'] == 3
+            assert stats['errors'] == 0
+            assert stats['p50'] <= stats['p95'] <= stats['p99'] <= stats['max']
+        assert not User.objects.filter(username__startswith=BENCH_USERNAME).exists()
+
+    def test_leaves_existing_accounts_alone(self, tmp_path):
+        """Test an account already named like the benchmark user survives a run"""
+        existing = User.objects.create_user(BENCH_USERNAME, f'{BENCH_USERNAME}@example.com', 'secret')
+
+        run_benchmark(tmp_path, scenarios='list_sensors')
+
+        assert User.objects.filter(id=existing.id).exists()
+        assert list(User.objects.filter(username__startswith=BENCH_USERNAME)) == [existing]
+
+    def test_compare_fails_on_regression(self, tmp_path):
+        """Test a baseline with far lower latencies fails the run after writing the report"""
+        baseline = run_benchmark(tmp_path, scenarios='list_sensors')
+        baseline['results']['list_sensors'] = {stat: 0.0001 for stat in ('p50', 'p95', 'p99')}
+        path = tmp_path / 'baseline.json'
+        path.write_text(json.dumps(baseline))
+
+        with pytest.raises(CommandError, match='latency regressions'):
+            run_benchmark(tmp_path, scenarios='list_sensors', compare=str(path))
+        assert (tmp_path / 'report.json').exists()
+
+    def test_unknown_scenario(self, tmp_path):
+        """Test unknown scenario names are rejected"""
+        with pytest.raises(CommandError, match='Unknown scenarios'):
+            run_benchmark(tmp_path, scenarios='list_sensors,nope')
+
+
+class TestBenchmarkHelpers:
+    """Test the report helpers"""
+
+    def test_page_numbers(self):
+        """Test "last" resolves to the deepest page and out-of-range pages are dropped"""
+        assert page_numbers(['1', '10', 'last'], 120) == {'1': 1, 'last': 3}
+
+    def test_compare_reports(self):
+        """Test only increases beyond the threshold count as regressions"""
+        baseline = {'results': {'login': {'p50': 10.0, 'p95': 20.0, 'p99': 30.0}}}
+        report = {'results': {'login': {'p50': 11.0, 'p95': 30.0, 'p99': 30.0}, 'new': {'p50': 1.0}}}
+
+        assert compare_reports(report, baseline, 20) == [('login', 'p95', 20.0, 30.0, 50.0)]
+
+    def test_run_phase_percentiles(self):
+        """Test run_phase reports the mean and p99 alongside p50/p95"""
+        stats = run_phase(lambda i: 200, 10, 1)
+
+        assert {'mean', 'p50', 'p95', 'p99', 'max'} <= set(stats)
+        assert stats['errors'] == 0
@@ -0,0 +1,243 @@
+# test_cold_storage.py
+import pytest
+import struct
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone as dj_timezone
+from readings.codec import decode_chunk, encode_chunk
+from readings.columnar import COLUMNAR_CONTENT_TYPE
+from readings.loader import upsert_readings
+from readings.models import DailyReadingRollup, LatestReading, Reading, ReadingChunk
+from readings.rollups import refresh_rollups
+
+COLD_START = datetime(2024, 1, 1, 20, 0, tzinfo=timezone.utc)
+
+@pytest.fixture
+def tiered_readings(test_sensor):
+    """Readings every 10 minutes over three old UTC days, plus a few recent ones"""
+    readings = [
+        Reading(
+            sensor=test_sensor,
+            temperature=round(20 + (i % 17) * 0.1, 1),
+            humidity=round(50 - (i % 7) * 0.5, 1),
+            timestamp=COLD_START + timedelta(minutes=10 * i, microseconds=i),
+        )
+        for i in range(200)
+    ]
+    now = dj_timezone.now().replace(microsecond=0)
+    readings += [
+        Reading(sensor=test_sensor, temperature=25.0, humidity=40.0, timestamp=now - timedelta(hours=i))
+        for i in range(1, 6)
+    ]
+    Reading.objects.bulk_create(readings)
+    refresh_rollups([test_sensor.id])
+    return readings
+
+def all_pages(client, url, params=None):
+    items, page = [], 1
+    while True:
+        data = client.get(url, {**(params or {}), 'page': page, 'page_size': 30}).json()
+        items.extend(data['items'])
+        if len(items) >= data['count']:
+            return data['count'], items
+        page += 1
+
+def cursor_pages(client, url, params=None):
+    """Readings of every page following next cursors, then of those before the last page
+    following previous ones back"""
+    forward, backward = [], []
+    response = client.get(url, {**(params or {}), 'page_size': 30}).json()
+    forward.extend(response['results'])
+    while response['next']:
+        response = client.get(response['next']).json()
+        forward.extend(response['results'])
+    while response['previous']:
+        response = client.get(response['previous']).json()
+        backward = response['results'] + backward
+    return forward, backward
+
+def compact():
+    call_command('compact_readings', older_than_days=30, stdout=StringIO())
+
+
+class TestCodec:
+    """Test the Gorilla-style chunk codec"""
+
+    def test_round_trip_is_exact(self):
+        """Test ids, irregular timestamps and floats survive bit for bit"""
+        rows = [
+            (10, 1_700_000_000_000_000, 21.5, 40.0),
+            (11, 1_700_000_060_000_000, 21.5, 40.1),
+            (12, 1_700_000_120_000_123, -0.0, float('inf')),
+            (950, 1_700_090_000_000_000, 1e-300, 99.99),
+            (951, 1_700_090_000_000_001, 21.5, 40.0),
+        ]
+        decoded = decode_chunk(encode_chunk(rows))
+
+        pack = lambda rows: [(a, b, struct.pack('<d', c), struct.pack('<d', d)) for a, b, c, d in rows]
+        assert pack(decoded) == pack(rows)
+
+    def test_regular_series_compresses(self):
+        """Test a steady minute series costs a few bytes per reading"""
+        rows = [(i, 1_700_000_000_000_000 + i * 60_000_000, 21.0 + (i % 3) * 0.5, 45.0) for i in range(1440)]
+        data = encode_chunk(rows)
+
+        assert decode_chunk(data) == rows
+        assert len(data) < 1440 * 6
+
+    def test_empty_chunk(self):
+        """Test an empty chunk round-trips"""
+        assert decode_chunk(encode_chunk([])) == []
+
+
+@pytest.mark.django_db
+class TestCompaction:
+    """Test compacting old readings and reading them back transparently"""
+
+    def test_compact_moves_old_days(self, test_sensor, tiered_readings):
+        """Test whole old days move into one chunk each and recent ones stay raw"""
+        compact()
+
+        assert list(ReadingChunk.objects.filter(sensor=test_sensor).values_list('day', 'count').order_by('day')) == [
+            (COLD_START.date(), 24),
+            (COLD_START.date() + timedelta(days=1), 144),
+            (COLD_START.date() + timedelta(days=2), 32),
+        ]
+        assert Reading.objects.filter(sensor=test_sensor).count() == 5
+
+    def test_dry_run(self, test_sensor, tiered_readings):
+        """Test a dry run changes nothing"""
+        out = StringIO()
+        call_command('compact_readings', older_than_days=30, dry_run=True, stdout=out)
+
+        assert '3 sensor-day(s)' in out.getvalue()
+        assert not ReadingChunk.objects.exists()
+        assert Reading.objects.filter(sensor=test_sensor).count() == 205
+
+    def test_list_readings_unchanged(self, authenticated_client, test_sensor, tiered_readings):
+        """Test paginated listings match before and after compaction, with and without filters"""
+        url = f'/api/sensors/{test_sensor.id}/readings/'
+        ranges = [
+            {},
+            {'timestamp_from': (COLD_START + timedelta(hours=5)).isoformat()},
+            {'timestamp_from': (COLD_START + timedelta(hours=3)).isoformat(),
+             'timestamp_to': (COLD_START + timedelta(hours=30)).isoformat()},
+        ]
+        before = [all_pages(authenticated_client, url, params) for params in ranges]
+        compact()
+        after = [all_pages(authenticated_client, url, params) for params in ranges]
+
+        assert after == before
+        assert before[0][0] == 205
+
+    def test_cursor_and_async_listings_unchanged(self, authenticated_client, test_sensor, tiered_readings):
+        """Test cursor and async listings match before and after compaction"""
+        url = f'/api/sensors/{test_sensor.id}/readings/'
+        ranges = [
+            {},
+            {'timestamp_from': (COLD_START + timedelta(hours=3)).isoformat(),
+             'timestamp_to': (COLD_START + timedelta(hours=30)).isoformat()},
+        ]
+
+        def snapshot():
+            return (
+                [cursor_pages(authenticated_client, url + 'cursor/', params) for params in ranges],
+                [all_pages(authenticated_client, url + 'async/', params) for params in ranges],
+            )
+
+        before = snapshot()
+        compact()
+        after = snapshot()
+
+        assert after == before
+        forward, backward = before[0][0]
+        assert len(forward) == 205
+        assert [item['timestamp'] for item in forward] == sorted(item['timestamp'] for item in forward)
+        assert backward == forward[:180]
+        assert before[1][0][0] == 205
+
+    def test_cursor_pages_skip_counting(self, authenticated_client, test_sensor, tiered_readings):
+        """Test cursor pages over compacted days fetch a page at a time, without counting the series"""
+        compact()
+        url = f'/api/sensors/{test_sensor.id}/readings/cursor/'
+
+        with CaptureQueriesContext(connection) as queries:
+            first = authenticated_client.get(url, {'page_size': 30}).json()
+            second = authenticated_client.get(first['next']).json()
+            previous = authenticated_client.get(second['previous']).json()
+
+        assert not [query for query in queries if 'COUNT(' in query['sql'].upper()]
+        assert len(first['results']) == len(second['results']) == 30
+        assert first['results'][-1]['timestamp'] < second['results'][0]['timestamp']
+        assert previous['results'] == first['results']
+
+    def test_export_and_columnar_unchanged(self, authenticated_client, test_sensor, tiered_readings):
+        """Test export and columnar listings match before and after compaction"""
+        export_url = f'/api/sensors/{test_sensor.id}/readings/export/'
+        list_url = f'/api/sensors/{test_sensor.id}/readings/'
+
+        def snapshot():
+            export = b''.join(authenticated_client.get(export_url, {'format': 'ndjson'}).streaming_content)
+            columnar = authenticated_client.get(list_url, {'page': 2, 'page_size': 100}, HTTP_ACCEPT=COLUMNAR_CONTENT_TYPE)
+            return export, columnar.content, columnar['X-Total-Count']
+
+        before = snapshot()
+        compact()
+
+        assert snapshot() == before
+        assert len(before[0].splitlines()) == 205
+
+    def test_aggregates_unchanged(self, authenticated_client, test_sensor, tiered_readings):
+        """Test raw and rollup aggregates, and rollup refreshes, still count cold readings"""
+        url = f'/api/sensors/{test_sensor.id}/readings/aggregate/'
+        params = [{'bucket_seconds': 1800}, {'bucket_seconds': 3600}, {'bucket_seconds': 86400}]
+        before = [authenticated_client.get(url, p).json() for p in params]
+        compact()
+        refresh_rollups([test_sensor.id])
+
+        after = [authenticated_client.get(url, p).json() for p in params]
+        assert len(after) == len(before)
+        for old, new in zip(before, after):
+            assert [b['count'] for b in new] == [b['count'] for b in old]
+            assert [b['bucket_start'] for b in new] == [b['bucket_start'] for b in old]
+            assert [b['temperature_avg'] for b in new] == pytest.approx([b['temperature_avg'] for b in old])
+
+    def test_late_reading_on_compacted_day(self, authenticated_client, test_sensor, tiered_readings):
+        """Test a raw reading landing on a compacted day is listed in order and merged by the next run"""
+        compact()
+        late = Reading.objects.create(
+            sensor=test_sensor, temperature=30.0, humidity=30.0,
+            timestamp=COLD_START + timedelta(hours=20, minutes=5),
+        )
+
+        count, items = all_pages(authenticated_client, f'/api/sensors/{test_sensor.id}/readings/')
+        assert count == 206
+        assert [item['timestamp'] for item in items] == sorted(item['timestamp'] for item in items)
+        assert late.id in [item['id'] for item in items]
+
+        compact()
+        assert ReadingChunk.objects.get(sensor=test_sensor, day=late.timestamp.date()).count == 145
+        assert not Reading.objects.filter(id=late.id).exists()
+
+    def test_duplicate_of_compacted_reading(self, authenticated_client, test_sensor, tiered_readings):
+        """Test ingest rejects timestamps already compacted, and rebuilds count shadowed ones once"""
+        compact()
+        url = f'/api/sensors/{test_sensor.id}/readings/'
+        cold = tiered_readings[10].timestamp.isoformat()
+
+        response = authenticated_client.post(url, {'temperature': 1.0, 'humidity': 1.0, 'timestamp': cold}, content_type='application/json')
+        assert response.status_code == 400
+        response = authenticated_client.post(url + 'bulk/', [{'temperature': 1.0, 'humidity': 1.0, 'timestamp': cold}], content_type='application/json')
+        assert response.json()['created'] == 0
+        assert [conflict['index'] for conflict in response.json()['conflicts']] == [0]
+        assert LatestReading.objects.get(sensor=test_sensor).count == 205
+
+        # Batch loads overwrite instead: the raw row shadows the compacted one
+        upsert_readings([(test_sensor.id, tiered_readings[10].timestamp, 1.0, 1.0)])
+        refresh_rollups([test_sensor.id])
+        assert LatestReading.objects.get(sensor=test_sensor).count == 205
+        assert sum(DailyReadingRollup.objects.filter(sensor=test_sensor).values_list('count', flat=True)) == 205
+        assert all_pages(authenticated_client, url)[0] == 205
@@ -0,0 +1,104 @@
+# test_columnar.py
+import pytest
+import struct
+from datetime import datetime, timedelta, timezone
+from readings.columnar import COLUMNAR_CONTENT_TYPE, FLOAT, INT, TIME, encode_columns
+
+def decode(payload):
+    """Reference decoder for the columnar format"""
+    magic, version, ncols, nrows, header_length = struct.unpack_from('<4sHHII', payload)
+    assert (magic, version) == (b'RCOL', 1)
+    assert header_length % 8 == 0
+    offset, columns = 16, []
+    for _ in range(ncols):
+        typecode, name_length = struct.unpack_from('<cB', payload, offset)
+        offset += 2
+        columns.append((payload[offset:offset + name_length].decode(), typecode.decode()))
+        offset += name_length
+    data, offset = {}, header_length
+    for name, typecode in columns:
+        data[name] = list(struct.unpack_from(f'<{nrows}{typecode}', payload, offset))
+        offset += 8 * nrows
+    assert offset == len(payload)
+    return data
+
+def epoch_us(iso):
+    moment = datetime.fromisoformat(iso.replace('Z', '+00:00'))
+    return (moment - datetime(1970, 1, 1, tzinfo=timezone.utc)) // timedelta(microseconds=1)
+
+
+class TestEncodeColumns:
+    """Test the columnar encoder"""
+
+    def test_round_trip(self):
+        """Test values, epoch-microsecond timestamps and 8-byte alignment"""
+        moment = datetime(2024, 8, 1, 12, 30, 15, 250, tzinfo=timezone.utc)
+        payload = encode_columns(
+            (('id', INT), ('timestamp', TIME), ('temperature', FLOAT)),
+            [(1, moment, 21.5), (2, moment, -3.25)],
+        )
+
+        data = decode(payload)
+        assert data['id'] == [1, 2]
+        assert data['timestamp'] == [int(moment.timestamp()) * 1_000_000 + 250] * 2
+        assert data['temperature'] == [21.5, -3.25]
+
+    def test_empty_series(self):
+        """Test an empty series still carries the column layout"""
+        data = decode(encode_columns((('id', INT),), []))
+
+        assert data == {'id': []}
+
+
+@pytest.mark.django_db
+class TestColumnarResponses:
+    """Test content negotiation on the readings series routes"""
+
+    def test_list_readings_columnar(self, authenticated_client, test_sensor, test_readings):
+        """Test the columnar page holds the same readings as the JSON page"""
+        url = f'/api/sensors/{test_sensor.id}/readings/'
+        items = authenticated_client.get(url, {'page_size': 4}).json()['items']
+        response = authenticated_client.get(url, {'page_size': 4}, HTTP_ACCEPT=COLUMNAR_CONTENT_TYPE)
+
+        assert response.status_code == 200
+        assert response['Content-Type'] == COLUMNAR_CONTENT_TYPE
+        assert response['X-Total-Count'] == '10'
+        assert 'Accept' in response['Vary']
+        data = decode(response.content)
+        assert data['id'] == [item['id'] for item in items]
+        # JSON rounds to milliseconds; the columnar format keeps microseconds
+        assert [ts // 1000 for ts in data['timestamp']] == [epoch_us(item['timestamp']) // 1000 for item in items]
+        assert data['temperature'] == [item['temperature'] for item in items]
+        assert data['humidity'] == [item['humidity'] for item in items]
+
+    def test_aggregate_columnar(self, authenticated_client, test_sensor, test_readings):
+        """Test aggregate buckets in the columnar format"""
+        url = f'/api/sensors/{test_sensor.id}/readings/aggregate/'
+        buckets = authenticated_client.get(url, {'bucket_seconds': 3600}).json()
+        response = authenticated_client.get(url, {'bucket_seconds': 3600}, HTTP_ACCEPT=COLUMNAR_CONTENT_TYPE)
+
+        assert response.status_code == 200
+        data = decode(response.content)
+        assert data['count'] == [bucket['count'] for bucket in buckets]
+        assert data['bucket_start'] == [epoch_us(bucket['bucket_start']) for bucket in buckets]
+        assert data['temperature_avg'] == pytest.approx([bucket['temperature_avg'] for bucket in buckets])
+
+    def test_json_by_default(self, authenticated_client, test_sensor, test_readings):
+        """Test JSON stays the default, including when the format is refused with q=0"""
+        response = authenticated_client.get(
+            f'/api/sensors/{test_sensor.id}/readings/',
+            HTTP_ACCEPT=f'application/json, {COLUMNAR_CONTENT_TYPE};q=0'
+        )
+
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('application/json')
+        assert response.json()['count'] == 10
+
+    def test_columnar_other_user_sensor(self, authenticated_client, another_user_sensor):
+        """Test ownership is enforced before encoding"""
+        response = authenticated_client.get(
+            f'/api/sensors/{another_user_sensor.id}/readings/',
+            HTTP_ACCEPT=COLUMNAR_CONTENT_TYPE
+        )
+
+        assert response.status_code == 404
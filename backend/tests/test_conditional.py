@@ -0,0 +1,145 @@
+# test_conditional.py
+import pytest
+import json
+from datetime import datetime, timedelta, timezone
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from readings.columnar import COLUMNAR_CONTENT_TYPE
+from sensors.models import Sensor
+
+BASE = datetime(2024, 5, 1, tzinfo=timezone.utc)
+
+
+def post_reading(client, sensor, minutes):
+    response = client.post(
+        f'/api/sensors/{sensor.id}/readings/',
+        data=json.dumps({
+            'temperature': 21.0,
+            'humidity': 40.0,
+            'timestamp': (BASE + timedelta(minutes=minutes)).isoformat()
+        }),
+        content_type='application/json'
+    )
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+class TestSensorConditionalGet:
+    """Test ETag / Last-Modified handling on the sensor routes"""
+
+    def test_get_sensor_not_modified(self, authenticated_client, test_sensor):
+        """Test a matching If-None-Match gets 304 until the sensor changes"""
+        url = f'/api/sensors/{test_sensor.id}/'
+        response = authenticated_client.get(url)
+        etag = response['ETag']
+        assert response.status_code == 200
+        assert response['Last-Modified']
+        assert response['Cache-Control'] == 'private, no-cache'
+
+        response = authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+        assert response['ETag'] == etag
+        assert response.content == b''
+
+        authenticated_client.put(
+            url,
+            data=json.dumps({'name': 'Renamed', 'model': 'TestModel'}),
+            content_type='application/json'
+        )
+        response = authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response['ETag'] != etag
+
+    def test_other_user_sensor_still_404(self, authenticated_client, another_user_sensor):
+        """Test conditional requests cannot probe other users' sensors"""
+        response = authenticated_client.get(f'/api/sensors/{another_user_sensor.id}/', HTTP_IF_NONE_MATCH='*')
+
+        assert response.status_code == 404
+
+    def test_list_sensors_not_modified(self, authenticated_client, test_user, test_sensor):
+        """Test the list revalidates until a sensor is added or its readings change"""
+        url = '/api/sensors/?include_latest=true'
+        etag = authenticated_client.get(url)['ETag']
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+        assert len(ctx.captured_queries) == 1
+
+        post_reading(authenticated_client, test_sensor, 0)
+        response = authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        etag = response['ETag']
+
+        Sensor.objects.create(owner=test_user, name='New', model='DHT22')
+        assert authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    def test_list_sensors_etag_per_query(self, authenticated_client, test_sensor):
+        """Test different pages and filters get different validators"""
+        first = authenticated_client.get('/api/sensors/')['ETag']
+        second = authenticated_client.get('/api/sensors/?q=test')['ETag']
+
+        assert first != second
+        assert authenticated_client.get('/api/sensors/?q=test', HTTP_IF_NONE_MATCH=first).status_code == 200
+
+
+@pytest.mark.django_db
+class TestReadingsConditionalGet:
+    """Test ETag / Last-Modified handling on the readings routes"""
+
+    @pytest.mark.parametrize('suffix', ['', 'cursor/', 'aggregate/?bucket_seconds=3600', 'export/', 'async/'])
+    def test_not_modified_until_ingest(self, authenticated_client, test_sensor, suffix):
+        """Test each read route answers 304 until a reading is added"""
+        post_reading(authenticated_client, test_sensor, 0)
+        url = f'/api/sensors/{test_sensor.id}/readings/{suffix}'
+        etag = authenticated_client.get(url)['ETag']
+
+        response = authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+
+        post_reading(authenticated_client, test_sensor, 1)
+        response = authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response['ETag'] != etag
+
+    def test_bulk_ingest_changes_etag(self, authenticated_client, test_sensor):
+        """Test batch writes invalidate the validators too"""
+        post_reading(authenticated_client, test_sensor, 0)
+        url = f'/api/sensors/{test_sensor.id}/readings/'
+        etag = authenticated_client.get(url)['ETag']
+
+        authenticated_client.post(
+            f'/api/sensors/{test_sensor.id}/readings/bulk/',
+            data=json.dumps([{'temperature': 1.0, 'humidity': 2.0, 'timestamp': (BASE + timedelta(hours=1)).isoformat()}]),
+            content_type='application/json'
+        )
+        assert authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    def test_etag_per_representation(self, authenticated_client, test_sensor):
+        """Test JSON and columnar responses carry different validators"""
+        post_reading(authenticated_client, test_sensor, 0)
+        url = f'/api/sensors/{test_sensor.id}/readings/'
+        json_etag = authenticated_client.get(url)['ETag']
+
+        response = authenticated_client.get(url, HTTP_ACCEPT=COLUMNAR_CONTENT_TYPE, HTTP_IF_NONE_MATCH=json_etag)
+        assert response.status_code == 200
+        assert response['Content-Type'] == COLUMNAR_CONTENT_TYPE
+        columnar_etag = response['ETag']
+        assert columnar_etag != json_etag
+
+        response = authenticated_client.get(url, HTTP_ACCEPT=COLUMNAR_CONTENT_TYPE, HTTP_IF_NONE_MATCH=columnar_etag)
+        assert response.status_code == 304
+
+    def test_if_modified_since(self, authenticated_client, test_sensor):
+        """Test Last-Modified revalidation when no ETag is sent"""
+        post_reading(authenticated_client, test_sensor, 0)
+        url = f'/api/sensors/{test_sensor.id}/readings/'
+        last_modified = authenticated_client.get(url)['Last-Modified']
+
+        assert authenticated_client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code == 304
+
+    def test_other_user_sensor_still_404(self, authenticated_client, another_user_sensor):
+        """Test conditional requests cannot probe other users' readings"""
+        response = authenticated_client.get(f'/api/sensors/{another_user_sensor.id}/readings/', HTTP_IF_NONE_MATCH='*')
+
+        assert response.status_code == 404
@@ -0,0 +1,97 @@
+# test_import_readings.py
+import json
+import pytest
+from io import StringIO
+from unittest.mock import patch
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from readings.management.commands.import_readings import split_ranges
+from readings.models import HourlyReadingRollup, LatestReading, Reading
+from sensors.models import Sensor
+
+@pytest.fixture
+def import_csv(tmp_path):
+    lines = ["timestamp,device_id,temperature,humidity"]
+    for minute in range(40):
+        lines.append(f"2024-08-01 00:{minute:02d}:00+00:00,device-001,{20 + minute / 10},50.0")
+    lines.append("2024-08-01 01:00:00+00:00,device-unknown,20.0,50.0")
+    lines.append("garbage,device-001,20.0,50.0")
+    path = tmp_path / "dump.csv"
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+@pytest.fixture
+def device_sensor(test_user):
+    return Sensor.objects.create(owner=test_user, name='device-001', model='EnviroSense')
+
+@pytest.mark.django_db
+class TestImportReadings:
+    """Test the parallel, resumable import command"""
+
+    def test_split_ranges_cover_file(self, import_csv):
+        """Test that byte ranges are contiguous, line-aligned and cover the body"""
+        ranges = split_ranges(import_csv, 200)
+        data = import_csv.read_bytes()
+
+        assert len(ranges) > 1
+        assert ranges[0][0] == data.index(b"\n") + 1
+        assert ranges[-1][1] == len(data)
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            assert end == start
+            assert data[end - 1:end] == b"\n"
+
+    def test_import_readings(self, import_csv, device_sensor):
+        """Test importing a file in several chunks"""
+        out = StringIO()
+        call_command(
+            "import_readings", str(import_csv),
+            "--workers", "1", "--chunk-bytes", "200", "--batch-size", "7",
+            stdout=out
+        )
+
+        assert Reading.objects.filter(sensor=device_sensor).count() == 40
+        assert "Skipped 2" in out.getvalue()
+        assert not (import_csv.parent / "dump.csv.checkpoint.json").exists()
+
+    def test_import_resumes_from_checkpoint(self, import_csv, device_sensor):
+        """Test that chunks recorded in the checkpoint are not imported again"""
+        ranges = split_ranges(import_csv, 200)
+        checkpoint = import_csv.parent / "dump.csv.checkpoint.json"
+        checkpoint.write_text(json.dumps({
+            "key": {
+                "csv": str(import_csv.resolve()),
+                "size": import_csv.stat().st_size,
+                "chunk_bytes": 200,
+            },
+            "done": [0],
+        }))
+
+        out = StringIO()
+        call_command("import_readings", str(import_csv), "--workers", "1", "--chunk-bytes", "200", stdout=out)
+
+        first_chunk_rows = import_csv.read_bytes()[ranges[0][0]:ranges[0][1]].count(b"\n")
+        assert Reading.objects.filter(sensor=device_sensor).count() == 40 - first_chunk_rows
+        assert "Resuming" in out.getvalue()
+        assert not checkpoint.exists()
+
+    def test_import_rejects_foreign_checkpoint(self, import_csv, device_sensor):
+        """Test that a checkpoint for another chunk size is not silently reused"""
+        checkpoint = import_csv.parent / "dump.csv.checkpoint.json"
+        checkpoint.write_text(json.dumps({"key": {"csv": "other.csv"}, "done": [0]}))
+
+        with pytest.raises(CommandError):
+            call_command("import_readings", str(import_csv), "--workers", "1", stdout=StringIO())
+
+    def test_import_refreshes_rollups_once(self, import_csv, device_sensor):
+        """Test that batches skip the rollup refresh and the import rebuilds them at the end"""
+        with patch("readings.loader.refresh_rollups_for") as per_batch:
+            call_command(
+                "import_readings", str(import_csv),
+                "--workers", "1", "--chunk-bytes", "200", "--batch-size", "7",
+                stdout=StringIO()
+            )
+
+        per_batch.assert_not_called()
+        snapshot = LatestReading.objects.get(sensor=device_sensor)
+        assert snapshot.count == 40
+        assert HourlyReadingRollup.objects.get(sensor=device_sensor).count == 40
@@ -0,0 +1,134 @@
+# test_ingest_buffer.py
+import json
+import time
+import pytest
+from datetime import datetime, timezone
+from django.test import override_settings
+from readings.buffer import IngestBuffer, get_ingest_buffer
+from readings.models import HourlyReadingRollup, Reading
+
+# Flusher effectively idle so tests decide when to flush, on the test's DB connection
+BUFFERED = {"ENABLED": True, "MAX_ROWS": 3, "BATCH_SIZE": 100, "FLUSH_INTERVAL_MS": 600_000}
+
+def row(minute, sensor_id=1):
+    return (sensor_id, datetime(2024, 8, 1, 0, minute, tzinfo=timezone.utc), 20.0, 50.0)
+
+
+class TestIngestBuffer:
+    """Test the write-behind buffer in isolation"""
+
+    def test_rejects_when_full(self):
+        """Test offers beyond MAX_ROWS are refused and counted"""
+        buffer = IngestBuffer(max_rows=2, batch_size=100, flush_interval=600, writer=len)
+
+        assert buffer.offer(row(0))
+        assert buffer.offer(row(1))
+        assert not buffer.offer(row(2))
+
+        metrics = buffer.metrics()
+        assert metrics['queue_depth'] == 2
+        assert metrics['accepted'] == 2
+        assert metrics['rejected'] == 1
+        buffer.close()
+
+    def test_flush_writes_in_batches(self):
+        """Test a flush drains the queue with one writer call per batch"""
+        batches = []
+        buffer = IngestBuffer(max_rows=100, batch_size=4, flush_interval=600, writer=lambda rows: batches.append(rows) or len(rows))
+        buffer._stop.set()  # keep the flusher thread out of the way
+        for minute in range(10):
+            buffer.offer(row(minute))
+
+        assert buffer.flush() == 10
+        assert [len(batch) for batch in batches] == [4, 4, 2]
+        metrics = buffer.metrics()
+        assert metrics['queue_depth'] == 0
+        assert metrics['flushed'] == 10
+        assert metrics['flushes'] == 3
+
+    def test_background_flush_on_full_batch(self):
+        """Test reaching BATCH_SIZE wakes the flusher before the interval elapses"""
+        written = []
+        buffer = IngestBuffer(max_rows=100, batch_size=2, flush_interval=600, writer=lambda rows: written.extend(rows) or len(rows))
+        buffer.offer(row(0))
+        buffer.offer(row(1))
+
+        deadline = time.monotonic() + 5
+        while not written and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert buffer.close() == 0
+        assert len(written) == 2
+
+    def test_failed_batch_retries_row_by_row(self):
+        """Test only the rows that fail on their own are dropped"""
+        def writer(rows):
+            if any(sensor_id == 99 for sensor_id, *_ in rows):
+                raise ValueError('unknown sensor')
+            return len(rows)
+
+        buffer = IngestBuffer(max_rows=100, batch_size=100, flush_interval=600, writer=writer)
+        buffer._stop.set()
+        buffer.offer(row(0))
+        buffer.offer(row(1, sensor_id=99))
+        buffer.offer(row(2))
+
+        assert buffer.flush() == 2
+        assert buffer.metrics()['dropped'] == 1
+
+
+@pytest.mark.django_db
+class TestBufferedIngest:
+    """Test the create-reading routes in buffered mode"""
+
+    def post(self, client, sensor, minute, suffix=''):
+        return client.post(
+            f'/api/sensors/{sensor.id}/readings/{suffix}',
+            data=json.dumps({
+                'temperature': 20.0 + minute,
+                'humidity': 50.0,
+                'timestamp': f'2024-08-01T00:{minute:02d}:00Z'
+            }),
+            content_type='application/json'
+        )
+
+    def test_buffered_reading_is_written_on_flush(self, authenticated_client, test_sensor):
+        """Test readings are acknowledged with 202 and persisted by the flush"""
+        with override_settings(READINGS_INGEST_BUFFER=BUFFERED):
+            response = self.post(authenticated_client, test_sensor, 0)
+            async_response = self.post(authenticated_client, test_sensor, 1, 'async/')
+
+            assert response.status_code == 202
+            assert response.json()['sensor_id'] == test_sensor.id
+            assert async_response.status_code == 202
+            assert not Reading.objects.filter(sensor=test_sensor).exists()
+
+            assert get_ingest_buffer().flush() == 2
+
+        assert Reading.objects.filter(sensor=test_sensor).count() == 2
+        assert HourlyReadingRollup.objects.get(sensor=test_sensor).count == 2
+
+    def test_full_buffer_returns_429(self, authenticated_client, test_sensor):
+        """Test backpressure once MAX_ROWS readings are waiting"""
+        with override_settings(READINGS_INGEST_BUFFER=BUFFERED):
+            statuses = [self.post(authenticated_client, test_sensor, minute).status_code for minute in range(4)]
+            metrics = authenticated_client.get('/api/ingest/buffer/').json()
+            get_ingest_buffer().flush()
+
+        assert statuses == [202, 202, 202, 429]
+        assert metrics['enabled'] is True
+        assert metrics['queue_depth'] == 3
+        assert metrics['rejected'] == 1
+
+    def test_buffered_other_user_sensor(self, authenticated_client, another_user_sensor):
+        """Test ownership is still checked before queueing"""
+        with override_settings(READINGS_INGEST_BUFFER=BUFFERED):
+            response = self.post(authenticated_client, another_user_sensor, 0)
+
+        assert response.status_code == 404
+
+    def test_metrics_when_disabled(self, authenticated_client):
+        """Test the metrics route reports a disabled buffer"""
+        response = authenticated_client.get('/api/ingest/buffer/')
+
+        assert response.status_code == 200
+        assert response.json()['enabled'] is False
@@ -0,0 +1,136 @@
+# test_instrumentation.py
+import logging
+import pytest
+from datetime import datetime, timedelta, timezone
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from mysite.instrumentation import RequestMetricsMiddleware, registry
+from readings.models import Reading
+from users.authentication import tokens_for_user
+
+BASE = datetime(2024, 6, 1, tzinfo=timezone.utc)
+
+
+def timings(response):
+    """Server-Timing entries by metric name"""
+    entries = {}
+    for entry in response['Server-Timing'].split(', '):
+        name, *params = entry.split(';')
+        entries[name] = dict(param.split('=', 1) for param in params)
+    return entries
+
+
+@pytest.fixture(autouse=True)
+def reset_registry():
+    registry.reset()
+    yield
+    registry.reset()
+
+
+@pytest.mark.django_db
+class TestRequestMetrics:
+    """Test the query-count and latency middleware"""
+
+    def test_server_timing_counts_queries(self, authenticated_client, test_sensor):
+        """Test the header reports the request's queries and the view/serialize split"""
+        url = f'/api/sensors/{test_sensor.id}/readings/'
+        with CaptureQueriesContext(connection) as ctx:
+            response = authenticated_client.get(url)
+
+        entries = timings(response)
+        assert entries['db']['desc'] == f'"{len(ctx.captured_queries)} queries"'
+        assert {'view', 'serialize', 'app'} <= set(entries)
+
+    def test_uninstrumented_route(self, authenticated_client, test_sensor):
+        """Test routes without the decorator still report database and total time"""
+        response = authenticated_client.put(
+            f'/api/sensors/{test_sensor.id}/',
+            data='{"name": "Renamed", "model": "TestModel"}',
+            content_type='application/json'
+        )
+
+        assert set(timings(response)) == {'db', 'app'}
+
+    def test_async_route_counts_thread_queries(self, test_user, test_sensor):
+        """Test queries run through sync_to_async are attributed to the request"""
+        token = str(tokens_for_user(test_user).access_token)
+        response = async_to_sync(AsyncClient().get)(
+            f'/api/sensors/{test_sensor.id}/readings/async/',
+            headers={'Authorization': f'Bearer {token}'},
+        )
+
+        assert response.status_code == 200
+        assert timings(response)['db']['desc'] != '"0 queries"'
+
+    def test_flags_n_plus_one(self, test_sensor, settings, caplog):
+        """Test a per-row relation lookup (Reading.__str__) is flagged above the threshold"""
+        settings.REQUEST_METRICS = {'N_PLUS_ONE_THRESHOLD': 3}
+        for minute in range(4):
+            Reading.objects.create(sensor=test_sensor, timestamp=BASE + timedelta(minutes=minute), temperature=20.0, humidity=50.0)
+        middleware = RequestMetricsMiddleware(lambda request: HttpResponse(', '.join(map(str, Reading.objects.all()))))
+
+        with caplog.at_level(logging.WARNING, logger='mysite.instrumentation'):
+            response = middleware(RequestFactory().get('/report/'))
+
+        assert timings(response)['n-plus-one']['desc'] == '"4 repeats"'
+        assert 'Possible N+1' in caplog.text
+        assert 'http_n_plus_one_total{method="GET",route="unmatched"} 1' in registry.render()
+
+    def test_disabled(self, authenticated_client, test_sensor, settings):
+        """Test nothing is recorded or added when disabled"""
+        settings.REQUEST_METRICS = {'ENABLED': False}
+        response = authenticated_client.get(f'/api/sensors/{test_sensor.id}/')
+
+        assert 'Server-Timing' not in response
+        assert '/api/sensors/<sensor_id>/' not in registry.render()
+
+
+@pytest.mark.django_db
+class TestMetricsEndpoint:
+    """Test the Prometheus scrape endpoint"""
+
+    def test_exposition(self, authenticated_client, test_sensor):
+        """Test requests show up per route template with histograms and response sizes"""
+        authenticated_client.get(f'/api/sensors/{test_sensor.id}/readings/')
+        response = authenticated_client.get('/api/metrics')
+        text = response.content.decode()
+
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+        assert 'http_requests_total{method="GET",route="/api/sensors/<sensor_id>/readings/",status="200"} 1' in text
+        assert 'http_request_db_queries_bucket{method="GET",route="/api/sensors/<sensor_id>/readings/",le="+Inf"} 1' in text
+        assert 'http_response_size_bytes_count{method="GET",route="/api/sensors/<sensor_id>/readings/"} 1' in text
+        assert '# TYPE http_request_duration_seconds histogram' in text
+
+    def test_token(self, client, settings):
+        """Test a configured token is required"""
+        settings.REQUEST_METRICS = {'METRICS_TOKEN': 's3cret'}
+
+        assert client.get('/api/metrics').status_code == 401
+        assert client.get('/api/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code == 401
+        assert client.get('/api/metrics', HTTP_AUTHORIZATION='Bearer s3cret').status_code == 200
+
+
+@pytest.mark.skipif(connection.vendor != "postgresql", reason="psycopg connection pools require PostgreSQL")
+@pytest.mark.django_db
+def test_pool_metrics(client, monkeypatch):
+    """Test open connection pools are reported with their sizes and usage"""
+    pytest.importorskip('psycopg_pool')
+    configured = bool(connection.settings_dict['OPTIONS'].get('pool'))
+    if not configured:
+        monkeypatch.setitem(connection.settings_dict, 'OPTIONS', {'pool': {'min_size': 1, 'max_size': 3}})
+    try:
+        connection.pool.open(wait=True)
+        with connection.pool.connection():
+            pass
+        max_size = connection.pool.max_size
+        text = client.get('/api/metrics').content.decode()
+    finally:
+        if not configured:
+            connection.close_pool()
+
+    assert f'db_pool_max_size{{alias="default"}} {max_size}' in text
+    assert '# TYPE db_pool_requests_total counter' in text
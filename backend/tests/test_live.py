@@ -0,0 +1,204 @@
+# test_live.py
+import asyncio
+import json
+import threading
+import pytest
+from datetime import datetime, timedelta, timezone
+from asgiref.sync import async_to_sync, sync_to_async
+from django.db import connection
+from django.test import AsyncClient
+from readings import live
+from readings.live import OVERFLOW, ReadingBroker, get_broker, reading_event
+from readings.loader import upsert_readings
+from readings.models import Reading
+from users.authentication import tokens_for_user
+
+LOCAL = {"BACKEND": "local", "QUEUE_SIZE": 10, "KEEPALIVE": 15}
+POSTGRES = {"BACKEND": "postgres", "QUEUE_SIZE": 10, "KEEPALIVE": 15}
+
+BASE = datetime(2024, 9, 1, tzinfo=timezone.utc)
+
+def event(minute, sensor_id=1):
+    return reading_event(sensor_id, BASE + timedelta(minutes=minute), 20.0, 50.0, id=minute)
+
+def parse_events(chunk):
+    """``(id, data)`` of the reading events in an SSE chunk"""
+    text = chunk.decode() if isinstance(chunk, bytes) else chunk
+    events = []
+    for block in text.split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith(':'))
+        if fields.get('event') == 'reading':
+            events.append((fields['id'], json.loads(fields['data'])))
+    return events
+
+
+class TestReadingBroker:
+    """Test the in-process fan-out"""
+
+    def test_publish_from_another_thread(self):
+        """Test subscribers of a sensor get its events, and only its events"""
+        broker = ReadingBroker(queue_size=10)
+
+        async def scenario():
+            queue = broker.subscribe(1)
+            other = broker.subscribe(2)
+            thread = threading.Thread(target=broker.publish, args=(1, [event(0)]))
+            thread.start()
+            thread.join()
+            received = await asyncio.wait_for(queue.get(), 1)
+            await asyncio.sleep(0)
+            return received, other.empty()
+
+        received, other_empty = asyncio.run(scenario())
+        assert received == [event(0)]
+        assert other_empty
+
+    def test_overflow_ends_subscription(self):
+        """Test a subscriber that falls behind gets the overflow marker"""
+        broker = ReadingBroker(queue_size=2)
+
+        async def scenario():
+            queue = broker.subscribe(1)
+            for minute in range(3):
+                broker.publish(1, [event(minute)])
+            await asyncio.sleep(0)
+            return [queue.get_nowait() for _ in range(queue.qsize())]
+
+        assert asyncio.run(scenario())[-1] is OVERFLOW
+
+    def test_unsubscribe(self):
+        """Test unsubscribed queues are forgotten"""
+        broker = ReadingBroker(queue_size=2)
+
+        async def scenario():
+            queue = broker.subscribe(1)
+            assert broker.subscriber_count(1) == 1
+            broker.unsubscribe(1, queue)
+
+        asyncio.run(scenario())
+        assert broker.subscriber_count() == 0
+
+    def test_batches_fit_notify_payload(self):
+        """Test large publishes are split into NOTIFY-sized batches per sensor"""
+        events = [event(minute, sensor_id=minute % 2) for minute in range(400)]
+        batches = list(live._batches(events))
+
+        assert sum(len(batch) for _, batch in batches) == 400
+        assert {sensor_id for sensor_id, _ in batches} == {0, 1}
+        for sensor_id, batch in batches:
+            assert len(json.dumps({'sensor_id': sensor_id, 'readings': batch})) < 8000
+
+
+@pytest.mark.django_db
+class TestLiveStream:
+    """Test the server-sent events route"""
+
+    @pytest.fixture(autouse=True)
+    def local_backend(self, settings):
+        settings.READINGS_LIVE_STREAM = LOCAL
+
+    def stream(self, user, sensor, **headers):
+        """Open the sensor's stream as ``user``"""
+        token = str(tokens_for_user(user).access_token)
+        return AsyncClient().get(
+            f'/api/sensors/{sensor.id}/readings/stream/',
+            headers={'Authorization': f'Bearer {token}', **headers},
+        )
+
+    def test_stream_pushes_published_readings(self, test_user, test_sensor):
+        """Test readings published after subscribing arrive as SSE events"""
+        async def scenario():
+            response = await self.stream(test_user, test_sensor)
+            assert response['Content-Type'] == 'text/event-stream'
+            chunks = aiter(response.streaming_content)
+            assert 'retry:' in (await anext(chunks)).decode()
+            assert get_broker().subscriber_count(test_sensor.id) == 1
+
+            get_broker().publish(test_sensor.id, [event(0, test_sensor.id)])
+            received = parse_events(await asyncio.wait_for(anext(chunks), 1))
+            await chunks.aclose()
+            return received
+
+        [(event_id, data)] = async_to_sync(scenario)()
+        assert data == event(0, test_sensor.id)
+        assert event_id == data['timestamp']
+        assert get_broker().subscriber_count() == 0
+
+    def test_stream_replays_after_last_event_id(self, test_user, test_sensor):
+        """Test a resumed stream first sends the readings it missed"""
+        for minute in range(3):
+            Reading.objects.create(sensor=test_sensor, timestamp=BASE + timedelta(minutes=minute), temperature=20.0, humidity=50.0)
+
+        async def scenario():
+            response = await self.stream(test_user, test_sensor, **{'Last-Event-ID': BASE.isoformat()})
+            chunks = aiter(response.streaming_content)
+            await anext(chunks)
+            received = []
+            for _ in range(2):
+                received += parse_events(await asyncio.wait_for(anext(chunks), 1))
+            await chunks.aclose()
+            return received
+
+        received = async_to_sync(scenario)()
+        assert [data['timestamp'] for _, data in received] == [
+            (BASE + timedelta(minutes=minute)).isoformat() for minute in (1, 2)
+        ]
+
+    def test_stream_other_user_sensor(self, test_user, another_user_sensor):
+        """Test streams of other users' sensors are not found"""
+        response = async_to_sync(self.stream)(test_user, another_user_sensor)
+
+        assert response.status_code == 404
+
+    def test_stream_needs_asgi(self, authenticated_client, test_sensor):
+        """Test WSGI requests are refused instead of buffering an endless stream"""
+        response = authenticated_client.get(f'/api/sensors/{test_sensor.id}/readings/stream/')
+
+        assert response.status_code == 501
+        assert get_broker().subscriber_count() == 0
+
+    @pytest.mark.parametrize('route', ['single', 'bulk', 'upsert'])
+    def test_ingest_publishes_on_commit(self, authenticated_client, test_sensor, django_capture_on_commit_callbacks, route):
+        """Test every ingest path publishes the readings it wrote"""
+        def ingest():
+            payload = {'temperature': 21.5, 'humidity': 40.0, 'timestamp': BASE.isoformat()}
+            url = f'/api/sensors/{test_sensor.id}/readings/'
+            with django_capture_on_commit_callbacks(execute=True):
+                if route == 'single':
+                    authenticated_client.post(url, data=json.dumps(payload), content_type='application/json')
+                elif route == 'bulk':
+                    authenticated_client.post(url + 'bulk/', data=json.dumps([payload]), content_type='application/json')
+                else:
+                    upsert_readings([(test_sensor.id, BASE, 21.5, 40.0)])
+
+        async def scenario():
+            queue = get_broker().subscribe(test_sensor.id)
+            await sync_to_async(ingest)()
+            return await asyncio.wait_for(queue.get(), 1)
+
+        [data] = async_to_sync(scenario)()
+        assert data['timestamp'] == BASE.isoformat()
+        assert data['temperature'] == 21.5
+
+    def test_bulk_loads_skip_publishing(self, test_sensor, django_capture_on_commit_callbacks):
+        """Test upserts with publish=False, as seed_data and import_readings run them, publish nothing"""
+        with django_capture_on_commit_callbacks() as callbacks:
+            upsert_readings([(test_sensor.id, BASE, 21.5, 40.0)], publish=False)
+
+        assert callbacks == []
+
+
+@pytest.mark.skipif(connection.vendor != "postgresql", reason="LISTEN/NOTIFY requires PostgreSQL")
+@pytest.mark.django_db(transaction=True)
+def test_postgres_notify_reaches_broker(test_sensor, settings):
+    """Test committed readings reach the broker through the LISTEN thread"""
+    settings.READINGS_LIVE_STREAM = POSTGRES
+    async def scenario():
+        queue = get_broker().subscribe(test_sensor.id)
+        assert await sync_to_async(live._listener.ready.wait)(5)
+        await sync_to_async(upsert_readings)([(test_sensor.id, BASE, 19.0, 45.0)])
+        return await asyncio.wait_for(queue.get(), 5)
+
+    [data] = async_to_sync(scenario)()
+    assert data['sensor_id'] == test_sensor.id
+    assert data['temperature'] == 19.0
@@ -0,0 +1,29 @@
+# test_load_test_readings.py
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from readings.management.commands.load_test_readings import run_phase
+
+
+class TestLoadTestReadings:
+    """Test the sync vs async load test command"""
+
+    def test_run_phase_counts_errors(self):
+        """Test every request is issued once and failures are counted"""
+        calls = []
+
+        def send(i):
+            calls.append(i)
+            return 500 if i % 4 == 0 else 200
+
+        stats = run_phase(send, 20, 5)
+
+        assert sorted(calls) == list(range(20))
+        assert stats['requests'] == 20
+        assert stats['errors'] == 5
+        assert stats['p50'] <= stats['p95'] <= stats['max']
+
+    def test_unreachable_server(self):
+        """Test a failed login aborts the run"""
+        with pytest.raises(CommandError, match='Login failed'):
+            call_command('load_test_readings', url='http://127.0.0.1:9', requests=1)
@@ -0,0 +1,91 @@
+# test_ownership.py
+import pytest
+import json
+from datetime import datetime
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone as dj_timezone
+from readings.models import Reading
+from sensors.models import Sensor
+from sensors.ownership import LocalOwnerCache, get_owner_cache
+
+def sensor_queries(queries):
+    return [query for query in queries if 'sensors_sensor' in query['sql']]
+
+class TestLocalOwnerCache:
+    """Test the in-process LRU/TTL cache"""
+
+    def test_entries_expire(self, monkeypatch):
+        now = [100.0]
+        monkeypatch.setattr('sensors.ownership.time.monotonic', lambda: now[0])
+        cache = LocalOwnerCache(ttl=10, max_size=10)
+
+        cache.set(1, 42)
+        assert cache.get(1) == 42
+
+        now[0] += 11
+        assert cache.get(1) is None
+
+    def test_least_recently_used_is_evicted(self):
+        cache = LocalOwnerCache(ttl=60, max_size=2)
+        cache.set(1, 10)
+        cache.set(2, 20)
+        cache.get(1)
+        cache.set(3, 30)
+
+        assert cache.get(1) == 10
+        assert cache.get(2) is None
+        assert cache.get(3) == 30
+
+@pytest.mark.django_db
+class TestOwnershipCacheOnReadings:
+    """Test that readings routes reuse cached ownership and see invalidations"""
+
+    def test_repeat_requests_skip_sensor_lookup(self, authenticated_client, test_sensor):
+        url = f'/api/sensors/{test_sensor.id}/readings/'
+        authenticated_client.get(url)
+
+        with CaptureQueriesContext(connection) as captured:
+            response = authenticated_client.get(f'{url}aggregate/')
+
+        assert response.status_code == 200
+        assert sensor_queries(captured.captured_queries) == []
+
+    def test_writes_recheck_hidden_sensor(self, authenticated_client, test_sensor):
+        """Test a sensor hidden by another process stops taking readings before its cache entry expires"""
+        url = f'/api/sensors/{test_sensor.id}/readings/'
+        assert authenticated_client.get(url).status_code == 200
+
+        # As schedule_deletion in another process: hidden without a signal reaching this cache
+        Sensor.objects.filter(id=test_sensor.id).update(deleted_at=dj_timezone.now())
+        reading = {'temperature': 21.0, 'humidity': 40.0, 'timestamp': datetime.now().isoformat()}
+
+        assert authenticated_client.post(url, data=json.dumps(reading), content_type='application/json').status_code == 404
+        assert authenticated_client.post(
+            f'{url}bulk/', data=json.dumps([reading]), content_type='application/json'
+        ).status_code == 404
+        assert not Reading.objects.filter(sensor=test_sensor).exists()
+
+    def test_other_user_still_rejected_from_cache(self, authenticated_client, another_user_sensor):
+        url = f'/api/sensors/{another_user_sensor.id}/readings/'
+        get_owner_cache().set(another_user_sensor.id, another_user_sensor.owner_id)
+
+        assert authenticated_client.get(url).status_code == 404
+
+    def test_delete_sensor_invalidates(self, authenticated_client, test_sensor):
+        url = f'/api/sensors/{test_sensor.id}/readings/'
+        assert authenticated_client.get(url).status_code == 200
+
+        authenticated_client.delete(f'/api/sensors/{test_sensor.id}/')
+
+        assert get_owner_cache().get(test_sensor.id) is None
+        assert authenticated_client.get(url).status_code == 404
+
+    def test_owner_change_invalidates(self, authenticated_client, test_sensor, another_user):
+        url = f'/api/sensors/{test_sensor.id}/readings/'
+        assert authenticated_client.get(url).status_code == 200
+
+        test_sensor.owner = another_user
+        test_sensor.save()
+
+        assert authenticated_client.get(url).status_code == 404
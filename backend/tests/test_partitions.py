@@ -0,0 +1,54 @@
+# test_partitions.py
+import pytest
+from datetime import date, datetime, timezone
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from readings.models import DailyReadingRollup, LatestReading, Reading
+from readings.rollups import refresh_rollups
+from readings.partitions import add_months, create_partition, list_partitions, month_start, partition_month, partition_name
+
+postgres_only = pytest.mark.skipif(connection.vendor != "postgresql", reason="Partitioning requires PostgreSQL")
+
+class TestPartitionHelpers:
+    """Test month arithmetic and partition naming"""
+
+    def test_add_months_wraps_years(self):
+        assert add_months(date(2024, 11, 1), 3) == date(2025, 2, 1)
+        assert add_months(date(2024, 1, 1), -1) == date(2023, 12, 1)
+
+    def test_partition_name_round_trip(self):
+        month = month_start(datetime(2024, 8, 17, 12, tzinfo=timezone.utc))
+        assert partition_name(month) == "readings_reading_p2024_08"
+        assert partition_month(partition_name(month)) == month
+        assert partition_month("readings_reading_default") is None
+
+@postgres_only
+@pytest.mark.django_db
+class TestManageReadingPartitions:
+    """Test the partition maintenance command against a partitioned table"""
+
+    def test_creates_future_partitions(self):
+        call_command("manage_reading_partitions", "--ahead", "12", stdout=StringIO())
+
+        current = month_start(datetime.now(timezone.utc))
+        partitions = list_partitions(connection)
+        for offset in range(13):
+            assert add_months(current, offset) in partitions
+
+    def test_drops_expired_partitions(self, test_sensor):
+        old = datetime(2001, 1, 15, tzinfo=timezone.utc)
+        Reading.objects.create(sensor=test_sensor, temperature=1.0, humidity=1.0, timestamp=old)
+        call_command("manage_reading_partitions", "--ahead", "0", stdout=StringIO())
+        create_partition(connection, month_start(old))
+        assert Reading.objects.filter(timestamp=old).exists()
+        refresh_rollups([test_sensor.id])
+
+        out = StringIO()
+        call_command("manage_reading_partitions", "--ahead", "0", "--retain", "12", stdout=out)
+
+        assert "Dropped readings_reading_p2001_01" in out.getvalue()
+        assert month_start(old) not in list_partitions(connection)
+        assert not Reading.objects.filter(timestamp=old).exists()
+        assert not DailyReadingRollup.objects.filter(sensor=test_sensor).exists()
+        assert not LatestReading.objects.filter(sensor=test_sensor).exists()
@@ -1,8 +1,13 @@
 # test_readings.py
 import pytest
 import json
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from readings.models import Reading
+from sensors.models import Sensor
+from readings.rollups import refresh_rollups
 
 @pytest.mark.django_db
 class TestReadingsCRUD:
@@ -180,4 +185,359 @@ class TestReadingsCRUD:
         # Verify readings are in chronological order
         timestamps = [reading['timestamp'] for reading in data['items']]
         sorted_timestamps = sorted(timestamps)
-        assert timestamps == sorted_timestamps
\ No newline at end of file
+        assert timestamps == sorted_timestamps
+
+@pytest.mark.django_db
+class TestReadingsBulk:
+    """Test bulk reading ingestion"""
+
+    def test_bulk_create_readings(self, authenticated_client, test_sensor):
+        """Test creating a batch of readings in one request"""
+        base_time = datetime(2024, 8, 1, 12, 0, 0)
+        payload = [
+            {
+                'temperature': 20.0 + i,
+                'humidity': 40.0 + i,
+                'timestamp': (base_time + timedelta(minutes=i)).isoformat()
+            }
+            for i in range(25)
+        ]
+
+        response = authenticated_client.post(
+            f'/api/sensors/{test_sensor.id}/readings/bulk/',
+            data=json.dumps(payload),
+            content_type='application/json'
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data['created'] == 25
+        assert data['conflicts'] == []
+        assert Reading.objects.filter(sensor=test_sensor).count() == 25
+
+    def test_bulk_create_reports_conflicts(self, authenticated_client, test_sensor):
+        """Test that duplicate timestamps are reported per row without failing the batch"""
+        base_time = datetime(2024, 8, 1, 12, 0, 0)
+        Reading.objects.create(
+            sensor=test_sensor,
+            temperature=10.0,
+            humidity=10.0,
+            timestamp=base_time
+        )
+        payload = [
+            {'temperature': 21.0, 'humidity': 41.0, 'timestamp': base_time.isoformat()},
+            {'temperature': 22.0, 'humidity': 42.0, 'timestamp': (base_time + timedelta(minutes=1)).isoformat()},
+            {'temperature': 23.0, 'humidity': 43.0, 'timestamp': (base_time + timedelta(minutes=1)).isoformat()},
+            {'temperature': 24.0, 'humidity': 44.0, 'timestamp': (base_time + timedelta(minutes=2)).isoformat()},
+        ]
+
+        response = authenticated_client.post(
+            f'/api/sensors/{test_sensor.id}/readings/bulk/',
+            data=json.dumps(payload),
+            content_type='application/json'
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data['created'] == 2
+        assert [conflict['index'] for conflict in data['conflicts']] == [0, 2]
+        assert Reading.objects.filter(sensor=test_sensor).count() == 3
+
+        # Existing reading must be left untouched
+        assert Reading.objects.get(sensor=test_sensor, timestamp=base_time).temperature == 10.0
+
+    @pytest.mark.skipif(connection.vendor != "postgresql", reason="Other backends admit one writer at a time")
+    def test_bulk_create_reports_concurrent_duplicates(self, authenticated_client, test_sensor):
+        """Test that rows a concurrent writer inserts after the lookup are conflicts, not created"""
+        base_time = datetime(2024, 8, 1, 12, 0, 0, tzinfo=timezone.utc)
+
+        def concurrent_insert(sensor_id, timestamps, using, lock=False):
+            Reading.objects.create(sensor=test_sensor, temperature=10.0, humidity=10.0, timestamp=base_time)
+            return set()
+
+        payload = [
+            {'temperature': 20.0 + i, 'humidity': 40.0, 'timestamp': (base_time + timedelta(minutes=i)).isoformat()}
+            for i in range(3)
+        ]
+        published = []
+        with patch("readings.api.compacted_timestamps", concurrent_insert), \
+                patch("readings.api.publish_readings", lambda events, using: published.extend(events)):
+            response = authenticated_client.post(
+                f'/api/sensors/{test_sensor.id}/readings/bulk/',
+                data=json.dumps(payload),
+                content_type='application/json'
+            )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data['created'] == 2
+        assert [conflict['index'] for conflict in data['conflicts']] == [0]
+        assert Reading.objects.get(sensor=test_sensor, timestamp=base_time).temperature == 10.0
+        assert len(published) == 2
+
+    def test_bulk_create_other_user_sensor(self, authenticated_client, another_user_sensor):
+        """Test bulk creating readings for another user's sensor"""
+        response = authenticated_client.post(
+            f'/api/sensors/{another_user_sensor.id}/readings/bulk/',
+            data=json.dumps([
+                {'temperature': 22.5, 'humidity': 45.2, 'timestamp': datetime.now().isoformat()}
+            ]),
+            content_type='application/json'
+        )
+
+        assert response.status_code == 404
+
+
+@pytest.mark.django_db
+class TestReadingsAggregate:
+    """Test server-side downsampling of readings"""
+
+    @pytest.fixture
+    def minute_readings(self, test_sensor):
+        """Two hours of minute readings with known values"""
+        base_time = datetime(2024, 8, 1, tzinfo=timezone.utc)
+        Reading.objects.bulk_create([
+            Reading(
+                sensor=test_sensor,
+                temperature=float(i),
+                humidity=100.0 - i,
+                timestamp=base_time + timedelta(minutes=i)
+            )
+            for i in range(120)
+        ])
+        # bulk_create bypasses the ingest paths that maintain rollups
+        refresh_rollups([test_sensor.id])
+        return base_time
+
+    def test_aggregate_fixed_bucket_width(self, authenticated_client, test_sensor, minute_readings):
+        """Test hourly buckets over minute data"""
+        response = authenticated_client.get(
+            f'/api/sensors/{test_sensor.id}/readings/aggregate/',
+            {'bucket_seconds': 3600}
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data) == 2
+        first, second = data
+        assert datetime.fromisoformat(first['bucket_start'].replace('Z', '+00:00')) == minute_readings
+        assert first['count'] == 60
+        assert first['temperature_min'] == 0.0
+        assert first['temperature_max'] == 59.0
+        assert first['temperature_avg'] == pytest.approx(29.5)
+        assert first['humidity_max'] == 100.0
+        assert second['count'] == 60
+        assert second['temperature_min'] == 60.0
+
+    def test_aggregate_target_points(self, authenticated_client, test_sensor, minute_readings):
+        """Test that the bucket width is derived from the requested number of points"""
+        response = authenticated_client.get(
+            f'/api/sensors/{test_sensor.id}/readings/aggregate/',
+            {
+                'timestamp_from': minute_readings.isoformat(),
+                'timestamp_to': (minute_readings + timedelta(minutes=119)).isoformat(),
+                'points': 12
+            }
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        # Buckets are epoch-aligned, so an unaligned range may add one bucket
+        assert len(data) <= 13
+        assert sum(bucket['count'] for bucket in data) == 120
+
+    def test_aggregate_no_readings(self, authenticated_client, test_sensor):
+        """Test aggregating a sensor without readings"""
+        response = authenticated_client.get(f'/api/sensors/{test_sensor.id}/readings/aggregate/')
+
+        assert response.status_code == 200
+        assert response.json() == []
+
+    def test_aggregate_other_user_sensor(self, authenticated_client, another_user_sensor):
+        """Test aggregating readings of another user's sensor"""
+        response = authenticated_client.get(f'/api/sensors/{another_user_sensor.id}/readings/aggregate/')
+
+        assert response.status_code == 404
+
+
+@pytest.mark.django_db
+class TestReadingsCursorPagination:
+    """Test keyset pagination of readings"""
+
+    def test_cursor_pagination_walks_all_pages(self, authenticated_client, test_sensor, test_readings):
+        """Test following next cursors returns every reading once, in order"""
+        url = f'/api/sensors/{test_sensor.id}/readings/cursor/?page_size=4'
+        timestamps = []
+        pages = 0
+
+        while url:
+            response = authenticated_client.get(url)
+            assert response.status_code == 200
+            data = response.json()
+            assert 'count' not in data
+            timestamps.extend(reading['timestamp'] for reading in data['results'])
+            url = data['next']
+            pages += 1
+
+        assert pages == 3
+        assert len(timestamps) == 10
+        assert timestamps == sorted(timestamps)
+        assert len(set(timestamps)) == 10
+
+    def test_cursor_pagination_time_filter(self, authenticated_client, test_sensor, test_readings):
+        """Test that time filters apply to cursor pagination"""
+        response = authenticated_client.get(
+            f'/api/sensors/{test_sensor.id}/readings/cursor/',
+            {'timestamp_from': test_readings[6].timestamp.isoformat()}
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data['results']) == 4
+        assert data['next'] is None
+
+    def test_cursor_pagination_other_user_sensor(self, authenticated_client, another_user_sensor):
+        """Test cursor listing readings for another user's sensor"""
+        response = authenticated_client.get(f'/api/sensors/{another_user_sensor.id}/readings/cursor/')
+
+        assert response.status_code == 404
+
+
+@pytest.mark.django_db
+class TestReadingsExport:
+    """Test streaming export of readings"""
+
+    def test_export_csv(self, authenticated_client, test_sensor, test_readings):
+        """Test exporting readings as CSV"""
+        response = authenticated_client.get(f'/api/sensors/{test_sensor.id}/readings/export/')
+
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        assert lines[0] == 'id,timestamp,temperature,humidity,sensor_id'
+        assert len(lines) == 11
+
+        timestamps = [line.split(',')[1] for line in lines[1:]]
+        assert timestamps == sorted(timestamps)
+
+    def test_export_ndjson_time_filter(self, authenticated_client, test_sensor, test_readings):
+        """Test exporting readings as NDJSON with time filters"""
+        response = authenticated_client.get(
+            f'/api/sensors/{test_sensor.id}/readings/export/',
+            {'format': 'ndjson', 'timestamp_from': test_readings[5].timestamp.isoformat()}
+        )
+
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'application/x-ndjson'
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        assert len(rows) == 5
+        assert rows[0]['id'] == test_readings[5].id
+        assert rows[0]['sensor_id'] == test_sensor.id
+
+    def test_export_other_user_sensor(self, authenticated_client, another_user_sensor):
+        """Test exporting readings of another user's sensor"""
+        response = authenticated_client.get(f'/api/sensors/{another_user_sensor.id}/readings/export/')
+
+        assert response.status_code == 404
+
+
+@pytest.mark.django_db
+class TestReadingsAsync:
+    """Test the async ingest and list routes"""
+
+    def test_create_reading_async(self, authenticated_client, test_sensor):
+        """Test creating a reading through the async route"""
+        response = authenticated_client.post(
+            f'/api/sensors/{test_sensor.id}/readings/async/',
+            data=json.dumps({
+                'temperature': 21.5,
+                'humidity': 40.0,
+                'timestamp': datetime.now().isoformat()
+            }),
+            content_type='application/json'
+        )
+
+        assert response.status_code == 200
+        assert response.json()['sensor_id'] == test_sensor.id
+        assert Reading.objects.filter(sensor=test_sensor, temperature=21.5).exists()
+
+    def test_list_readings_async(self, authenticated_client, test_sensor, test_readings):
+        """Test listing readings through the async route matches the sync one"""
+        url = f'/api/sensors/{test_sensor.id}/readings/'
+        sync_data = authenticated_client.get(url).json()
+        response = authenticated_client.get(url + 'async/')
+
+        assert response.status_code == 200
+        assert response.json() == sync_data
+        assert response.json()['count'] == 10
+
+    def test_async_routes_other_user_sensor(self, authenticated_client, another_user_sensor):
+        """Test the async routes hide another user's sensor"""
+        url = f'/api/sensors/{another_user_sensor.id}/readings/async/'
+
+        assert authenticated_client.get(url).status_code == 404
+        response = authenticated_client.post(
+            url,
+            data=json.dumps({'temperature': 20.0, 'humidity': 50.0, 'timestamp': datetime.now().isoformat()}),
+            content_type='application/json'
+        )
+        assert response.status_code == 404
+
+
+@pytest.mark.django_db
+class TestReadingsBatch:
+    """Test the multi-sensor batch query"""
+
+    @pytest.fixture
+    def sensors(self, test_user, test_sensor, test_readings):
+        second = Sensor.objects.create(owner=test_user, name='Second Sensor', model='TestModel')
+        base_time = datetime(2024, 8, 1, tzinfo=timezone.utc)
+        Reading.objects.bulk_create(
+            Reading(sensor=second, temperature=30.0, humidity=30.0, timestamp=base_time + timedelta(minutes=i))
+            for i in range(3)
+        )
+        empty = Sensor.objects.create(owner=test_user, name='Empty Sensor', model='TestModel')
+        return [second, test_sensor, empty]
+
+    def test_batch_raw_series(self, authenticated_client, sensors):
+        """Test raw series per sensor, in request order, from a fixed number of queries"""
+        ids = [sensor.id for sensor in sensors]
+        with CaptureQueriesContext(connection) as ctx:
+            response = authenticated_client.get('/api/readings/batch/', {'sensor_id': ids})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [series['sensor_id'] for series in data] == ids
+        assert [len(series['readings']) for series in data] == [3, 10, 0]
+        timestamps = [reading['timestamp'] for reading in data[1]['readings']]
+        assert timestamps == sorted(timestamps)
+        assert len(ctx.captured_queries) <= 3
+
+    def test_batch_time_window_and_buckets(self, authenticated_client, sensors):
+        """Test bucketed series over a time window"""
+        response = authenticated_client.get('/api/readings/batch/', {
+            'sensor_id': [sensors[0].id],
+            'timestamp_from': '2024-08-01T00:01:00Z',
+            'bucket_seconds': 3600,
+        })
+
+        assert response.status_code == 200
+        series = response.json()[0]
+        assert series['readings'] is None
+        assert len(series['buckets']) == 1
+        assert series['buckets'][0]['count'] == 2
+        assert series['buckets'][0]['temperature_avg'] == 30.0
+
+    def test_batch_other_user_sensor(self, authenticated_client, test_sensor, another_user_sensor):
+        """Test any sensor of another user fails the whole request"""
+        response = authenticated_client.get(
+            '/api/readings/batch/', {'sensor_id': [test_sensor.id, another_user_sensor.id]}
+        )
+
+        assert response.status_code == 404
+
+    def test_batch_too_many_sensors(self, authenticated_client):
+        """Test the sensor limit"""
+        response = authenticated_client.get('/api/readings/batch/', {'sensor_id': list(range(1, 102))})
+
+        assert response.status_code == 400
@@ -0,0 +1,149 @@
+# test_replicas.py
+import json
+import pytest
+from datetime import datetime, timedelta, timezone
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connections, router
+from django.test import AsyncClient
+from django.test.utils import CaptureQueriesContext
+from io import StringIO
+from mysite.routers import ReadReplicaRouter
+from readings.models import Reading
+from users.authentication import tokens_for_user
+
+BASE = datetime(2024, 7, 1, tzinfo=timezone.utc)
+
+# The "replica" alias mirrors the test database (see conftest), so reads routed
+# to it see committed data; transactional tests make sure it is committed.
+replica_db = pytest.mark.django_db(transaction=True, databases=['default', 'replica'])
+
+
+@pytest.fixture(autouse=True)
+def replicas(settings):
+    settings.READ_REPLICAS = {'ALIASES': ['replica'], 'STICKY_SECONDS': 5}
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def add_readings(sensor, count=3):
+    for minute in range(count):
+        Reading.objects.create(sensor=sensor, timestamp=BASE + timedelta(minutes=minute), temperature=20.0, humidity=50.0)
+
+
+def queries_by_alias(callable_):
+    """Run ``callable_``; returns (its result, {alias: number of queries})"""
+    with CaptureQueriesContext(connections['default']) as primary, CaptureQueriesContext(connections['replica']) as replica:
+        result = callable_()
+    return result, {'default': len(primary.captured_queries), 'replica': len(replica.captured_queries)}
+
+
+@replica_db
+class TestReplicaRouting:
+    """Test read-heavy routes read from the replica and everything else from the primary"""
+
+    @pytest.mark.parametrize('suffix', ['', 'cursor/', 'aggregate/?bucket_seconds=3600', 'export/'])
+    def test_read_routes_use_replica(self, authenticated_client, test_sensor, suffix):
+        """Test the readings read routes, validators and serialization included, query the replica"""
+        add_readings(test_sensor)
+        url = f'/api/sensors/{test_sensor.id}/readings/{suffix}'
+
+        def get():
+            response = authenticated_client.get(url)
+            # Exports stream their rows after the view returns
+            return response, b''.join(response.streaming_content) if response.streaming else response.content
+
+        (response, content), queries = queries_by_alias(get)
+
+        assert response.status_code == 200
+        assert content
+        assert queries['replica'] > 0
+        assert queries['default'] == 0
+
+    def test_list_sensors_uses_replica(self, authenticated_client, test_sensor):
+        """Test the sensor list reads from the replica"""
+        response, queries = queries_by_alias(lambda: authenticated_client.get('/api/sensors/?include_latest=true'))
+
+        assert response.json()['items'][0]['name'] == test_sensor.name
+        assert queries['replica'] > 0
+        assert queries['default'] == 0
+
+    def test_async_route_uses_replica(self, test_user, test_sensor):
+        """Test async routes route their thread-side queries too"""
+        add_readings(test_sensor)
+        token = str(tokens_for_user(test_user).access_token)
+
+        response, queries = queries_by_alias(lambda: async_to_sync(AsyncClient().get)(
+            f'/api/sensors/{test_sensor.id}/readings/async/',
+            headers={'Authorization': f'Bearer {token}'},
+        ))
+
+        assert len(response.json()['items']) == 3
+        assert queries['replica'] > 0
+
+    def test_read_your_writes(self, authenticated_client, test_sensor):
+        """Test a user's reads stick to the primary after they write"""
+        url = f'/api/sensors/{test_sensor.id}/readings/'
+        payload = {'temperature': 21.0, 'humidity': 40.0, 'timestamp': BASE.isoformat()}
+
+        response, queries = queries_by_alias(
+            lambda: authenticated_client.post(url, data=json.dumps(payload), content_type='application/json')
+        )
+        assert response.status_code == 200
+        assert queries['replica'] == 0
+
+        response, queries = queries_by_alias(lambda: authenticated_client.get(url))
+        assert len(response.json()['items']) == 1
+        assert queries['replica'] == 0
+
+    def test_replica_down_falls_back_to_primary(self, authenticated_client, test_sensor, monkeypatch):
+        """Test reads go to the primary while the replica is unreachable, without retrying every request"""
+        attempts = []
+
+        def refuse():
+            attempts.append(1)
+            raise OperationalError('connection refused')
+
+        monkeypatch.setattr(connections['replica'], 'ensure_connection', refuse)
+        for _ in range(2):
+            with CaptureQueriesContext(connections['default']) as primary:
+                response = authenticated_client.get('/api/sensors/')
+            assert response.status_code == 200
+            assert len(primary.captured_queries) > 0
+        assert len(attempts) == 1
+
+    def test_commands_use_primary(self, tmp_path, test_user):
+        """Test seed_data and other code outside replica routes reads from the primary"""
+        path = tmp_path / 'readings.csv'
+        path.write_text(f'device_id,timestamp,temperature,humidity\ndevice-001,{BASE.isoformat()},20.5,41\n')
+
+        _, queries = queries_by_alias(lambda: call_command('seed_data', csv=str(path), username='replicaseed', fast=True, stdout=StringIO()))
+
+        assert queries['replica'] == 0
+        assert router.db_for_read(Reading) == 'default'
+
+
+class TestReadReplicaRouter:
+    """Test the router's write, relation and migration rules"""
+
+    def test_writes_go_to_primary(self):
+        """Test objects read from a replica are saved to the primary"""
+        reading = Reading()
+        reading._state.db = 'replica'
+
+        assert ReadReplicaRouter().db_for_write(Reading, instance=reading) == 'default'
+
+    def test_shard_writes_stay_on_shard(self):
+        """Test objects read from another database, e.g. a reading shard, are left where they came from"""
+        reading = Reading()
+        reading._state.db = 'shard1'
+
+        assert ReadReplicaRouter().db_for_write(Reading, instance=reading) is None
+        assert router.db_for_write(Reading, instance=reading) == 'shard1'
+
+    def test_replicas_are_not_migrated(self):
+        """Test migrations only run on the primary"""
+        assert ReadReplicaRouter().allow_migrate('replica', 'readings') is False
+        assert ReadReplicaRouter().allow_migrate('default', 'readings') is None
@@ -0,0 +1,124 @@
+# test_rollups.py
+import pytest
+import json
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+from unittest.mock import patch
+from django.core.management import call_command
+from django.db.models.query import QuerySet
+from readings.models import DailyReadingRollup, HourlyReadingRollup, LatestReading, Reading
+from readings.snapshots import refresh_snapshots
+
+BASE_TIME = datetime(2024, 8, 1, tzinfo=timezone.utc)
+
+def post_reading(client, sensor, temperature, humidity, timestamp):
+    return client.post(
+        f'/api/sensors/{sensor.id}/readings/',
+        data=json.dumps({'temperature': temperature, 'humidity': humidity, 'timestamp': timestamp.isoformat()}),
+        content_type='application/json'
+    )
+
+@pytest.mark.django_db
+class TestReadingRollups:
+    """Test incremental maintenance and use of hourly/daily rollups"""
+
+    def test_create_reading_updates_rollups(self, authenticated_client, test_sensor):
+        """Test that single readings are folded into their hourly and daily buckets"""
+        post_reading(authenticated_client, test_sensor, 20.0, 40.0, BASE_TIME + timedelta(minutes=5))
+        post_reading(authenticated_client, test_sensor, 24.0, 30.0, BASE_TIME + timedelta(minutes=10))
+        post_reading(authenticated_client, test_sensor, 10.0, 90.0, BASE_TIME + timedelta(hours=2))
+
+        hourly = HourlyReadingRollup.objects.get(sensor=test_sensor, bucket_start=BASE_TIME)
+        assert hourly.count == 2
+        assert hourly.temperature_min == 20.0
+        assert hourly.temperature_max == 24.0
+        assert hourly.temperature_sum == 44.0
+        assert hourly.humidity_min == 30.0
+
+        daily = DailyReadingRollup.objects.get(sensor=test_sensor, bucket_start=BASE_TIME)
+        assert daily.count == 3
+        assert daily.temperature_min == 10.0
+        assert daily.humidity_max == 90.0
+
+    def test_bulk_create_refreshes_rollups(self, authenticated_client, test_sensor):
+        """Test that bulk ingestion leaves rollups consistent with the raw readings"""
+        payload = [
+            {'temperature': float(i), 'humidity': 50.0, 'timestamp': (BASE_TIME + timedelta(minutes=i)).isoformat()}
+            for i in range(90)
+        ]
+        authenticated_client.post(
+            f'/api/sensors/{test_sensor.id}/readings/bulk/',
+            data=json.dumps(payload),
+            content_type='application/json'
+        )
+
+        counts = list(HourlyReadingRollup.objects.filter(sensor=test_sensor).order_by('bucket_start').values_list('count', flat=True))
+        assert counts == [60, 30]
+        assert DailyReadingRollup.objects.get(sensor=test_sensor).count == 90
+
+    def test_refresh_snapshots_loses_create_race(self, authenticated_client, test_sensor):
+        """Test that a snapshot created concurrently is updated instead of failing the refresh"""
+        post_reading(authenticated_client, test_sensor, 20.0, 40.0, BASE_TIME)
+        LatestReading.objects.filter(sensor=test_sensor).delete()
+        original_update = QuerySet.update
+
+        def concurrent_create(queryset, **kwargs):
+            if queryset.model is LatestReading and not LatestReading.objects.filter(sensor=test_sensor).exists():
+                # Another writer creates the snapshot between our UPDATE and INSERT
+                LatestReading.objects.create(
+                    sensor=test_sensor, reading_id=0, count=0, timestamp=BASE_TIME,
+                    temperature=0.0, humidity=0.0, updated_at=BASE_TIME
+                )
+                return 0
+            return original_update(queryset, **kwargs)
+
+        with patch.object(QuerySet, "update", concurrent_create):
+            refresh_snapshots([test_sensor.id])
+
+        snapshot = LatestReading.objects.get(sensor=test_sensor)
+        assert snapshot.count == 1
+        assert snapshot.temperature == 20.0
+
+    def test_aggregate_served_from_rollups(self, authenticated_client, test_sensor):
+        """Test that hour-multiple buckets come from rollups, and the refresh command rebuilds them"""
+        for i in range(3):
+            post_reading(authenticated_client, test_sensor, 20.0, 50.0, BASE_TIME + timedelta(hours=i))
+
+        # Change raw data behind the rollups' back
+        Reading.objects.filter(sensor=test_sensor).update(temperature=30.0)
+
+        url = f'/api/sensors/{test_sensor.id}/readings/aggregate/'
+        params = {'bucket_seconds': 7200, 'timestamp_from': BASE_TIME.isoformat()}
+        stale = authenticated_client.get(url, params).json()
+        assert [bucket['temperature_avg'] for bucket in stale] == [20.0, 20.0]
+
+        call_command('refresh_reading_rollups', '--sensor', str(test_sensor.id), stdout=StringIO())
+
+        fresh = authenticated_client.get(url, params).json()
+        assert [bucket['count'] for bucket in fresh] == [2, 1]
+        assert [bucket['temperature_avg'] for bucket in fresh] == [30.0, 30.0]
+
+    def test_aggregate_inclusive_upper_bound_uses_raw(self, authenticated_client, test_sensor):
+        """Test that a reading exactly on timestamp_to is still counted"""
+        for i in range(3):
+            post_reading(authenticated_client, test_sensor, 20.0, 50.0, BASE_TIME + timedelta(hours=i))
+
+        response = authenticated_client.get(
+            f'/api/sensors/{test_sensor.id}/readings/aggregate/',
+            {
+                'bucket_seconds': 3600,
+                'timestamp_from': BASE_TIME.isoformat(),
+                'timestamp_to': (BASE_TIME + timedelta(hours=2)).isoformat(),
+            }
+        )
+
+        assert sum(bucket['count'] for bucket in response.json()) == 3
+
+    def test_sensor_delete_removes_rollups(self, authenticated_client, test_sensor):
+        """Test that rollups go away with their sensor"""
+        post_reading(authenticated_client, test_sensor, 20.0, 50.0, BASE_TIME)
+
+        authenticated_client.delete(f'/api/sensors/{test_sensor.id}/')
+
+        assert not HourlyReadingRollup.objects.filter(sensor_id=test_sensor.id).exists()
+        assert not DailyReadingRollup.objects.filter(sensor_id=test_sensor.id).exists()
@@ -0,0 +1,48 @@
+# test_seed_data.py
+import pytest
+from io import StringIO
+from django.core.management import call_command
+from readings.models import Reading
+from sensors.models import Sensor
+
+CSV_CONTENT = """timestamp,device_id,temperature,humidity
+2024-08-01 00:00:00+00:00,device-001,23.75,45.29
+2024-08-01 00:01:00+00:00,device-001,23.46,46.46
+2024-08-01 00:00:00+00:00,device-002,19.10,55.00
+2024-08-01 00:02:00+00:00,device-999,20.00,50.00
+not-a-timestamp,device-001,20.00,50.00
+"""
+
+@pytest.fixture
+def seed_csv(tmp_path):
+    path = tmp_path / "readings.csv"
+    path.write_text(CSV_CONTENT)
+    return path
+
+@pytest.mark.django_db
+class TestSeedData:
+    """Test the seed_data management command"""
+
+    @pytest.mark.parametrize("fast", [False, True])
+    def test_seed_readings(self, seed_csv, fast):
+        """Test seeding readings with the row-by-row and the batched loader"""
+        out = StringIO()
+        args = ["--csv", str(seed_csv)] + (["--fast", "--batch-size", "2"] if fast else [])
+        call_command("seed_data", *args, stdout=out)
+
+        assert Sensor.objects.filter(owner__username="testuser").count() == 5
+        assert Reading.objects.count() == 3
+        output = out.getvalue()
+        assert "Seeded 3 readings" in output
+        assert "Skipped 2 invalid rows" in output
+        assert "rows/sec" in output
+
+    def test_seed_fast_updates_existing(self, seed_csv):
+        """Test that re-seeding in fast mode updates readings instead of duplicating them"""
+        call_command("seed_data", "--csv", str(seed_csv), "--fast", stdout=StringIO())
+        Reading.objects.update(temperature=0.0)
+
+        call_command("seed_data", "--csv", str(seed_csv), "--fast", stdout=StringIO())
+
+        assert Reading.objects.count() == 3
+        assert not Reading.objects.filter(temperature=0.0).exists()
@@ -0,0 +1,158 @@
+# test_sensor_deletion.py
+import json
+import time
+import pytest
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+from unittest.mock import patch
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from readings.cold import compact_day
+from readings.loader import upsert_readings
+from readings.models import DailyReadingRollup, HourlyReadingRollup, LatestReading, Reading, ReadingChunk
+from sensors.deletion import purge_sensor, schedule_deletion
+from sensors.models import Sensor, SensorDeletion
+
+BASE = datetime(2024, 10, 1, tzinfo=timezone.utc)
+
+
+def add_readings(sensor, count, start=BASE):
+    upsert_readings([(sensor.id, start + timedelta(minutes=minute), 20.0, 50.0) for minute in range(count)])
+
+
+def assert_purged(sensor):
+    assert not Sensor.objects.filter(id=sensor.id).exists()
+    for model in (Reading, ReadingChunk, HourlyReadingRollup, DailyReadingRollup, LatestReading):
+        assert not model.objects.filter(sensor_id=sensor.id).exists()
+
+
+@pytest.mark.django_db
+class TestDeleteSensor:
+    """Test immediate deletes stay set-based"""
+
+    def delete_queries(self, client, sensor):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.delete(f'/api/sensors/{sensor.id}/')
+        assert response.status_code == 204
+        return [query['sql'] for query in queries.captured_queries]
+
+    def test_query_count_independent_of_readings(self, authenticated_client, test_user):
+        """Test deleting a sensor costs the same statements whatever its history"""
+        small = Sensor.objects.create(owner=test_user, name='small', model='M')
+        large = Sensor.objects.create(owner=test_user, name='large', model='M')
+        add_readings(small, 2)
+        add_readings(large, 500)
+
+        small_queries = self.delete_queries(authenticated_client, small)
+        large_queries = self.delete_queries(authenticated_client, large)
+
+        assert len(large_queries) == len(small_queries)
+        assert not any(query.startswith('SELECT') and 'readings_reading' in query for query in large_queries)
+        assert_purged(large)
+
+
+@pytest.mark.django_db
+class TestBackgroundDeletion:
+    """Test ?background=true deletions"""
+
+    @pytest.fixture(autouse=True)
+    def no_worker(self, settings):
+        settings.SENSOR_DELETION = {'BATCH_SIZE': 100, 'BACKGROUND': False}
+
+    def schedule(self, client, sensor):
+        response = client.delete(f'/api/sensors/{sensor.id}/?background=true')
+        assert response.status_code == 202
+        return response.json()
+
+    def test_hides_sensor_immediately(self, authenticated_client, test_sensor):
+        """Test the sensor vanishes from the API before its readings are purged"""
+        add_readings(test_sensor, 5)
+
+        job = self.schedule(authenticated_client, test_sensor)
+
+        assert job['status'] == 'pending'
+        assert job['readings_total'] == 5
+        assert job['progress'] == 0.0
+        assert authenticated_client.get(f'/api/sensors/{test_sensor.id}/').status_code == 404
+        assert authenticated_client.get(f'/api/sensors/{test_sensor.id}/readings/').status_code == 404
+        assert authenticated_client.get('/api/sensors/').json()['count'] == 0
+        assert authenticated_client.delete(f'/api/sensors/{test_sensor.id}/').status_code == 404
+        assert Reading.objects.filter(sensor_id=test_sensor.id).count() == 5
+
+    def test_concurrent_update_keeps_sensor_hidden(self, authenticated_client, test_sensor):
+        """Test an edit racing a background deletion does not bring the sensor back"""
+        def fetch_then_hide(queryset, **lookups):
+            sensor = queryset.get(**lookups)
+            schedule_deletion(Sensor.objects.get(id=sensor.id))
+            return sensor
+
+        with patch('sensors.api.get_object_or_404', fetch_then_hide):
+            response = authenticated_client.put(
+                f'/api/sensors/{test_sensor.id}/',
+                data=json.dumps({'name': 'Renamed', 'model': 'M2'}),
+                content_type='application/json'
+            )
+
+        assert response.status_code == 200
+        test_sensor.refresh_from_db()
+        assert test_sensor.name == 'Renamed'
+        assert test_sensor.deleted_at is not None
+
+    def test_purge_in_batches(self, authenticated_client, test_sensor):
+        """Test the purge deletes raw and compacted readings batch by batch, reporting progress"""
+        add_readings(test_sensor, 7, start=BASE - timedelta(days=1))
+        add_readings(test_sensor, 5)
+        compact_day(test_sensor.id, (BASE - timedelta(days=1)).date())
+        job = self.schedule(authenticated_client, test_sensor)
+
+        with CaptureQueriesContext(connection) as queries:
+            purge_sensor(SensorDeletion.objects.get(id=job['id']), batch_size=2)
+
+        raw_deletes = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('DELETE FROM "readings_reading"')]
+        assert len(raw_deletes) >= 3
+        assert_purged(test_sensor)
+        progress = authenticated_client.get(f"/api/sensors/deletions/{job['id']}/").json()
+        assert progress['status'] == 'done'
+        assert progress['readings_deleted'] == 12
+        assert progress['progress'] == 1.0
+        assert progress['finished_at'] is not None
+
+    def test_command_resumes_jobs(self, authenticated_client, test_sensor):
+        """Test purge_deleted_sensors runs unfinished jobs, including interrupted ones"""
+        add_readings(test_sensor, 3)
+        job = self.schedule(authenticated_client, test_sensor)
+        SensorDeletion.objects.filter(id=job['id']).update(status=SensorDeletion.RUNNING)
+
+        out = StringIO()
+        call_command('purge_deleted_sensors', '--batch-size', '2', stdout=out)
+
+        assert 'deleted 3 readings' in out.getvalue()
+        assert SensorDeletion.objects.get(id=job['id']).status == SensorDeletion.DONE
+        assert_purged(test_sensor)
+        call_command('purge_deleted_sensors', stdout=out)
+        assert 'No sensor deletions to run' in out.getvalue()
+
+    def test_other_users_job(self, authenticated_client, another_user_sensor):
+        """Test deletion jobs are only visible to the sensor's owner"""
+        from sensors.deletion import schedule_deletion
+        deletion = schedule_deletion(another_user_sensor)
+
+        assert authenticated_client.get(f'/api/sensors/deletions/{deletion.id}/').status_code == 404
+
+
+@pytest.mark.django_db(transaction=True)
+def test_worker_thread_purges(authenticated_client, test_sensor, settings):
+    """Test scheduled deletions run on the background worker once committed"""
+    settings.SENSOR_DELETION = {'BATCH_SIZE': 2, 'BACKGROUND': True}
+    add_readings(test_sensor, 5)
+
+    job = authenticated_client.delete(f'/api/sensors/{test_sensor.id}/?background=true').json()
+
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        if SensorDeletion.objects.get(id=job['id']).status == SensorDeletion.DONE:
+            break
+        time.sleep(0.05)
+    assert SensorDeletion.objects.get(id=job['id']).readings_deleted == 5
+    assert_purged(test_sensor)
@@ -1,6 +1,11 @@
 # test_sensors.py
 import pytest
 import json
+from datetime import datetime, timedelta, timezone
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from readings.cold import compact_day
+from readings.loader import upsert_readings
 from sensors.models import Sensor
 
 @pytest.mark.django_db
@@ -103,6 +108,39 @@ class TestSensorCRUD:
         assert response.status_code == 200
         data = response.json()
         assert len(data['items']) == 2  # DHT22 and DHT11
+
+    def test_list_sensors_search_description(self, authenticated_client, test_user):
+        """Test that search covers descriptions and needs every word to match"""
+        Sensor.objects.create(owner=test_user, name='Node A', model='DHT22', description='Greenhouse north wall')
+        Sensor.objects.create(owner=test_user, name='Node B', model='DHT22', description='Greenhouse south wall')
+
+        response = authenticated_client.get('/api/sensors/?q=greenhouse')
+        assert [item['name'] for item in response.json()['items']] == ['Node A', 'Node B']
+
+        response = authenticated_client.get('/api/sensors/?q=north greenhouse')
+        assert [item['name'] for item in response.json()['items']] == ['Node A']
+
+    def test_list_sensors_search_ranking(self, authenticated_client, test_user):
+        """Test that name matches rank above model and description matches"""
+        Sensor.objects.create(owner=test_user, name='Hallway', model='BME280', description='Next to the kitchen')
+        Sensor.objects.create(owner=test_user, name='Attic', model='Kitchen-X1')
+        Sensor.objects.create(owner=test_user, name='Kitchen', model='DHT22')
+
+        response = authenticated_client.get('/api/sensors/?q=kitch')
+
+        assert response.status_code == 200
+        assert [item['name'] for item in response.json()['items']] == ['Kitchen', 'Attic', 'Hallway']
+
+    @pytest.mark.skipif(connection.vendor != "postgresql", reason="Search index requires PostgreSQL")
+    def test_list_sensors_search_uses_index(self, test_user):
+        """Test that the search predicate is served by the GIN index"""
+        from sensors.search import search_sensors
+
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        plan = search_sensors(Sensor.objects.all(), 'dht').explain()
+
+        assert 'sensors_sensor_search' in plan
     
     def test_get_sensor_detail(self, authenticated_client, test_sensor):
         """Test getting sensor details"""
@@ -190,4 +228,104 @@ class TestSensorCRUD:
         
         # Verify readings were also deleted
         from readings.models import Reading
-        assert Reading.objects.filter(sensor_id=test_sensor.id).count() == 0
\ No newline at end of file
+        assert Reading.objects.filter(sensor_id=test_sensor.id).count() == 0
+
+
+@pytest.mark.django_db
+class TestSensorLatestReading:
+    """Test the latest-reading snapshot in the sensor listing"""
+
+    BASE = datetime(2024, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+    def post_reading(self, client, sensor, minutes, temperature=20.0):
+        response = client.post(
+            f'/api/sensors/{sensor.id}/readings/',
+            data=json.dumps({
+                'temperature': temperature,
+                'humidity': 50.0,
+                'timestamp': (self.BASE + timedelta(minutes=minutes)).isoformat()
+            }),
+            content_type='application/json'
+        )
+        assert response.status_code == 200
+        return response.json()
+
+    def listed(self, client, sensor):
+        response = client.get('/api/sensors/?include_latest=true')
+        assert response.status_code == 200
+        return next(item for item in response.json()['items'] if item['id'] == sensor.id)
+
+    def test_snapshot_follows_single_ingest(self, authenticated_client, test_sensor):
+        """Test that newer readings replace the latest one and older ones only count"""
+        self.post_reading(authenticated_client, test_sensor, 0, temperature=20.0)
+        newest = self.post_reading(authenticated_client, test_sensor, 10, temperature=25.0)
+        self.post_reading(authenticated_client, test_sensor, 5, temperature=30.0)
+
+        item = self.listed(authenticated_client, test_sensor)
+        assert item['reading_count'] == 3
+        assert item['latest_reading']['id'] == newest['id']
+        assert item['latest_reading']['temperature'] == 25.0
+
+    def test_snapshot_follows_batch_writes(self, authenticated_client, test_sensor):
+        """Test that bulk ingest and upserts refresh the snapshot"""
+        response = authenticated_client.post(
+            f'/api/sensors/{test_sensor.id}/readings/bulk/',
+            data=json.dumps([
+                {'temperature': 20.0 + i, 'humidity': 50.0, 'timestamp': (self.BASE + timedelta(minutes=i)).isoformat()}
+                for i in range(5)
+            ]),
+            content_type='application/json'
+        )
+        assert response.status_code == 200
+        item = self.listed(authenticated_client, test_sensor)
+        assert item['reading_count'] == 5
+        assert item['latest_reading']['temperature'] == 24.0
+
+        # Overwrites the latest reading and adds one older reading
+        upsert_readings([
+            (test_sensor.id, self.BASE + timedelta(minutes=4), 99.0, 50.0),
+            (test_sensor.id, self.BASE - timedelta(minutes=1), 10.0, 50.0),
+        ])
+        item = self.listed(authenticated_client, test_sensor)
+        assert item['reading_count'] == 6
+        assert item['latest_reading']['temperature'] == 99.0
+
+    def test_snapshot_survives_compaction(self, authenticated_client, test_sensor):
+        """Test that the latest reading is still reported once compacted"""
+        latest = self.post_reading(authenticated_client, test_sensor, 0)
+        compact_day(test_sensor.id, self.BASE.date())
+
+        item = self.listed(authenticated_client, test_sensor)
+        assert item['reading_count'] == 1
+        assert item['latest_reading']['id'] == latest['id']
+
+    def test_sensor_without_readings(self, authenticated_client, test_sensor):
+        """Test that a sensor without readings reports none"""
+        item = self.listed(authenticated_client, test_sensor)
+        assert item['latest_reading'] is None
+        assert item['reading_count'] == 0
+
+    def test_snapshot_omitted_by_default(self, authenticated_client, test_sensor):
+        """Test that the plain listing leaves the snapshot fields empty"""
+        self.post_reading(authenticated_client, test_sensor, 0)
+
+        response = authenticated_client.get('/api/sensors/')
+        item = response.json()['items'][0]
+        assert item['latest_reading'] is None
+        assert item['reading_count'] is None
+
+    def test_listing_query_count(self, authenticated_client, test_user, test_sensor):
+        """Test that the listing with snapshots costs the same queries for any page size"""
+        for i in range(8):
+            sensor = Sensor.objects.create(owner=test_user, name=f'Sensor {i}', model='DHT22')
+            self.post_reading(authenticated_client, sensor, i)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = authenticated_client.get('/api/sensors/?include_latest=true&page_size=2')
+        assert response.status_code == 200
+        few = len(ctx.captured_queries)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = authenticated_client.get('/api/sensors/?include_latest=true&page_size=9')
+        assert len(response.json()['items']) == 9
+        assert len(ctx.captured_queries) == few
@@ -0,0 +1,257 @@
+# test_sharding.py
+import json
+import pytest
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+from unittest.mock import patch
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from readings.cold import compact_day
+from readings.loader import upsert_readings
+from readings.models import HourlyReadingRollup, LatestReading, Reading, ReadingChunk
+from readings.sharding import HashRing, place_sensor, ring_shard, sensors_by_shard, shard_for_sensor
+from sensors.models import Sensor
+
+BASE = datetime(2024, 8, 1, tzinfo=timezone.utc)
+
+# "shard1" is a second test database (see conftest)
+sharded_db = pytest.mark.django_db(databases=['default', 'shard1'])
+
+
+@pytest.fixture
+def shards(settings):
+    settings.READINGS_SHARDS = {'SHARDS': ['default', 'shard1'], 'CACHE_TTL': 60}
+
+
+def move(sensor, shard):
+    """Place ``sensor`` on ``shard`` without moving its readings"""
+    place_sensor(sensor.id, shard)
+    sensor.readings_shard = shard
+    return sensor
+
+
+def add_readings(sensor, count=3, using='default', start=BASE):
+    for minute in range(count):
+        Reading.objects.using(using).create(
+            sensor_id=sensor.id, timestamp=start + timedelta(minutes=minute), temperature=20.0 + minute, humidity=50.0
+        )
+
+
+class TestHashRing:
+    """Test the consistent-hash ring"""
+
+    def test_spreads_keys(self):
+        """Test every node gets a fair share of the keys"""
+        ring = HashRing(['a', 'b', 'c'], vnodes=64)
+        counts = {}
+        for key in range(3000):
+            node = ring.node_for(key)
+            counts[node] = counts.get(node, 0) + 1
+
+        assert set(counts) == {'a', 'b', 'c'}
+        assert min(counts.values()) > 600
+
+    def test_adding_a_node_only_moves_keys_to_it(self):
+        """Test a new node takes keys from the others without reshuffling the rest"""
+        before = HashRing(['a', 'b', 'c'], vnodes=64)
+        after = HashRing(['a', 'b', 'c', 'd'], vnodes=64)
+        moved = [key for key in range(3000) if before.node_for(key) != after.node_for(key)]
+
+        assert all(after.node_for(key) == 'd' for key in moved)
+        assert 400 < len(moved) < 1200
+
+    def test_needs_nodes(self):
+        """Test an empty ring is rejected"""
+        with pytest.raises(ValueError):
+            HashRing([], vnodes=64)
+
+
+@sharded_db
+class TestShardRouting:
+    """Test readings are written to and read from their sensor's shard"""
+
+    def test_disabled_by_default(self, test_sensor, django_assert_num_queries):
+        """Test placements are not looked up while only the primary holds readings"""
+        with django_assert_num_queries(0):
+            assert shard_for_sensor(test_sensor.id) == 'default'
+            assert sensors_by_shard([test_sensor.id]) == {'default': [test_sensor.id]}
+
+    def test_new_sensors_placed_by_ring(self, shards, test_user):
+        """Test sensors created while sharding is on land where the ring puts them"""
+        sensors = [Sensor.objects.create(owner=test_user, name=f's{i}', model='M') for i in range(10)]
+
+        for sensor in sensors:
+            sensor.refresh_from_db()
+            assert sensor.readings_shard == ring_shard(sensor.id)
+        assert {sensor.readings_shard for sensor in sensors} == {'default', 'shard1'}
+
+    def test_create_reading_on_shard(self, shards, authenticated_client, test_sensor):
+        """Test ingest writes the reading, its rollups and snapshot to the sensor's shard"""
+        move(test_sensor, 'shard1')
+        response = authenticated_client.post(
+            f'/api/sensors/{test_sensor.id}/readings/',
+            data=json.dumps({'temperature': 21.0, 'humidity': 40.0, 'timestamp': BASE.isoformat()}),
+            content_type='application/json',
+        )
+
+        assert response.status_code == 200
+        assert not Reading.objects.using('default').filter(sensor_id=test_sensor.id).exists()
+        assert Reading.objects.using('shard1').filter(sensor_id=test_sensor.id).count() == 1
+        assert HourlyReadingRollup.objects.using('shard1').get(sensor_id=test_sensor.id).count == 1
+        assert LatestReading.objects.using('shard1').get(sensor_id=test_sensor.id).count == 1
+
+    def test_read_routes_use_shard(self, shards, authenticated_client, test_sensor):
+        """Test list, aggregate and conditional requests read the sensor's shard"""
+        move(test_sensor, 'shard1')
+        authenticated_client.post(
+            f'/api/sensors/{test_sensor.id}/readings/bulk/',
+            data=json.dumps([
+                {'temperature': 20.0 + i, 'humidity': 50.0, 'timestamp': (BASE + timedelta(minutes=i)).isoformat()}
+                for i in range(3)
+            ]),
+            content_type='application/json',
+        )
+        url = f'/api/sensors/{test_sensor.id}/readings/'
+
+        response = authenticated_client.get(url)
+        assert response.json()['count'] == 3
+        buckets = authenticated_client.get(url + 'aggregate/?bucket_seconds=3600').json()
+        assert [bucket['count'] for bucket in buckets] == [3]
+        assert authenticated_client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code == 304
+
+    def test_upsert_splits_by_shard(self, shards, test_user):
+        """Test batch loads write each sensor's rows to its own shard"""
+        primary = move(Sensor.objects.create(owner=test_user, name='a', model='M'), 'default')
+        sharded = move(Sensor.objects.create(owner=test_user, name='b', model='M'), 'shard1')
+
+        written = upsert_readings([(primary.id, BASE, 20.0, 50.0), (sharded.id, BASE, 21.0, 51.0)])
+
+        assert written == 2
+        assert list(Reading.objects.using('default').values_list('sensor_id', flat=True)) == [primary.id]
+        assert list(Reading.objects.using('shard1').values_list('sensor_id', flat=True)) == [sharded.id]
+
+    def test_batch_scatter_gather(self, shards, authenticated_client, test_user):
+        """Test multi-sensor queries merge every shard's series, in request order"""
+        primary = move(Sensor.objects.create(owner=test_user, name='a', model='M'), 'default')
+        sharded = move(Sensor.objects.create(owner=test_user, name='b', model='M'), 'shard1')
+        upsert_readings(
+            [(primary.id, BASE + timedelta(minutes=i), 20.0, 50.0) for i in range(2)]
+            + [(sharded.id, BASE + timedelta(minutes=i), 20.0, 50.0) for i in range(3)]
+        )
+
+        response = authenticated_client.get(f'/api/readings/batch/?sensor_id={sharded.id}&sensor_id={primary.id}')
+        series = response.json()
+        assert [(item['sensor_id'], len(item['readings'])) for item in series] == [(sharded.id, 3), (primary.id, 2)]
+
+        response = authenticated_client.get(
+            f'/api/readings/batch/?sensor_id={sharded.id}&sensor_id={primary.id}&bucket_seconds=3600'
+        )
+        assert [item['buckets'][0]['count'] for item in response.json()] == [3, 2]
+
+    def test_list_sensors_latest_from_shards(self, shards, authenticated_client, test_user):
+        """Test ?include_latest=true reports snapshots kept on other shards"""
+        primary = move(Sensor.objects.create(owner=test_user, name='a', model='M'), 'default')
+        sharded = move(Sensor.objects.create(owner=test_user, name='b', model='M'), 'shard1')
+        upsert_readings([(primary.id, BASE, 20.0, 50.0), (sharded.id, BASE, 21.0, 51.0), (sharded.id, BASE + timedelta(minutes=1), 22.0, 52.0)])
+
+        response = authenticated_client.get('/api/sensors/?include_latest=true')
+        items = {item['id']: item for item in response.json()['items']}
+        assert items[primary.id]['reading_count'] == 1
+        assert items[sharded.id]['reading_count'] == 2
+        assert items[sharded.id]['latest_reading']['temperature'] == 22.0
+
+        etag = response['ETag']
+        upsert_readings([(sharded.id, BASE + timedelta(minutes=2), 23.0, 53.0)])
+        response = authenticated_client.get('/api/sensors/?include_latest=true', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+
+    def test_delete_sensor_clears_shard(self, shards, test_sensor, django_capture_on_commit_callbacks):
+        """Test deleting a sensor removes its readings from its shard"""
+        move(test_sensor, 'shard1')
+        upsert_readings([(test_sensor.id, BASE, 20.0, 50.0)])
+
+        with django_capture_on_commit_callbacks(execute=True):
+            test_sensor.delete()
+
+        assert not Reading.objects.using('shard1').exists()
+        assert not LatestReading.objects.using('shard1').exists()
+
+    def test_refresh_rollups_command_on_shard(self, shards, test_sensor):
+        """Test refresh_reading_rollups rebuilds rollups where the sensor's readings live"""
+        move(test_sensor, 'shard1')
+        add_readings(test_sensor, 3, using='shard1')
+
+        out = StringIO()
+        call_command('refresh_reading_rollups', '--sensor', str(test_sensor.id), stdout=out)
+
+        assert 'rebuilt 1 window(s)' in out.getvalue()
+        assert HourlyReadingRollup.objects.using('shard1').get(sensor_id=test_sensor.id).count == 3
+        assert LatestReading.objects.using('shard1').get(sensor_id=test_sensor.id).count == 3
+        assert not HourlyReadingRollup.objects.using('default').exists()
+
+
+@sharded_db
+class TestRebalanceReadings:
+    """Test the rebalance_readings command"""
+
+    def rebalance(self, *args):
+        out = StringIO()
+        call_command('rebalance_readings', *args, '--settle', '0', stdout=out)
+        return out.getvalue()
+
+    def test_moves_sensor(self, shards, authenticated_client, test_sensor):
+        """Test a sensor's raw and compacted readings move, with rollups rebuilt on the target"""
+        move(test_sensor, 'default')
+        add_readings(test_sensor, 3, start=BASE - timedelta(days=1))
+        add_readings(test_sensor, 2)
+        compact_day(test_sensor.id, (BASE - timedelta(days=1)).date())
+
+        output = self.rebalance('--sensor', str(test_sensor.id), '--to', 'shard1', '--batch-size', '1')
+
+        assert 'Moved 1 sensor(s)' in output
+        test_sensor.refresh_from_db()
+        assert test_sensor.readings_shard == 'shard1'
+        assert shard_for_sensor(test_sensor.id) == 'shard1'
+        assert not Reading.objects.using('default').filter(sensor_id=test_sensor.id).exists()
+        assert not ReadingChunk.objects.using('default').filter(sensor_id=test_sensor.id).exists()
+        assert Reading.objects.using('shard1').filter(sensor_id=test_sensor.id).count() == 2
+        assert ReadingChunk.objects.using('shard1').filter(sensor_id=test_sensor.id).count() == 1
+        assert LatestReading.objects.using('shard1').get(sensor_id=test_sensor.id).count == 5
+        assert authenticated_client.get(f'/api/sensors/{test_sensor.id}/readings/').json()['count'] == 5
+
+    def test_carries_over_writes_while_settling(self, shards, test_sensor):
+        """Test readings inserted or overwritten on the source after the first copy reach the target"""
+        move(test_sensor, 'default')
+        add_readings(test_sensor, 3)
+
+        def stale_writer(seconds):
+            # A process still caching the old placement writes to the source meanwhile
+            upsert_readings([(test_sensor.id, BASE, 30.0, 60.0), (test_sensor.id, BASE + timedelta(hours=1), 31.0, 61.0)], using='default')
+
+        with patch('readings.management.commands.rebalance_readings.time.sleep', stale_writer):
+            call_command('rebalance_readings', '--sensor', str(test_sensor.id), '--to', 'shard1', '--settle', '1', stdout=StringIO())
+
+        moved = dict(Reading.objects.using('shard1').filter(sensor_id=test_sensor.id).values_list('timestamp', 'temperature'))
+        assert len(moved) == 4
+        assert moved[BASE] == 30.0
+        assert moved[BASE + timedelta(hours=1)] == 31.0
+        assert moved[BASE + timedelta(minutes=1)] == 21.0
+        assert LatestReading.objects.using('shard1').get(sensor_id=test_sensor.id).temperature == 31.0
+
+    def test_all_follows_ring(self, shards, test_user):
+        """Test --all moves exactly the sensors not on their ring shard"""
+        sensors = [move(Sensor.objects.create(owner=test_user, name=f's{i}', model='M'), 'default') for i in range(6)]
+        for sensor in sensors:
+            add_readings(sensor, 1)
+        expected = {sensor.id for sensor in sensors if ring_shard(sensor.id) == 'shard1'}
+
+        assert f'{len(expected)} sensor(s) to move' in self.rebalance('--all', '--dry-run')
+        self.rebalance('--all')
+
+        assert set(Reading.objects.using('shard1').values_list('sensor_id', flat=True)) == expected
+        assert 'already on its shard' in self.rebalance('--all')
+
+    def test_unknown_shard(self, shards, test_sensor):
+        """Test targets outside READINGS_SHARDS are rejected"""
+        with pytest.raises(CommandError):
+            self.rebalance('--sensor', str(test_sensor.id), '--to', 'nowhere')
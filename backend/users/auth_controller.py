@@ -4,8 +4,7 @@ from ninja_extra import api_controller, route
 from django.contrib.auth.models import User
 from django.contrib.auth.hashers import make_password, check_password
 from django.db import IntegrityError
-from ninja_jwt.tokens import RefreshToken
-from ninja_jwt.authentication import JWTAuth
+from users.authentication import StatelessJWTAuth, tokens_for_user
 
 class RegisterSchema(Schema):
     username: str
@@ -36,7 +35,7 @@ class AuthController:
                 email=payload.email,
                 password=make_password(payload.password),
             )
-            refresh = RefreshToken.for_user(user)
+            refresh = tokens_for_user(user)
             return 201, {
                 "access": str(refresh.access_token),
                 "refresh": str(refresh),
@@ -57,7 +56,7 @@ class AuthController:
         if not check_password(payload.password, user.password):
             return 401, {"error": "Invalid credentials"}
 
-        refresh = RefreshToken.for_user(user)
+        refresh = tokens_for_user(user)
         return {
             "access": str(refresh.access_token),
             "refresh": str(refresh),
@@ -66,7 +65,7 @@ class AuthController:
             "email": user.email,
         }
 
-    @route.get("/me/", auth=JWTAuth())
+    @route.get("/me/", auth=StatelessJWTAuth())
     def me(self, request):
         return {
             "id": request.auth.id,
@@ -0,0 +1,66 @@
+# users/authentication.py
+from django.contrib.auth.models import User
+from django.utils.functional import cached_property
+from ninja_jwt.authentication import JWTStatelessUserAuthentication
+from ninja_jwt.exceptions import InvalidToken
+from ninja_jwt.models import TokenUser
+from ninja_jwt.settings import api_settings
+from ninja_jwt.tokens import RefreshToken
+
+# Claims copied into every token so API calls can identify the user without a query
+USER_CLAIMS = ("username", "email")
+
+
+def tokens_for_user(user):
+    """Refresh token carrying the user's profile claims (copied to its access token)"""
+    refresh = RefreshToken.for_user(user)
+    for claim in USER_CLAIMS:
+        refresh[claim] = getattr(user, claim)
+    return refresh
+
+
+class ClaimsUser(TokenUser):
+    """
+    Lightweight user backed by validated token claims.
+
+    ``id``, ``username`` and ``email`` come straight from the token. The real
+    ``User`` row is only fetched when something asks for ``.user`` or for an
+    attribute the token does not carry (tokens issued before the profile
+    claims were added fall back the same way).
+    """
+
+    @cached_property
+    def username(self) -> str:
+        if "username" in self.token:
+            return self.token["username"]
+        return self.user.username
+
+    @cached_property
+    def email(self) -> str:
+        if "email" in self.token:
+            return self.token["email"]
+        return self.user.email
+
+    @cached_property
+    def user(self) -> User:
+        return User.objects.get(pk=self.id)
+
+    def __getattr__(self, name):
+        # Only reached for attributes TokenUser does not define
+        if name.startswith("_") or name == "token":
+            raise AttributeError(name)
+        return getattr(self.user, name)
+
+
+class StatelessJWTAuth(JWTStatelessUserAuthentication):
+    """
+    JWT auth that trusts the token instead of loading the user on every request.
+
+    Unlike ``JWTAuth`` a deactivated or deleted user keeps access until their
+    access token expires, so keep ``ACCESS_TOKEN_LIFETIME`` short.
+    """
+
+    def get_user(self, validated_token) -> ClaimsUser:
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken("Token contained no recognizable user identification")
+        return ClaimsUser(validated_token)
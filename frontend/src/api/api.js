@@ -1,4 +1,6 @@
 import axios from 'axios';
+import { COLUMNAR_CONTENT_TYPE, decodeColumnar } from './columnar';
+import { subscribeReadings } from './liveReadings';
 
 const API_BASE = 'http://localhost:8000/api';
 
@@ -48,6 +50,24 @@ export const sensorsAPI = {
 export const readingsAPI = {
   list: (sensorId, params = {}) => api.get(`/sensors/${sensorId}/readings/`, { params }),
   create: (sensorId, data) => api.post(`/sensors/${sensorId}/readings/`, data),
+  aggregate: (sensorId, params = {}) => api.get(`/sensors/${sensorId}/readings/aggregate/`, { params }),
+  // Series of several sensors at once: ?sensor_id=1&sensor_id=2...
+  batch: (sensorIds, params = {}) => api.get('/readings/batch/', {
+    params: { ...params, sensor_id: sensorIds },
+    paramsSerializer: { indexes: null },
+  }),
+  // Same buckets as aggregate, as packed columns instead of JSON objects
+  aggregateColumnar: async (sensorId, params = {}) => {
+    const response = await api.get(`/sensors/${sensorId}/readings/aggregate/`, {
+      params,
+      headers: { Accept: COLUMNAR_CONTENT_TYPE },
+      responseType: 'arraybuffer',
+    });
+    return decodeColumnar(response.data);
+  },
+  // Pushes each new reading to onReading and stream availability to onStatus;
+  // returns an unsubscribe function
+  subscribe: (sensorId, onReading, onStatus) => subscribeReadings(API_BASE, sensorId, onReading, onStatus),
 };
 
 // Enhanced response interceptor with token refresh
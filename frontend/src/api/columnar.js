@@ -0,0 +1,29 @@
+// Decoder for the backend's columnar series format (see backend/readings/columnar.py)
+export const COLUMNAR_CONTENT_TYPE = 'application/vnd.fsninja.columnar';
+
+// Returns { rows, columns: { name: Float64Array | BigInt64Array } } viewing the buffer in place
+export function decodeColumnar(buffer) {
+  const view = new DataView(buffer);
+  const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+  if (magic !== 'RCOL' || view.getUint16(4, true) !== 1) {
+    throw new Error('Unsupported columnar payload');
+  }
+  const columnCount = view.getUint16(6, true);
+  const rows = view.getUint32(8, true);
+  let dataOffset = view.getUint32(12, true);
+
+  const decoder = new TextDecoder();
+  const columns = {};
+  let offset = 16;
+  for (let i = 0; i < columnCount; i++) {
+    const typeCode = String.fromCharCode(view.getUint8(offset));
+    const nameLength = view.getUint8(offset + 1);
+    const name = decoder.decode(new Uint8Array(buffer, offset + 2, nameLength));
+    offset += 2 + nameLength;
+
+    const ArrayType = typeCode === 'q' ? BigInt64Array : Float64Array;
+    columns[name] = new ArrayType(buffer, dataOffset, rows);
+    dataOffset += rows * 8;
+  }
+  return { rows, columns };
+}
@@ -0,0 +1,69 @@
+// Live readings over the backend's server-sent events route (see backend/readings/live.py).
+// Uses fetch rather than EventSource so the bearer token travels in a header.
+
+const RECONNECT_MS = 3000;
+
+// Parses complete "event: ... / data: ..." blocks out of buffered stream text
+function takeEvents(buffer) {
+  const blocks = buffer.split('\n\n');
+  const rest = blocks.pop();
+  const events = blocks.map((block) => {
+    const fields = {};
+    for (const line of block.split('\n')) {
+      if (!line || line.startsWith(':')) continue;
+      const index = line.indexOf(': ');
+      fields[line.slice(0, index)] = line.slice(index + 2);
+    }
+    return fields;
+  });
+  return { events, rest };
+}
+
+// Calls onReading(reading) for each new reading until the returned function is called.
+// onStatus(live) reports whether the stream is connected; the backend answers 501
+// when not served under ASGI, and then no reconnect is attempted.
+export function subscribeReadings(baseUrl, sensorId, onReading, onStatus = () => {}) {
+  const controller = new AbortController();
+  let lastEventId = null;
+
+  const connect = async () => {
+    while (!controller.signal.aborted) {
+      try {
+        const headers = { Authorization: `Bearer ${localStorage.getItem('access')}` };
+        if (lastEventId) headers['Last-Event-ID'] = lastEventId;
+        const response = await fetch(`${baseUrl}/sensors/${sensorId}/readings/stream/`, {
+          headers,
+          signal: controller.signal,
+        });
+        if (response.status === 501) {
+          onStatus(false);
+          return;
+        }
+        if (!response.ok) throw new Error(`Stream failed with status ${response.status}`);
+        onStatus(true);
+
+        const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+        let buffer = '';
+        for (;;) {
+          const { value, done } = await reader.read();
+          if (done) break;
+          const { events, rest } = takeEvents(buffer + value);
+          buffer = rest;
+          for (const event of events) {
+            if (event.event !== 'reading') continue;
+            lastEventId = event.id;
+            onReading(JSON.parse(event.data));
+          }
+        }
+      } catch (error) {
+        if (controller.signal.aborted) return;
+        console.error('Live readings stream interrupted:', error);
+      }
+      onStatus(false);
+      await new Promise((resolve) => setTimeout(resolve, RECONNECT_MS));
+    }
+  };
+
+  connect();
+  return () => controller.abort();
+}
@@ -15,19 +15,20 @@ const SensorChart = ({ sensorId, readings: propReadings }) => {
     
     setLoading(true);
     try {
-      const params = {};
+      const params = { points: 1000 };
       if (filters.timestamp_from) params.timestamp_from = filters.timestamp_from;
       if (filters.timestamp_to) params.timestamp_to = filters.timestamp_to;
       
-      const response = await readingsAPI.list(sensorId, params);
-      let readingsData = response.data;
+      // Downsampled server-side, so long ranges load as ~1000 points
+      const { rows, columns } = await readingsAPI.aggregateColumnar(sensorId, params);
+      const readingsData = Array.from({ length: rows }, (_, i) => ({
+        // bucket_start is in epoch microseconds
+        timestamp: new Date(Number(columns.bucket_start[i] / 1000n)).toISOString(),
+        temperature: columns.temperature_avg[i],
+        humidity: columns.humidity_avg[i],
+      }));
       
-      // Handle paginated response
-      if (readingsData && readingsData.items && Array.isArray(readingsData.items)) {
-        readingsData = readingsData.items;
-      }
-      
-      console.log('Chart - Loaded readings:', readingsData.length);
+      console.log('Chart - Loaded buckets:', readingsData.length);
       setReadings(readingsData);
     } catch (error) {
       console.error('Failed to load readings:', error);
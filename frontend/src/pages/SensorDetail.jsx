@@ -1,4 +1,4 @@
-import { useState, useEffect, useCallback } from 'react';
+import { useState, useEffect, useCallback, useRef } from 'react';
 import { useParams } from 'react-router-dom';
 import { sensorsAPI, readingsAPI } from '../api/api';
 import SensorChart from '../components/SensorChart';
@@ -9,6 +9,8 @@ const SensorDetail = () => {
   const [readings, setReadings] = useState([]);
   const [loading, setLoading] = useState(false);
   const [apiError, setApiError] = useState(null);
+  // Whether the live stream is connected; without it new readings need a reload
+  const streamLive = useRef(false);
   const [newReading, setNewReading] = useState({
     temperature: '',
     humidity: '',
@@ -67,6 +69,23 @@ const SensorDetail = () => {
     }
   }, [sensorId, loadSensor]);
 
+  // Append readings as they are ingested instead of reloading the list
+  useEffect(() => {
+    if (!sensorId) return undefined;
+    return readingsAPI.subscribe(
+      sensorId,
+      (reading) => {
+        const time = new Date(reading.timestamp).getTime();
+        setReadings(prev => (
+          prev.some(existing => new Date(existing.timestamp).getTime() === time)
+            ? prev
+            : [...prev, reading]
+        ));
+      },
+      (live) => { streamLive.current = live; },
+    );
+  }, [sensorId]);
+
   const handleAddReading = async (e) => {
     e.preventDefault();
     try {
@@ -81,7 +100,10 @@ const SensorDetail = () => {
         timestamp: new Date().toISOString().slice(0, 16),
       });
       alert('Reading added successfully!');
-      loadSensor(); // Reload to show new reading
+      // The live stream adds it to the list; reload when the stream is unavailable
+      if (!streamLive.current) {
+        loadSensor();
+      }
     } catch (error) {
       console.error('Failed to add reading:', error);
       alert('Failed to add reading');
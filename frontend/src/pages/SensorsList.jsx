@@ -25,7 +25,7 @@ const SensorsList = () => {
   const loadSensors = useCallback(async () => {
     setLoading(true);
     try {
-      const response = await sensorsAPI.list(filters);
+      const response = await sensorsAPI.list({ ...filters, include_latest: true });
       const responseData = response.data;
       
       console.log('Sensors response:', responseData); // Debug log
@@ -177,7 +177,7 @@ const SensorsList = () => {
           <div className="search-input-group">
             <input
               type="text"
-              placeholder="Search by sensor name or model..."
+              placeholder="Search by sensor name, model or description..."
               value={filters.q}
               onChange={(e) => handleFilterChange('q', e.target.value)}
               className="search-input"
@@ -240,6 +240,13 @@ const SensorsList = () => {
                     <p className="sensor-description"><strong>Description:</strong> {sensor.description}</p>
                   )}
                   <p className="sensor-id"><strong>ID:</strong> {sensor.id}</p>
+                  {sensor.latest_reading ? (
+                    <p className="sensor-latest">
+                      <strong>Latest:</strong> {sensor.latest_reading.temperature.toFixed(1)}°C, {sensor.latest_reading.humidity.toFixed(1)}% at {new Date(sensor.latest_reading.timestamp).toLocaleString()} ({sensor.reading_count.toLocaleString()} readings)
+                    </p>
+                  ) : (
+                    <p className="sensor-latest"><strong>Latest:</strong> No readings yet</p>
+                  )}
                 </div>
                 <div className="sensor-actions">
                   <Link to={`/sensors/${sensor.id}`} className="btn btn-primary">